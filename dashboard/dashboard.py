@@ -1,12 +1,8 @@
 import streamlit as st
-import pandas as pd
 import sqlite3
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import os
 import sys
-import streamlit as st
 st.set_page_config(page_title="Quality Automation Dashboard", layout="wide")
 
 
@@ -57,30 +53,110 @@ if st.sidebar.button("Logout"):
     st.session_state.logged_in = False
     st.rerun()
 
+# Data and chart libraries are imported only once the user is logged in,
+# so the login page and reruns before authentication stay cheap
+import pandas as pd
+import plotly.express as px
+import pyarrow as pa
+import pyarrow.compute as pc
+
 # Add parent directory to path to import from workflow
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from workflow.logger import Logger
+from workflow.logger import BatchedLogger
+from workflow.analytics import (TicketTimeline, build_timelines, backlog_series, age_buckets, bucket_counts,
+                                choose_bucket, final_closes)
+from workflow.sketch import QuantileSketch, build_resolution_sketches, load_sketches
+from workflow.archive import archive_dir_for, archived_months, months_between, ticket_columns, iter_archived_rows
+from workflow.columnar import ColumnarSnapshot, filter_tickets, snapshot_columns, tickets_table
+from workflow.replica import SnapshotReader, snapshot_info
+from workflow.repository import SQLiteTicketRepository
+from workflow.schema import epoch_ready
+
+# One logger per process: Streamlit re-executes this script on every
+# interaction, and a new Logger would start a new log file each time
+@st.cache_resource
+def get_logger():
+    return BatchedLogger(log_dir='../automation_logs')
+
+logger = get_logger()
+
+# Database connection (a read-only snapshot of the live database, see workflow/replica.py);
+# until a snapshot has been taken the bundled sample database is shown
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get('REPLICA_PATH', os.path.join(BASE_DIR, "replica.db"))
+if 'REPLICA_PATH' not in os.environ and not os.path.exists(DB_PATH):
+    DB_PATH = os.path.join(BASE_DIR, "tickets.db")
 
-# Initialize logger
-logger = Logger(log_dir='../automation_logs')
+# Points per time-series chart (override with CHART_MAX_POINTS): longer date ranges
+# use coarser buckets, so what is sent to the browser stays the same size
+CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', '250'))
+# Longer series are drawn with WebGL (Scattergl) rather than as SVG elements
+WEBGL_MIN_POINTS = 200
+# Markers are only drawn on short series
+MARKER_MAX_POINTS = 60
 
-# Database connection
 @st.cache_resource
+def get_snapshot_reader():
+    return SnapshotReader(DB_PATH)
+
 def get_connection():
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    DB_PATH = os.path.join(BASE_DIR, "tickets.db")
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    # Reopens automatically when the replicator swaps in a fresh snapshot
+    return get_snapshot_reader().connection()
+
+@st.cache_resource
+def get_columnar_snapshot():
+    return ColumnarSnapshot(DB_PATH, os.environ.get('COLUMNAR_PATH'))
 
 def load_data():
+    # Memory-mapped Arrow table shared by every session and process (see workflow/columnar.py);
+    # rebuilt from the snapshot database whenever that changes
+    return get_columnar_snapshot().table()
+
+@st.cache_data(ttl=300)
+def load_archived(start_date, end_date):
+    # Closed tickets moved out of the hot table, read only for the months the range touches
     conn = get_connection()
-    query = "SELECT * FROM tickets"
-    df = pd.read_sql_query(query, conn)
-    
-    # Convert datetime strings to datetime objects
-    df['created_at'] = pd.to_datetime(df['created_at'], format='ISO8601', errors='coerce')
-    df['updated_at'] = pd.to_datetime(df['updated_at'], format='ISO8601', errors='coerce')
-    
-    return df
+    months = months_between(archived_months(conn), start_date, end_date)
+    # Archive files sit next to the live database the snapshot was taken from
+    source, _ = snapshot_info(conn)
+    archive_dir = archive_dir_for(source or DB_PATH)
+    columns = snapshot_columns(ticket_columns(conn), epoch_ready(conn))
+    rows = [row for chunk in iter_archived_rows(conn, archive_dir, months, columns=columns) for row in chunk]
+    return tickets_table(columns, rows)
+
+@st.cache_resource(ttl=300)
+def load_archived_timelines():
+    # Archived tickets are all closed, so they only add to the backlog history; they change
+    # only when the archiver runs
+    conn = get_connection()
+    source, _ = snapshot_info(conn)
+    columns = ['priority', 'status', 'created_at', 'updated_at']
+    chunks = iter_archived_rows(conn, archive_dir_for(source or DB_PATH), archived_months(conn), columns=columns)
+    return build_timelines([tuple(row) for chunk in chunks for row in chunk])
+
+@st.cache_resource(ttl=60)
+def load_timelines():
+    # Sorted create/close events per priority, rebuilt at most once a minute
+    timelines = build_timelines(SQLiteTicketRepository(get_connection()).timeline_rows())
+    for priority, archived in load_archived_timelines().items():
+        timelines.setdefault(priority, TicketTimeline([], [])).merge(archived)
+    return timelines
+
+def time_series_chart(frame, x, y, title, fill=False):
+    points = len(frame)
+    fig = px.line(frame, x=x, y=y, title=title, markers=points <= MARKER_MAX_POINTS,
+                  render_mode='webgl' if points >= WEBGL_MIN_POINTS else 'svg')
+    if fill:
+        fig.update_traces(fill='tozeroy')
+    return fig
+
+@st.cache_resource(ttl=60)
+def load_resolution_sketches():
+    # The sketches maintained by the workflow service ({} if it has not built any)
+    try:
+        return load_sketches(get_connection())
+    except sqlite3.OperationalError:
+        return {}
 
 # Page configuration
 
@@ -91,14 +167,18 @@ This dashboard provides real-time insights into the ticket management system.
 Monitor ticket volume, priority distribution, analyst workload, and more.
 """)
 
+# Snapshot staleness
+staleness = timedelta(seconds=int(get_snapshot_reader().staleness()))
+st.caption(f"Data as of {datetime.now() - staleness:%Y-%m-%d %H:%M:%S} ({staleness} ago)")
+
 # Load data
-df = load_data()
+tickets = load_data()
 
 # Sidebar filters
 st.sidebar.header("Filters")
 
 # Status filter
-status_options = ['All'] + sorted(df['status'].unique().tolist())
+status_options = ['All'] + sorted(pc.unique(tickets['status']).drop_null().to_pylist())
 selected_status = st.sidebar.multiselect(
     "Status",
     options=status_options,
@@ -106,16 +186,20 @@ selected_status = st.sidebar.multiselect(
 )
 
 # Priority filter
-priority_options = ['All'] + sorted(df['priority'].unique().tolist())
+priority_options = ['All'] + sorted(pc.unique(tickets['priority']).drop_null().to_pylist())
 selected_priority = st.sidebar.multiselect(
     "Priority",
     options=priority_options,
     default=['All']
 )
 
-# Date range filter
-min_date = df['created_at'].min().date()
-max_date = df['created_at'].max().date()
+# Date range filter (archived months extend the range back)
+archive_months = archived_months(get_connection())
+created_range = pc.min_max(tickets['created_at'])
+min_date = created_range['min'].as_py().date()
+if archive_months:
+    min_date = min(min_date, datetime.strptime(archive_months[0], '%Y-%m').date())
+max_date = created_range['max'].as_py().date()
 
 date_range = st.sidebar.date_input(
     "Date Range",
@@ -132,19 +216,22 @@ else:
     start_date = min_date
     end_date = max_date + timedelta(days=1)
 
-# Apply filters
-filtered_df = df.copy()
+# Hour, day, week or month buckets, whichever is finest within the point budget
+bucket = choose_bucket(start_date, end_date, CHART_MAX_POINTS)
 
-if 'All' not in selected_status:
-    filtered_df = filtered_df[filtered_df['status'].isin(selected_status)]
+# Pull in archived closed tickets when the range reaches back into them (resolution times
+# need them whichever statuses are shown)
+if months_between(archive_months, start_date, end_date):
+    tickets = pa.concat_tables([load_archived(start_date, end_date), tickets])
 
-if 'All' not in selected_priority:
-    filtered_df = filtered_df[filtered_df['priority'].isin(selected_priority)]
-
-filtered_df = filtered_df[
-    (filtered_df['created_at'] >= pd.Timestamp(start_date)) & 
-    (filtered_df['created_at'] <= pd.Timestamp(end_date))
-]
+# Apply filters on the mapped columns; only the matching rows are copied into pandas
+filtered_df = filter_tickets(
+    tickets,
+    statuses=None if 'All' in selected_status else selected_status,
+    priorities=None if 'All' in selected_priority else selected_priority,
+    created_from=datetime.combine(start_date, datetime.min.time()),
+    created_to=datetime.combine(end_date, datetime.min.time())
+).to_pandas()
 
 # Dashboard layout
 col1, col2 = st.columns(2)
@@ -171,17 +258,11 @@ with col1:
     )
     st.plotly_chart(fig_status, use_container_width=True)
     
-    # Line chart of tickets created per day (last 14 days)
-    daily_counts = filtered_df.groupby(filtered_df['created_at'].dt.date).size().reset_index()
-    daily_counts.columns = ['Date', 'Count']
+    # Line chart of tickets created per bucket, counted here rather than in the browser
+    bucket_starts, created_counts = bucket_counts(filtered_df['created_at'].to_numpy(), start_date, end_date, bucket)
+    daily_counts = pd.DataFrame({'Date': bucket_starts, 'Count': created_counts})
     
-    fig_daily = px.line(
-        daily_counts, 
-        x='Date', 
-        y='Count',
-        title='Tickets Created per Day',
-        markers=True
-    )
+    fig_daily = time_series_chart(daily_counts, 'Date', 'Count', f'Tickets Created per {bucket.title()}')
     st.plotly_chart(fig_daily, use_container_width=True)
 
 # Priority Breakdown
@@ -227,6 +308,41 @@ with col2:
     )
     st.plotly_chart(fig_analyst, use_container_width=True)
 
+# Backlog and Aging
+col_backlog, col_aging = st.columns(2)
+
+timelines = load_timelines()
+selected_timelines = [
+    timeline for priority, timeline in timelines.items()
+    if 'All' in selected_priority or priority in selected_priority
+]
+
+with col_backlog:
+    st.subheader("Open Backlog Over Time")
+    
+    # Area chart: tickets open at the start of each bucket in the date range
+    backlog_dates, backlog_counts = backlog_series(selected_timelines, start_date, end_date, bucket=bucket)
+    backlog_df = pd.DataFrame({'Date': backlog_dates, 'Open Tickets': backlog_counts})
+    
+    fig_backlog = time_series_chart(backlog_df, 'Date', 'Open Tickets', f'Open Tickets per {bucket.title()}',
+                                    fill=True)
+    st.plotly_chart(fig_backlog, use_container_width=True)
+
+with col_aging:
+    st.subheader("Ticket Aging")
+    
+    # Bar chart: age distribution of tickets that are still open
+    aging_df = pd.DataFrame(age_buckets(selected_timelines, datetime.now()))
+    
+    fig_aging = px.bar(
+        aging_df,
+        x='bucket',
+        y='count',
+        title='Age of Open Tickets',
+        labels={'bucket': 'Age', 'count': 'Open Tickets'}
+    )
+    st.plotly_chart(fig_aging, use_container_width=True)
+
 # Live Feed
 st.subheader("Live Feed")
 st.markdown("Latest 10 tickets in the system")
@@ -264,21 +380,51 @@ with col_stats2:
     open_tickets = len(filtered_df[filtered_df['status'] == 'open'])
     st.metric("Open Tickets", open_tickets)
 
+# The stored sketches already cover the whole history
+resolution_sketches = load_resolution_sketches() if start_date <= min_date and end_date > max_date else {}
+if not resolution_sketches:
+    # Tickets created in the range (archived ones included), each counted once with its final close
+    closed_df = filter_tickets(
+        tickets,
+        statuses=['closed'],
+        created_from=datetime.combine(start_date, datetime.min.time()),
+        created_to=datetime.combine(end_date, datetime.min.time())
+    ).to_pandas()
+    final = final_closes(closed_df['id'].to_numpy(), closed_df['updated_at'].to_numpy())
+    resolution_sketches = build_resolution_sketches(closed_df.iloc[final].to_dict('records'))
+
 with col_stats3:
-    avg_resolution_time = "N/A"
-    closed_tickets = filtered_df[filtered_df['status'] == 'closed']
+    # Merge the per-priority sketches for the selected priorities
+    resolution = QuantileSketch()
+    for (dimension, name), sketch in resolution_sketches.items():
+        if dimension == 'priority' and ('All' in selected_priority or name in selected_priority):
+            resolution.merge(sketch)
     
-    if not closed_tickets.empty:
-        resolution_times = (closed_tickets['updated_at'] - closed_tickets['created_at']).dt.total_seconds() / 3600  # in hours
-        avg_resolution_time = f"{resolution_times.mean():.1f} hours"
+    resolution_time = "N/A"
+    if resolution.count:
+        resolution_time = f"{resolution.quantile(0.5):.1f}h / {resolution.quantile(0.9):.1f}h"
     
-    st.metric("Avg. Resolution Time", avg_resolution_time)
+    st.metric("Resolution Time p50 / p90", resolution_time, help="Closed tickets created in the date range, for the selected priorities")
 
 with col_stats4:
     high_priority_count = len(filtered_df[filtered_df['priority'] == 'high'])
     high_priority_pct = (high_priority_count / total_tickets * 100) if total_tickets > 0 else 0
     st.metric("High Priority", f"{high_priority_count} ({high_priority_pct:.1f}%)")
 
+# Resolution Time Percentiles
+st.subheader("Resolution Time Percentiles")
+st.markdown("Hours from creation to close, per priority and per assignee, for tickets created in the date range")
+
+percentile_rows = [
+    {'Group': dimension.title(), 'Name': name, **sketch.summary()}
+    for (dimension, name), sketch in sorted(resolution_sketches.items())
+    if dimension in ('priority', 'assignee')
+]
+if percentile_rows:
+    percentiles_df = pd.DataFrame(percentile_rows)[['Group', 'Name', 'count', 'p50', 'p90', 'p99']]
+    percentiles_df = percentiles_df.rename(columns={'count': 'Closed Tickets'}).round(1)
+    st.dataframe(percentiles_df, use_container_width=True, hide_index=True)
+
 # Footer
 st.markdown("---")
 st.markdown("Quality Automation Dashboard | Created for demonstration purposes")
@@ -1,9 +1,13 @@
 from datetime import datetime, timedelta
-import sqlite3
 import os
 import random
+import sys
 from faker import Faker
 
+# Add parent directory to path to import from workflow
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from workflow.repository import SQLiteTicketRepository
+
 # Ensure database directory exists
 os.makedirs('database', exist_ok=True)
 
@@ -13,23 +17,8 @@ os.makedirs('test_logs', exist_ok=True)
 # Initialize Faker
 fake = Faker()
 
-# Database connection
-conn = sqlite3.connect('database/tickets.db')
-cursor = conn.cursor()
-
-# Create tickets table
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS tickets (
-    id INTEGER PRIMARY KEY,
-    title TEXT NOT NULL,
-    description TEXT NOT NULL,
-    status TEXT CHECK(status IN ('open', 'in_progress', 'closed')) NOT NULL,
-    priority TEXT CHECK(priority IN ('low', 'medium', 'high')) NOT NULL,
-    created_at DATETIME NOT NULL,
-    updated_at DATETIME NOT NULL,
-    assigned_to TEXT
-)
-''')
+# Database connection (creates the tickets table with the current schema)
+repository = SQLiteTicketRepository.open('database/tickets.db')
 
 # Generate 100 mock tickets
 print("Generating 100 mock tickets...")
@@ -43,6 +32,7 @@ priorities = ["low", "medium", "high"]
 now = datetime.now()
 
 # Insert mock data
+tickets = []
 for i in range(1, 101):
     # Generate random dates within the last 60 days
     created_days_ago = fake.random_int(min=0, max=60)
@@ -80,21 +70,18 @@ for i in range(1, 101):
     title = fake.sentence(nb_words=6)[:-1]  # Remove period
     description = fake.paragraph(nb_sentences=3)
     
-    # Insert into database
-    cursor.execute('''
-    INSERT INTO tickets (title, description, status, priority, created_at, updated_at, assigned_to)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (title, description, status, priority, created_at, updated_at, assigned_to))
+    tickets.append({'title': title, 'description': description, 'status': status, 'priority': priority,
+                    'created_at': created_at, 'updated_at': updated_at, 'assigned_to': assigned_to})
 
-# Commit changes and close connection
-conn.commit()
+# Insert into database, commit changes
+repository.add_many(tickets)
+repository.commit()
 print("Database setup complete!")
 
 # Display some sample data
-cursor.execute("SELECT id, title, status, priority, assigned_to FROM tickets LIMIT 5")
-sample_data = cursor.fetchall()
+_, sample_data = repository.records(['id', 'title', 'status', 'priority', 'assigned_to'], order_by='id', limit=5)
 print("\nSample data:")
 for row in sample_data:
     print(row)
 
-conn.close()
+repository.close()
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Add parent directory to path to import from workflow
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from workflow.repository import SQLiteTicketRepository
+from workflow.schema import ensure_schema
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Seed data for the template; the seed file itself is never written to
+SEED_DB = os.environ.get('TEST_SEED_DB', os.path.join(BASE_DIR, '../dashboard/tickets.db'))
+
+_template = None
+
+
+def build_template(path, seed_path=SEED_DB):
+    """Copy the seed database into path with the current schema applied"""
+    source = sqlite3.connect(f"file:{os.path.abspath(seed_path)}?mode=ro", uri=True)
+    template = sqlite3.connect(path)
+    source.backup(template)
+    source.close()
+    ensure_schema(template)
+    template.close()
+    return path
+
+
+def template_connection():
+    """In-memory template, built once per process
+
+    The parallel runner builds the template file once and shares it through
+    TEST_TEMPLATE_DB; otherwise it is built here from the seed database.
+    """
+    global _template
+    if _template is None:
+        path = os.environ.get('TEST_TEMPLATE_DB')
+        tmp_dir = None
+        if not path:
+            tmp_dir = tempfile.TemporaryDirectory()
+            path = build_template(os.path.join(tmp_dir.name, 'template.db'))
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        template = sqlite3.connect(':memory:', check_same_thread=False)
+        source.backup(template)
+        source.close()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+        _template = template
+    return _template
+
+
+def clone_database(path=':memory:'):
+    """A private copy of the template (in memory unless a file path is given)"""
+    conn = sqlite3.connect(path)
+    template_connection().backup(conn)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class ClonedDatabaseTestCase(unittest.TestCase):
+    """Gives every test its own clone of the seeded template as self.conn (and self.tickets over it)"""
+
+    def setUp(self):
+        self.conn = clone_database()
+        self.tickets = SQLiteTicketRepository(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
@@ -1,52 +1,67 @@
+import argparse
+import os
 import sqlite3
+import sys
 from datetime import datetime, timedelta
 
+# Add workflow directory to path to import the maintenance runner
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from maintenance import ChunkedJob
+from schema import ensure_schema
+
+parser = argparse.ArgumentParser(description="Refresh updated_at on closed tickets older than 30 days")
+parser.add_argument('--db', default='../database/tickets.db')
+parser.add_argument('--chunk-size', type=int, default=500)
+parser.add_argument('--rate', type=float, default=None, help="maximum rows per second")
+parser.add_argument('--checkpoint', default='fix_outdated_tickets.checkpoint.json')
+args = parser.parse_args()
+
 # Connect to the database
-conn = sqlite3.connect('../database/tickets.db')
+conn = sqlite3.connect(args.db)
 conn.row_factory = sqlite3.Row
-cursor = conn.cursor()
+# Older databases get the version column the update below bumps
+ensure_schema(conn)
 
 # Get current time
 now = datetime.now()
 thirty_days_ago = now - timedelta(days=30)
 thirty_days_ago_str = thirty_days_ago.strftime('%Y-%m-%d %H:%M:%S')
 
-# Find closed tickets with updated_at older than 30 days
-cursor.execute('''
-SELECT id, updated_at FROM tickets 
-WHERE status = 'closed' AND updated_at < ?
-''', (thirty_days_ago_str,))
-
-outdated_tickets = cursor.fetchall()
-print(f"Found {len(outdated_tickets)} closed tickets with updates older than 30 days")
-
-# Update these tickets to have a more recent updated_at timestamp
-for ticket in outdated_tickets:
-    # Set updated_at to a random time within the last 30 days
-    days_ago = datetime.now().day % 29 + 1  # Between 1 and 29 days ago
-    new_updated_at = now - timedelta(days=days_ago)
-    new_updated_at_str = new_updated_at.strftime('%Y-%m-%d %H:%M:%S')
-    
-    cursor.execute('''
+# Set updated_at to a time within the last 30 days
+days_ago = datetime.now().day % 29 + 1  # Between 1 and 29 days ago
+new_updated_at_str = (now - timedelta(days=days_ago)).strftime('%Y-%m-%d %H:%M:%S')
+
+def refresh_updated_at(conn, rows):
+    # Repeat the condition so rows changed since the chunk was read are left alone; bumping the
+    # version makes API clients holding the old one re-read the ticket instead of overwriting this
+    cursor = conn.executemany('''
     UPDATE tickets
-    SET updated_at = ?
-    WHERE id = ?
-    ''', (new_updated_at_str, ticket['id']))
-    
-    print(f"Updated ticket {ticket['id']} from {ticket['updated_at']} to {new_updated_at_str}")
+    SET updated_at = ?, version = version + 1
+    WHERE id = ? AND status = 'closed' AND updated_at < ?
+    ''', [(new_updated_at_str, row['id'], thirty_days_ago_str) for row in rows])
+    return cursor.rowcount
 
-# Commit changes
-conn.commit()
-print("All outdated tickets have been updated")
+# Update closed tickets with updated_at older than 30 days, one short transaction per chunk
+job = ChunkedJob(
+    'fix_outdated_tickets',
+    where="status = 'closed' AND updated_at < ?",
+    params=(thirty_days_ago_str,),
+    apply=refresh_updated_at,
+    columns='id, updated_at',
+    chunk_size=args.chunk_size,
+    rows_per_second=args.rate,
+    checkpoint_path=args.checkpoint
+)
+report = job.run(conn)
+print(f"Updated {report['changed']} closed tickets to {new_updated_at_str} "
+      f"in {report['chunks']} chunks ({report['elapsed_seconds']}s, {report['rows_per_second']} rows/s)")
 
 # Verify fix
-cursor.execute('''
-SELECT id FROM tickets 
+remaining_outdated = conn.execute('''
+SELECT COUNT(*) FROM tickets
 WHERE status = 'closed' AND updated_at < ?
-''', (thirty_days_ago_str,))
-
-remaining_outdated = cursor.fetchall()
-print(f"Remaining outdated tickets: {len(remaining_outdated)}")
+''', (thirty_days_ago_str,)).fetchone()[0]
+print(f"Remaining outdated tickets: {remaining_outdated}")
 
 # Close connection
 conn.close()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+from db_fixtures import build_template
+
+
+def iter_test_ids(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_test_ids(test)
+        else:
+            yield test.id()
+
+
+def run_batch(test_ids):
+    """Run some tests in a worker process and return (id, outcome, details) for each"""
+    os.chdir(BASE_DIR)
+    suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+    result = unittest.TestResult()
+    suite.run(result)
+
+    outcomes = {test_id: ('passed', '') for test_id in test_ids}
+    for outcome, entries in (('failed', result.failures), ('error', result.errors)):
+        for test, details in entries:
+            outcomes[test.id()] = (outcome, details)
+    for test, reason in result.skipped:
+        outcomes[test.id()] = ('skipped', reason)
+    return [(test_id, *outcome) for test_id, outcome in outcomes.items()]
+
+
+def run_parallel(pattern='test_*.py', workers=None, batch_size=4):
+    """Run the suite across a process pool, sharing one template database file"""
+    test_ids = list(iter_test_ids(unittest.defaultTestLoader.discover(BASE_DIR, pattern=pattern)))
+    batches = [test_ids[i:i + batch_size] for i in range(0, len(test_ids), batch_size)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Build the seeded template once; each worker clones it per test
+        os.environ['TEST_TEMPLATE_DB'] = build_template(os.path.join(tmp_dir, 'template.db'))
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            return [row for rows in pool.map(run_batch, batches) for row in rows]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the regression suite on all cores")
+    parser.add_argument('--pattern', default='test_*.py')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=4)
+    args = parser.parse_args()
+
+    os.chdir(BASE_DIR)
+    started = time.monotonic()
+    results = run_parallel(args.pattern, args.workers, args.batch_size)
+    elapsed = time.monotonic() - started
+
+    for test_id, outcome, details in results:
+        if outcome in ('failed', 'error'):
+            print(f"\n{outcome.upper()}: {test_id}\n{details}")
+
+    counts = {outcome: sum(1 for _, result, _ in results if result == outcome)
+              for outcome in ('passed', 'failed', 'error', 'skipped')}
+    summary = {
+        'total_tests': len(results),
+        'failures': counts['failed'],
+        'errors': counts['error'],
+        'skipped': counts['skipped'],
+        'passed': counts['passed'],
+        'was_successful': counts['failed'] == 0 and counts['error'] == 0,
+        'workers': args.workers or os.cpu_count(),
+        'wall_seconds': round(elapsed, 2)
+    }
+
+    os.makedirs('../test_logs', exist_ok=True)
+    with open('../test_logs/test_summary.json', 'w') as f:
+        json.dump(summary, f, indent=4)
+
+    print(f"\nTest Summary:")
+    print(f"Total Tests: {summary['total_tests']}")
+    print(f"Passed: {summary['passed']}")
+    print(f"Failed: {summary['failures']}")
+    print(f"Errors: {summary['errors']}")
+    print(f"Skipped: {summary['skipped']}")
+    print(f"Wall Time: {summary['wall_seconds']}s on {summary['workers']} workers")
+
+    sys.exit(0 if summary['was_successful'] else 1)
@@ -0,0 +1,66 @@
+import unittest
+import os
+import sys
+from datetime import date
+
+import numpy as np
+
+# Add workflow directory to path to import the analytics helpers
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from analytics import TicketTimeline, backlog_series, bucket_counts, bucket_edges, choose_bucket, final_closes
+
+
+class TestTimeBuckets(unittest.TestCase):
+    """Test suite for downsampling ticket time series into chart buckets"""
+
+    def test_bucket_follows_range_and_point_budget(self):
+        """The finest bucket within the budget is chosen, and the number of points stays within it"""
+        self.assertEqual(choose_bucket(date(2025, 3, 1), date(2025, 3, 5), 250), 'hour')
+        self.assertEqual(choose_bucket(date(2025, 3, 1), date(2025, 3, 15), 250), 'day')
+        self.assertEqual(choose_bucket(date(2024, 1, 1), date(2025, 1, 1), 250), 'week')
+        self.assertEqual(choose_bucket(date(2015, 1, 1), date(2025, 1, 1), 250), 'month')
+        for start, end in [(date(2025, 3, 1), date(2025, 3, 11)), (date(2020, 1, 1), date(2025, 1, 1))]:
+            bucket = choose_bucket(start, end, 250)
+            self.assertLessEqual(len(bucket_edges(start, end, bucket)) - 1, 250)
+
+    def test_counts_per_bucket_include_empty_buckets(self):
+        """Weeks start on Monday, months on the 1st, and missing timestamps are skipped"""
+        times = ['2025-03-03 09:00:00', '2025-03-09 23:59:59', '2025-03-20 12:00:00', None]
+        starts, counts = bucket_counts(times, date(2025, 3, 5), date(2025, 3, 25), 'week')
+        self.assertEqual([str(start) for start in starts.astype('datetime64[D]')],
+                         ['2025-03-03', '2025-03-10', '2025-03-17', '2025-03-24'])
+        self.assertEqual(counts.tolist(), [2, 0, 1, 0])
+
+        starts, counts = bucket_counts(times, date(2025, 2, 15), date(2025, 4, 1), 'month')
+        self.assertEqual([str(start) for start in starts.astype('datetime64[M]')], ['2025-02', '2025-03'])
+        self.assertEqual(counts.tolist(), [0, 3])
+
+        # The backlog is sampled at the same bucket starts
+        timeline = TicketTimeline(np.array(times[:3], dtype='datetime64[s]'),
+                                  np.array(['2025-03-12 00:00:00', 'NaT', 'NaT'], dtype='datetime64[s]'))
+        starts, backlog = backlog_series([timeline], date(2025, 3, 5), date(2025, 3, 25), bucket='week')
+        self.assertEqual(backlog.tolist(), [0, 2, 1, 2])
+
+        # Archived tickets folded in extend the history without changing who is open now
+        archived = TicketTimeline(np.array(['2025-03-04 00:00:00'], dtype='datetime64[s]'),
+                                  np.array(['2025-03-18 00:00:00'], dtype='datetime64[s]'))
+        timeline.merge(archived)
+        starts, backlog = backlog_series([timeline], date(2025, 3, 5), date(2025, 3, 25), bucket='week')
+        self.assertEqual(backlog.tolist(), [0, 3, 2, 2])
+        self.assertEqual(len(timeline.open_created), 2)
+
+
+class TestResolutionSamples(unittest.TestCase):
+    """Test suite for picking one close per ticket"""
+
+    def test_latest_close_per_ticket(self):
+        """A ticket read twice counts once, at its latest close; open rows are skipped"""
+        ids = [7, 3, 7, 5]
+        closed_at = np.array(['2025-03-02 10:00:00', '2025-03-01 08:00:00', '2025-03-04 12:00:00', 'NaT'],
+                             dtype='datetime64[s]')
+        self.assertEqual(sorted(final_closes(ids, closed_at).tolist()), [1, 2])
+        self.assertEqual(final_closes([5], np.array(['NaT'], dtype='datetime64[s]')).tolist(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
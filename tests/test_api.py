@@ -0,0 +1,380 @@
+import unittest
+import sqlite3
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add workflow directory to path to import the Flask app
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+import app as workflow_app
+from ratelimit import RateLimiter
+from routing import LoadBalancer
+from archive import archive_closed_tickets
+from repository import SQLiteTicketRepository
+
+
+class TestTicketApi(unittest.TestCase):
+    """Test suite for the ticket API endpoints"""
+
+    def setUp(self):
+        """Point the app at a fresh temporary database and log in"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # Admission control is tested in test_ratelimit.py; a shared limiter would make these
+        # tests depend on each other's traffic, so run them without limits
+        self.default_limiter = workflow_app.rate_limiter
+        workflow_app.rate_limiter = RateLimiter(os.path.join(self.tmp_dir.name, 'ratelimit'), global_rate=0,
+                                                client_limits={})
+        self.db_path = os.path.join(self.tmp_dir.name, 'tickets.db')
+        workflow_app.DB_PATH = self.db_path
+        workflow_app._schema_ready = False
+        workflow_app.analytics_cache.clear()
+        self.client = workflow_app.app.test_client()
+        with self.client.session_transaction() as session:
+            session['username'] = 'admin'
+            session['role'] = 'admin'
+
+    def tearDown(self):
+        workflow_app.ROUTING_MODE = 'fixed'
+        workflow_app.ROUTING_RELOAD_INTERVAL = 0
+        workflow_app.rate_limiter = self.default_limiter
+        self.tmp_dir.cleanup()
+
+    def create_ticket(self, priority='medium', title='Test ticket'):
+        response = self.client.post('/api/tickets', json={
+            'title': title,
+            'description': 'Created by the API test suite',
+            'priority': priority
+        })
+        return response.get_json()['id']
+
+    def test_list_streams_all_rows(self):
+        """Streamed listings decode to the same rows as the table"""
+        self.create_ticket(priority='high', title='Quote " and backslash \\')
+        self.create_ticket(priority='medium', title='Ünïcödé ✓')
+
+        response = self.client.get('/api/tickets')
+        tickets = json.loads(response.get_data())
+
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        expected = [dict(row) for row in conn.execute('SELECT * FROM tickets')]
+        conn.close()
+
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(tickets, expected)
+        self.assertIsNone(tickets[1]['assigned_to'])
+
+    def test_update_returns_committed_state(self):
+        """Updates bump the version and return the stored row"""
+        ticket_id = self.create_ticket(priority='medium')
+
+        response = self.client.put(f'/api/tickets/{ticket_id}', json={'priority': 'high', 'status': 'open'})
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['version'], 2)
+        self.assertEqual(body['status'], 'in_progress')
+        self.assertEqual(body['assigned_to'], 'Senior Analyst')
+        self.assertEqual(response.headers['ETag'], '"2"')
+
+    def test_stale_version_conflicts(self):
+        """Updates pinned to an outdated version are rejected with 409"""
+        ticket_id = self.create_ticket()
+        self.client.put(f'/api/tickets/{ticket_id}', json={'title': 'Renamed'})
+
+        stale_body = self.client.put(f'/api/tickets/{ticket_id}', json={'status': 'closed', 'version': 1})
+        stale_header = self.client.put(f'/api/tickets/{ticket_id}', json={'status': 'closed'},
+                                       headers={'If-Match': '"1"'})
+        current = self.client.put(f'/api/tickets/{ticket_id}', json={'status': 'closed'},
+                                  headers={'If-Match': '"2"'})
+
+        self.assertEqual(stale_body.status_code, 409)
+        self.assertEqual(stale_body.get_json()['current_version'], 2)
+        self.assertEqual(stale_header.status_code, 409)
+        self.assertEqual(current.status_code, 200)
+        self.assertEqual(current.get_json()['status'], 'closed')
+
+        # Body versions sent as strings are compared as numbers
+        as_string = self.client.put(f'/api/tickets/{ticket_id}', json={'title': 'Again', 'version': '3'})
+        self.assertEqual(as_string.status_code, 200)
+        invalid = self.client.put(f'/api/tickets/{ticket_id}', json={'title': 'Again', 'version': 'three'})
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_batch_update_by_ids(self):
+        """Bulk close applies to every listed ticket and reports missing ids"""
+        ids = [self.create_ticket() for _ in range(3)]
+
+        response = self.client.patch('/api/tickets', json={
+            'ids': ids + [9999],
+            'changes': {'status': 'closed'}
+        })
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['updated'], 3)
+        results = {result['id']: result['result'] for result in body['results']}
+        self.assertEqual(results[9999], 'not_found')
+
+        conn = sqlite3.connect(self.db_path)
+        statuses = {row[0] for row in conn.execute('SELECT status FROM tickets')}
+        conn.close()
+        self.assertEqual(statuses, {'closed'})
+
+    def test_batch_update_applies_automation_rules(self):
+        """Low priority tickets moved to in_progress in bulk are assigned to an analyst"""
+        low_id = self.create_ticket(priority='low')
+        self.create_ticket(priority='medium')
+
+        response = self.client.patch('/api/tickets', json={
+            'filter': {'priority': 'low'},
+            'changes': {'status': 'in_progress'}
+        })
+        body = response.get_json()
+
+        self.assertEqual(body['updated'], 1)
+        self.assertEqual(body['results'][0]['id'], low_id)
+        self.assertEqual(body['results'][0]['ticket']['assigned_to'], 'Junior Analyst')
+
+    def test_batch_update_isolates_invalid_items(self):
+        """A change rejected by the schema is reported without aborting the batch"""
+        ids = [self.create_ticket() for _ in range(2)]
+
+        response = self.client.patch('/api/tickets', json={
+            'ids': ids,
+            'changes': {'status': 'not_a_status'}
+        })
+        body = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body['updated'], 0)
+        self.assertTrue(all(result['result'] == 'error' for result in body['results']))
+
+    def test_failed_batch_rolls_back_its_shard(self):
+        """An unexpected error mid-batch leaves neither the database nor the routing counts changed"""
+        workflow_app.ROUTING_MODE = 'least_loaded'
+        workflow_app.load_balancer = LoadBalancer({'high': ['Senior Analyst', 'Team Lead']})
+        ids = [self.create_ticket(priority='high') for _ in range(2)]
+        self.assertEqual(workflow_app.load_balancer.counts, {'Senior Analyst': 1, 'Team Lead': 1})
+
+        calls = []
+
+        def failing_record_resolution(conn, ticket):
+            calls.append(ticket['id'])
+            if len(calls) == 2:
+                raise RuntimeError('sketch store unavailable')
+
+        default_record_resolution = workflow_app.record_resolution
+        workflow_app.record_resolution = failing_record_resolution
+        try:
+            response = self.client.patch('/api/tickets', json={'ids': ids, 'changes': {'status': 'closed'}})
+        finally:
+            workflow_app.record_resolution = default_record_resolution
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(calls, ids)
+        conn = sqlite3.connect(self.db_path)
+        statuses = {row[0] for row in conn.execute('SELECT status FROM tickets')}
+        conn.close()
+        self.assertEqual(statuses, {'in_progress'})
+        self.assertEqual(workflow_app.load_balancer.counts, {'Senior Analyst': 1, 'Team Lead': 1})
+
+        # The shard was closed and unlocked, so the next batch goes through
+        response = self.client.patch('/api/tickets', json={'ids': ids, 'changes': {'status': 'closed'}})
+        self.assertEqual(response.get_json()['updated'], 2)
+        self.assertEqual(workflow_app.load_balancer.counts, {'Senior Analyst': 0, 'Team Lead': 0})
+
+    def test_aging_buckets(self):
+        """Open tickets are bucketed by age and closed tickets are excluded"""
+        now = datetime.now().replace(microsecond=0)
+        conn = workflow_app.get_db_connection()
+        SQLiteTicketRepository(conn).add_many(
+            {'title': 'Aged', 'description': 'Aging test', 'status': status, 'priority': priority,
+             'created_at': now - age, 'updated_at': now}
+            for status, priority, age in [('open', 'low', timedelta(hours=2)), ('in_progress', 'high', timedelta(days=5)),
+                                          ('open', 'low', timedelta(days=45)), ('closed', 'low', timedelta(days=45))])
+        conn.commit()
+        conn.close()
+
+        body = self.client.get('/api/analytics/aging').get_json()
+        counts = {bucket['bucket']: bucket['count'] for bucket in body['buckets']}
+        self.assertEqual(body['open_tickets'], 3)
+        self.assertEqual(counts['< 1 day'], 1)
+        self.assertEqual(counts['3-7 days'], 1)
+        self.assertEqual(counts['30+ days'], 1)
+
+        workflow_app.analytics_cache.clear()
+        low_only = self.client.get('/api/analytics/aging?priority=low').get_json()
+        self.assertEqual(low_only['open_tickets'], 2)
+
+    def test_resolution_percentiles_track_closures(self):
+        """Closing tickets feeds the per-priority and per-assignee sketches"""
+        high_id = self.create_ticket(priority='high')
+        low_id = self.create_ticket(priority='low')
+        self.client.put(f'/api/tickets/{high_id}', json={'status': 'closed'})
+        self.client.patch('/api/tickets', json={'ids': [low_id], 'changes': {'status': 'closed'}})
+        # Re-closing an already closed ticket must not count twice
+        self.client.put(f'/api/tickets/{high_id}', json={'status': 'closed'})
+        # A reopened ticket is counted once, with its final close and assignee
+        self.client.put(f'/api/tickets/{low_id}', json={'status': 'open'})
+        self.client.put(f'/api/tickets/{low_id}', json={'status': 'closed', 'assigned_to': 'Team Lead'})
+
+        rows = self.client.get('/api/analytics/resolution').get_json()
+        counts = {(row['dimension'], row['name']): row['count'] for row in rows}
+
+        self.assertEqual(counts[('all', 'all')], 2)
+        self.assertEqual(counts[('priority', 'high')], 1)
+        self.assertEqual(counts[('assignee', 'SupportBot')], 0)
+        self.assertEqual(counts[('assignee', 'Team Lead')], 1)
+        self.assertIsNotNone(rows[0]['p99'])
+
+    def test_least_loaded_routing(self):
+        """High priority tickets go to whichever senior pool member has the fewest open tickets"""
+        now = datetime.now().replace(microsecond=0)
+        conn = workflow_app.get_db_connection()
+        SQLiteTicketRepository(conn).add({'title': 'Existing', 'description': 'Already assigned', 'status': 'in_progress',
+                                          'priority': 'high', 'created_at': now, 'updated_at': now,
+                                          'assigned_to': 'Senior Analyst'})
+        conn.commit()
+        conn.close()
+
+        workflow_app.ROUTING_MODE = 'least_loaded'
+        workflow_app.load_balancer = LoadBalancer({'high': ['Senior Analyst', 'Team Lead']})
+        workflow_app._schema_ready = False
+
+        first = self.client.post('/api/tickets', json={'title': 'A', 'description': 'A', 'priority': 'high'})
+        second = self.client.post('/api/tickets', json={'title': 'B', 'description': 'B', 'priority': 'high'})
+        self.assertEqual(first.get_json()['assigned_to'], 'Team Lead')
+        self.assertEqual(second.get_json()['assigned_to'], 'Senior Analyst')
+
+        # Closing tickets frees capacity for the next assignment
+        self.client.patch('/api/tickets', json={'filter': {'assigned_to': 'Senior Analyst'}, 'changes': {'status': 'closed'}})
+        third = self.client.post('/api/tickets', json={'title': 'C', 'description': 'C', 'priority': 'high'})
+        self.assertEqual(third.get_json()['assigned_to'], 'Senior Analyst')
+        self.assertEqual(workflow_app.load_balancer.counts, {'Senior Analyst': 1, 'Team Lead': 1})
+
+    def test_routing_counts_reload_other_workers_writes(self):
+        """Tickets written by another process are counted once the reload interval has passed"""
+        workflow_app.ROUTING_MODE = 'least_loaded'
+        workflow_app.ROUTING_RELOAD_INTERVAL = 30
+        workflow_app.load_balancer = LoadBalancer({'high': ['Senior Analyst', 'Team Lead']})
+        first = self.client.post('/api/tickets', json={'title': 'A', 'description': 'A', 'priority': 'high'})
+        self.assertEqual(first.get_json()['assigned_to'], 'Senior Analyst')
+
+        # Another worker assigns two tickets to the Team Lead
+        now = datetime.now().replace(microsecond=0)
+        conn = workflow_app.get_db_connection()
+        SQLiteTicketRepository(conn).add_many(
+            {'title': 'Elsewhere', 'description': 'Routed by another worker', 'status': 'in_progress',
+             'priority': 'high', 'created_at': now, 'updated_at': now, 'assigned_to': 'Team Lead'}
+            for _ in range(2))
+        conn.commit()
+        conn.close()
+
+        second = self.client.post('/api/tickets', json={'title': 'B', 'description': 'B', 'priority': 'high'})
+        self.assertEqual(second.get_json()['assigned_to'], 'Team Lead')
+
+        workflow_app.load_balancer.loaded_at -= 60
+        third = self.client.post('/api/tickets', json={'title': 'C', 'description': 'C', 'priority': 'high'})
+        self.assertEqual(third.get_json()['assigned_to'], 'Senior Analyst')
+        self.assertEqual(workflow_app.load_balancer.counts, {'Senior Analyst': 2, 'Team Lead': 3})
+
+    def test_archived_tickets_stay_readable(self):
+        """Old closed tickets move to month files but are still served by id and by range"""
+        conn = workflow_app.get_db_connection()
+        SQLiteTicketRepository(conn).add_many(
+            {'title': title, 'description': 'Archive test', 'status': status, 'priority': 'low',
+             'created_at': created_at, 'updated_at': updated_at}
+            for title, status, created_at, updated_at in [
+                ('Old closed', 'closed', '2023-01-10 09:00:00', '2023-01-12 09:00:00'),
+                ('Old open', 'open', '2023-01-11 09:00:00', '2023-01-11 09:00:00'),
+                ('Recent closed', 'closed', '2023-03-05 09:00:00', '2099-01-01 00:00:00')])
+        conn.commit()
+        moved = archive_closed_tickets(conn, self.db_path, '2023-06-01 00:00:00')
+        conn.close()
+        self.assertEqual(moved, 1)
+
+        archived = self.client.get('/api/tickets/1')
+        self.assertEqual(archived.status_code, 200)
+        self.assertEqual(archived.get_json()['title'], 'Old closed')
+
+        everything = json.loads(self.client.get('/api/tickets').get_data())
+        self.assertEqual(sorted(ticket['id'] for ticket in everything), [1, 2, 3])
+        january_closed = json.loads(self.client.get(
+            '/api/tickets?status=closed&created_from=2023-01-01&created_to=2023-01-31').get_data())
+        self.assertEqual([ticket['id'] for ticket in january_closed], [1])
+        open_only = json.loads(self.client.get('/api/tickets?status=open').get_data())
+        self.assertEqual([ticket['id'] for ticket in open_only], [2])
+
+    def test_archived_ids_are_not_reused(self):
+        """Tickets created after the highest ids were archived get new ids, and archiving them overwrites nothing"""
+        conn = workflow_app.get_db_connection()
+        SQLiteTicketRepository(conn).add_many(
+            {'title': title, 'description': 'Archive test', 'status': 'closed', 'priority': 'low',
+             'created_at': '2023-01-10 09:00:00', 'updated_at': '2023-01-12 09:00:00'}
+            for title in ['First', 'Second'])
+        conn.commit()
+        self.assertEqual(archive_closed_tickets(conn, self.db_path, '2023-06-01 00:00:00'), 2)
+        conn.close()
+
+        created = self.client.post('/api/tickets', json={'title': 'New', 'description': 'After archiving',
+                                                         'priority': 'medium'}).get_json()
+        self.assertEqual(created['id'], 3)
+        self.assertEqual(self.client.get('/api/tickets/2').get_json()['title'], 'Second')
+
+        # A clash with an archived id (from before ids were tracked) fails instead of overwriting
+        conn = workflow_app.get_db_connection()
+        SQLiteTicketRepository(conn).add({'id': 2, 'title': 'Clash', 'description': 'Reused id', 'status': 'closed',
+                                          'priority': 'low', 'created_at': '2023-01-20 09:00:00',
+                                          'updated_at': '2023-01-21 09:00:00'})
+        conn.commit()
+        with self.assertRaises(sqlite3.IntegrityError):
+            archive_closed_tickets(conn, self.db_path, '2023-06-01 00:00:00')
+        conn.close()
+        self.assertEqual(self.client.get('/api/tickets/2').get_json()['title'], 'Clash')
+        conn = sqlite3.connect(os.path.join(self.tmp_dir.name, 'tickets_archive', 'tickets_2023_01.db'))
+        self.assertEqual(conn.execute('SELECT title FROM tickets WHERE id = 2').fetchone()[0], 'Second')
+        conn.close()
+
+    def test_reopened_ticket_is_not_archived(self):
+        """A ticket reopened after the archiver read its chunk stays in the hot table"""
+        class ReopeningConnection(sqlite3.Connection):
+            def execute(self, sql, *args):
+                result = super().execute(sql, *args)
+                if 'SELECT id FROM main.tickets' in sql:
+                    rows = result.fetchall()
+                    # Another request reopens ticket 1 between the chunk read and the move
+                    super().execute("UPDATE tickets SET status = 'open', updated_at = '2023-07-01 09:00:00' "
+                                    "WHERE id = 1")
+                    return rows
+                return result
+
+        conn = workflow_app.get_db_connection()
+        SQLiteTicketRepository(conn).add_many(
+            {'title': title, 'description': 'Archive race test', 'status': 'closed', 'priority': 'low',
+             'created_at': '2023-01-10 09:00:00', 'updated_at': '2023-01-12 09:00:00'}
+            for title in ('Reopened', 'Stays closed'))
+        conn.commit()
+        conn.close()
+
+        conn = sqlite3.connect(self.db_path, factory=ReopeningConnection)
+        moved = archive_closed_tickets(conn, self.db_path, '2023-06-01 00:00:00')
+        conn.close()
+        self.assertEqual(moved, 1)
+
+        reopened = self.client.get('/api/tickets/1')
+        self.assertEqual(reopened.status_code, 200)
+        self.assertEqual(reopened.get_json()['status'], 'open')
+        self.assertEqual(self.client.put('/api/tickets/1', json={'priority': 'high'}).status_code, 200)
+        open_only = json.loads(self.client.get('/api/tickets?status=open').get_data())
+        self.assertEqual([ticket['id'] for ticket in open_only], [1])
+
+    def test_batch_update_requires_selector(self):
+        """Requests must choose tickets by ids or by filter"""
+        response = self.client.patch('/api/tickets', json={'changes': {'status': 'closed'}})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
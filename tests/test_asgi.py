@@ -0,0 +1,165 @@
+import unittest
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+
+# Add workflow directory to path to import the Flask app
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+import app as workflow_app
+from asgi import AsyncBridge
+from coalescer import AlertCoalescer
+from ratelimit import RateLimiter
+
+
+async def call(asgi_app, method, path, body=None, headers=()):
+    """Send one request through the ASGI interface and collect the response"""
+    path, _, query = path.partition('?')
+    headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    payload = body if isinstance(body, bytes) else b''
+    if body is not None and not isinstance(body, bytes):
+        payload = json.dumps(body).encode('utf-8')
+        headers.append((b'content-type', b'application/json'))
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode('latin-1'),
+             'headers': headers, 'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80)}
+    messages = [{'type': 'http.request', 'body': payload[:10], 'more_body': True},
+                {'type': 'http.request', 'body': payload[10:], 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app(scope, receive, send)
+    start = sent[0]
+    return (start['status'], dict((k.decode(), v.decode()) for k, v in start['headers']),
+            b''.join(message.get('body', b'') for message in sent[1:]))
+
+
+class TestAsyncServing(unittest.TestCase):
+    """Test suite for the ASGI serving mode"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'tickets.db')
+        workflow_app.DB_PATH = self.db_path
+        workflow_app._schema_ready = False
+        workflow_app.coalescer = AlertCoalescer(window=0)
+        # These tests drive bursts from a single client through the bridge; admission control is tested separately
+        self.default_limiter = workflow_app.rate_limiter
+        workflow_app.rate_limiter = RateLimiter(os.path.join(self.tmp_dir.name, 'ratelimit'), global_rate=0,
+                                                client_limits={})
+        self.asgi_app = AsyncBridge(workflow_app.app, max_workers=4)
+
+    def tearDown(self):
+        self.asgi_app.executor.shutdown()
+        workflow_app.rate_limiter = self.default_limiter
+        self.tmp_dir.cleanup()
+
+    def login(self):
+        """Log in through the ASGI app and return the session cookie header"""
+        form = b'username=admin&password=admin123'
+        status, headers, _ = asyncio.run(call(self.asgi_app, 'POST', '/login', form,
+                                              [('Content-Type', 'application/x-www-form-urlencoded')]))
+        self.assertEqual(status, 302)
+        return [('Cookie', headers['set-cookie'].split(';', 1)[0])]
+
+    def test_concurrent_webhooks(self):
+        """Hundreds of concurrent deliveries are all served through a small executor"""
+        async def burst():
+            return await asyncio.gather(*[
+                call(self.asgi_app, 'POST', '/webhook/ticket',
+                     {'title': f'Alert {i}', 'description': f'Distinct alert number {i}'},
+                     headers=[('Idempotency-Key', f'key-{i}')])
+                for i in range(300)
+            ])
+
+        responses = asyncio.run(burst())
+        self.assertEqual({status for status, _, _ in responses}, {201})
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM tickets').fetchone()[0], 300)
+        conn.close()
+
+    def test_same_routes_and_rules(self):
+        """Sessions, automation rules and streamed listings behave as under WSGI"""
+        cookie = self.login()
+
+        status, _, _ = asyncio.run(call(self.asgi_app, 'GET', '/api/tickets'))
+        self.assertEqual(status, 401)
+
+        status, _, body = asyncio.run(call(self.asgi_app, 'POST', '/api/tickets',
+                                           {'title': 'Outage', 'description': 'Down', 'priority': 'high'}, cookie))
+        created = json.loads(body)
+        self.assertEqual(status, 201)
+        self.assertEqual(created['assigned_to'], 'Senior Analyst')
+        self.assertEqual(created['status'], 'in_progress')
+
+        status, headers, body = asyncio.run(call(self.asgi_app, 'GET', '/api/tickets?status=in_progress', headers=cookie))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['content-type'], 'application/json')
+        self.assertEqual([ticket['id'] for ticket in json.loads(body)], [created['id']])
+
+    def test_streamed_listing_moves_between_threads(self):
+        """The bridge may take each chunk of a streamed listing on a different worker thread"""
+        cookie = self.login()
+        for i in range(3):
+            asyncio.run(call(self.asgi_app, 'POST', '/api/tickets',
+                             {'title': f'T{i}', 'description': 'D', 'priority': 'low'}, cookie))
+        environ = AsyncBridge.build_environ({'method': 'GET', 'path': '/api/tickets',
+                                             'headers': [(b'cookie', cookie[0][1].encode('latin-1'))]}, b'')
+        result = workflow_app.app(environ, lambda status, headers, exc_info=None: None)
+        chunks = iter(result)
+        body = []
+        while True:
+            step = []
+            worker = threading.Thread(target=lambda: step.append(next(chunks, None)))
+            worker.start()
+            worker.join()
+            if step[0] is None:
+                break
+            body.append(step[0])
+        result.close()
+        self.assertEqual([ticket['title'] for ticket in json.loads(b''.join(body))], ['T0', 'T1', 'T2'])
+
+    def test_slow_client_does_not_hold_a_worker(self):
+        """While one client is slow to take a streamed body, the only worker keeps serving others"""
+        def streaming_app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return iter([environ['PATH_INFO'].encode('latin-1'), b' done'])
+
+        bridge = AsyncBridge(streaming_app, max_workers=1)
+
+        async def exchange():
+            released = asyncio.Event()
+            slow_sent = []
+
+            async def slow_send(message):
+                if message['type'] == 'http.response.body':
+                    await released.wait()
+                slow_sent.append(message)
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            scope = {'type': 'http', 'method': 'GET', 'path': '/slow', 'query_string': b'', 'headers': []}
+            slow = asyncio.ensure_future(bridge(scope, receive, slow_send))
+            fast = await asyncio.wait_for(call(bridge, 'GET', '/fast'), timeout=5)
+            released.set()
+            await slow
+            return fast, b''.join(message.get('body', b'') for message in slow_sent)
+
+        try:
+            (status, _, body), slow_body = asyncio.run(exchange())
+        finally:
+            bridge.executor.shutdown()
+        self.assertEqual((status, body), (200, b'/fast done'))
+        self.assertEqual(slow_body, b'/slow done')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Add workflow directory to path to import the columnar snapshot
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from columnar import ColumnarSnapshot, filter_tickets
+from repository import SQLiteTicketRepository
+
+
+class TestColumnarSnapshot(unittest.TestCase):
+    """Test suite for the memory-mapped Arrow ticket snapshot"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'tickets.db')
+        self.repository = SQLiteTicketRepository.open(self.db_path)
+        self.add('Open low', 'open', 'low', '2024-03-01 09:00:00')
+        self.add('Closed high', 'closed', 'high', '2024-03-05 10:30:00.250000')
+        self.add('Bad date', 'open', 'high', 'not a date')
+
+    def tearDown(self):
+        self.repository.close()
+        self.tmp_dir.cleanup()
+
+    def add(self, title, status, priority, created_at):
+        self.repository.add({'title': title, 'description': title, 'status': status, 'priority': priority,
+                             'created_at': created_at, 'updated_at': created_at})
+        self.repository.commit()
+
+    def test_snapshot_is_mapped_filtered_and_rebuilt(self):
+        """The file takes timestamps from the epoch columns, filters without pandas and follows database changes"""
+        snapshot = ColumnarSnapshot(self.db_path)
+        table = snapshot.table()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, 'tickets.arrow')))
+        self.assertEqual(table['title'].to_pylist(), ['Open low', 'Closed high', 'Bad date'])
+        # Epoch columns hold whole seconds
+        self.assertEqual(table['created_at'].to_pylist(),
+                         [datetime(2024, 3, 1, 9), datetime(2024, 3, 5, 10, 30), None])
+        self.assertIs(snapshot.table(), table)
+
+        high = filter_tickets(table, priorities=['high'], created_from=datetime(2024, 3, 2))
+        self.assertEqual(high['title'].to_pylist(), ['Closed high'])
+        self.assertEqual(filter_tickets(table, statuses=['open'])['title'].to_pylist(), ['Open low', 'Bad date'])
+
+        # A second reader (another session or process) maps the same file without rebuilding it
+        built_at = os.stat(snapshot.columnar_path).st_mtime_ns
+        self.assertEqual(ColumnarSnapshot(self.db_path).table().num_rows, 3)
+        self.assertEqual(os.stat(snapshot.columnar_path).st_mtime_ns, built_at)
+
+        time.sleep(0.01)
+        self.add('New', 'in_progress', 'medium', '2024-03-06 08:00:00')
+        self.assertEqual(snapshot.table()['title'].to_pylist()[-1], 'New')
+        # The old mapping is still readable by sessions that hold it
+        self.assertEqual(table.num_rows, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import sqlite3
+import os
+import sys
+import tempfile
+
+# Add workflow directory to path to import the epoch migration
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from analytics import build_timelines
+from archive import archive_closed_tickets, iter_archived_rows
+from epoch_migration import migrate_to_epoch
+from repository import SQLiteTicketRepository, filter_clause
+from schema import TICKETS_TABLE, ensure_schema, epoch_ready
+
+
+class TestEpochMigration(unittest.TestCase):
+    """Test suite for the online migration to integer epoch timestamps"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'tickets.db')
+        self.archive_dir = os.path.join(self.tmp_dir.name, 'archive')
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+
+        # A database from before the epoch columns, with the timestamp formats found in the wild
+        self.conn.execute(TICKETS_TABLE)
+        self.conn.executemany('''
+        INSERT INTO tickets (title, description, status, priority, created_at, updated_at)
+        VALUES (?, 'Legacy ticket', ?, 'low', ?, ?)
+        ''', [
+            ('App format', 'open', '2024-03-01 09:00:00', '2024-03-01 09:00:00'),
+            ('ISO format', 'open', '2024-03-05T10:30:00', '2024-03-06T08:00:00'),
+            ('Microseconds', 'in_progress', '2024-03-07 23:59:59.500000', '2024-03-08 01:00:00.000001'),
+            ('Bad date', 'open', 'not a date', 'not a date'),
+            ('Closed long ago', 'closed', '2024-01-10 12:00:00', '2024-01-11 12:00:00'),
+        ])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp_dir.cleanup()
+
+    def epochs(self, table='tickets'):
+        return {row['title']: (row['created_epoch'], row['updated_epoch'])
+                for row in self.conn.execute(f'SELECT title, created_epoch, updated_epoch FROM {table}')}
+
+    def test_backfill_indexes_and_switches_reads(self):
+        """Rows are backfilled in chunks while writes continue, and reads then compare integers"""
+        ensure_schema(self.conn)
+        self.assertFalse(epoch_ready(self.conn))
+        legacy = SQLiteTicketRepository(self.conn)
+        self.assertFalse(legacy.epoch)
+        self.assertEqual(legacy.count(created_from='2024-03-05', created_to='2024-03-07'), 2)
+        archive_closed_tickets(self.conn, self.db_path, '2024-02-01', self.archive_dir)
+
+        # Writers during the migration fill in their own rows, through the repository or not
+        self.conn.execute('''
+        INSERT INTO tickets (title, description, status, priority, created_at, updated_at)
+        VALUES ('Written raw', 'New ticket', 'open', 'high', '2024-03-06 12:00:00', '2024-03-06 12:00:00')
+        ''')
+        self.conn.commit()
+        self.assertEqual(self.epochs()['Written raw'], (1709726400, 1709726400))
+        self.assertEqual(self.epochs()['App format'], (None, None))
+
+        reports = migrate_to_epoch(self.conn, self.db_path, self.archive_dir, chunk_size=2,
+                                   checkpoint_path=os.path.join(self.tmp_dir.name, 'epoch.checkpoint.json'))
+        self.assertEqual([(report['processed'], report['changed']) for report in reports], [(4, 3), (1, 1)])
+        self.assertTrue(epoch_ready(self.conn))
+        self.assertEqual(self.epochs(), {
+            'App format': (1709283600, 1709283600),
+            'ISO format': (1709634600, 1709712000),
+            'Microseconds': (1709855999, 1709859600),
+            'Bad date': (None, None),
+            'Written raw': (1709726400, 1709726400),
+        })
+        self.assertEqual(migrate_to_epoch(self.conn, self.db_path, self.archive_dir), [])
+
+        repository = SQLiteTicketRepository(self.conn)
+        self.assertTrue(repository.epoch)
+        self.assertEqual([ticket['title'] for ticket in repository.find(created_from='2024-03-05',
+                                                                        created_to='2024-03-07',
+                                                                        order_by='created_at')],
+                         ['ISO format', 'Written raw', 'Microseconds'])
+        where, params = filter_clause(created_from='2024-03-05', epoch=True)
+        plan = " ".join(row[3] for row in self.conn.execute(f'EXPLAIN QUERY PLAN SELECT id FROM tickets {where}',
+                                                             params))
+        self.assertIn('idx_tickets_created_epoch', plan)
+
+        # Timelines take the integers as they are
+        self.assertIsInstance(repository.timeline_rows()[0][2], int)
+        self.assertEqual(len(build_timelines(repository.timeline_rows())['low'].created), 4)
+
+        # Updates return the new epochs, and other writers' updates are followed by the trigger
+        ticket = repository.update(1, {'updated_at': '2024-03-02 09:00:00'})
+        self.assertEqual(ticket['updated_epoch'], 1709370000)
+        self.conn.execute("UPDATE tickets SET updated_at = '2024-03-03 09:00:00' WHERE id = 1")
+        self.assertEqual(self.epochs()['App format'], (1709283600, 1709456400))
+
+        # Archive files were backfilled too
+        archived = [row for chunk in iter_archived_rows(self.conn, self.archive_dir, ['2024-01'],
+                                                       *filter_clause(created_to='2024-01-31', epoch=True),
+                                                       columns=['title', 'created_epoch']) for row in chunk]
+        self.assertEqual([tuple(row) for row in archived], [('Closed long ago', 1704888000)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import sqlite3
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add workflow directory to path to import the integrity scanner
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from integrity import default_rules, scan_connection, scan_database
+
+
+class TestIntegrityScanner(unittest.TestCase):
+    """Test suite for the ticket integrity scanner"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'tickets.db')
+        recent = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+        old = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d %H:%M:%S')
+
+        # Healthy tickets with a few rule violations at known ids
+        rows = [(i, 'open', 'medium', recent, recent, None) for i in range(1, 201)]
+        rows[9] = (10, 'closed', 'low', old, old, 'Team Lead')
+        rows[49] = (50, 'in_progress', 'medium', recent, recent, None)
+        rows[99] = (100, 'in_progress', 'high', recent, recent, 'Junior Analyst')
+        rows[149] = (150, 'open', 'low', recent, old, 'SupportBot')
+        rows[199] = (200, 'closed', 'medium', old, old, 'Senior Analyst')
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+        CREATE TABLE tickets (id INTEGER PRIMARY KEY, title TEXT, description TEXT, status TEXT,
+                              priority TEXT, created_at DATETIME, updated_at DATETIME, assigned_to TEXT)
+        ''')
+        conn.executemany('''
+        INSERT INTO tickets (id, title, description, status, priority, created_at, updated_at, assigned_to)
+        VALUES (?, 'Scan test', 'Integrity scanner test', ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_reports_violating_ids_and_counts(self):
+        """Each rule reports exactly the tickets that break it"""
+        report = scan_database(self.db_path, workers=2, partitions=7)
+        rules = report['rules']
+
+        self.assertEqual(report['scanned'], 200)
+        self.assertEqual(rules['stale_closed']['ids'], [10, 200])
+        self.assertEqual(rules['in_progress_unassigned']['ids'], [50])
+        self.assertEqual(rules['high_priority_not_senior']['ids'], [100])
+        self.assertEqual(rules['updated_before_created']['ids'], [150])
+        self.assertEqual(rules['required_fields']['count'], 0)
+        self.assertEqual(report['violations'], 5)
+
+    def test_partitioned_scan_matches_single_pass(self):
+        """Splitting the id range does not change the result, and samples are capped"""
+        conn = sqlite3.connect(self.db_path)
+        single = scan_connection(conn, default_rules(), sample_size=1)
+        conn.close()
+        partitioned = scan_database(self.db_path, workers=3, partitions=13, sample_size=1)
+
+        self.assertEqual(partitioned['rules'], single['rules'])
+        self.assertEqual(partitioned['rules']['stale_closed'], {
+            'description': single['rules']['stale_closed']['description'], 'count': 2, 'ids': [10]
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
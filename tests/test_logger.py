@@ -0,0 +1,49 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+# Add workflow directory to path to import the logger
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from logger import BatchedLogger
+
+
+class TestBatchedLogger(unittest.TestCase):
+    """Test suite for the batched logger"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read_entries(self, logger):
+        if not os.path.exists(logger.log_file):
+            return []
+        with open(logger.log_file) as f:
+            return [line for line in f if line.startswith('[')]
+
+    def test_entries_are_written_in_batches(self):
+        """Info entries wait for a full batch or the interval; warnings flush at once"""
+        logger = BatchedLogger(log_dir=self.tmp_dir.name, max_batch=3, flush_interval=0.2)
+        logger.info("first")
+        logger.info("second")
+        self.assertEqual(self.read_entries(logger), [])
+        logger.info("third")
+        self.assertEqual(len(self.read_entries(logger)), 3)
+
+        logger.info("fourth")
+        logger.warning("fifth")
+        self.assertEqual(len(self.read_entries(logger)), 5)
+
+        logger.info("sixth")
+        time.sleep(0.5)
+        entries = self.read_entries(logger)
+        self.assertEqual(len(entries), 6)
+        self.assertIn("[INFO] sixth", entries[-1])
+        self.assertEqual(os.listdir(self.tmp_dir.name), [os.path.basename(logger.log_file)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import sqlite3
+import os
+import sys
+import tempfile
+
+# Add workflow directory to path to import the maintenance runner
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from maintenance import ChunkedJob
+
+
+class TestChunkedJob(unittest.TestCase):
+    """Test suite for the chunked maintenance job runner"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmp_dir.name, 'job.checkpoint.json')
+        self.conn = sqlite3.connect(os.path.join(self.tmp_dir.name, 'tickets.db'))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('CREATE TABLE tickets (id INTEGER PRIMARY KEY, status TEXT, assigned_to TEXT)')
+        self.conn.executemany('INSERT INTO tickets (status) VALUES (?)',
+                              [('closed' if i % 2 else 'open',) for i in range(1, 26)])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmp_dir.cleanup()
+
+    def make_job(self, apply):
+        return ChunkedJob('assign_closed', where="status = 'closed' AND assigned_to IS NULL",
+                          apply=apply, columns='id', chunk_size=4, checkpoint_path=self.checkpoint_path)
+
+    @staticmethod
+    def assign(conn, rows):
+        conn.executemany("UPDATE tickets SET assigned_to = 'SupportBot' WHERE id = ?",
+                         [(row['id'],) for row in rows])
+
+    def test_processes_all_rows_in_chunks(self):
+        """Every matching row is updated, chunk by chunk, and the checkpoint is cleared"""
+        report = self.make_job(self.assign).run(self.conn)
+
+        self.assertEqual(report['processed'], 13)
+        self.assertEqual(report['chunks'], 4)
+        self.assertEqual(self.conn.execute(
+            "SELECT COUNT(*) FROM tickets WHERE assigned_to = 'SupportBot'").fetchone()[0], 13)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_resumes_after_failure(self):
+        """A failed chunk rolls back and the rerun continues after the last committed chunk"""
+        seen = []
+
+        def fail_on_third_chunk(conn, rows):
+            seen.append([row['id'] for row in rows])
+            if len(seen) == 3:
+                raise RuntimeError("interrupted")
+            self.assign(conn, rows)
+
+        with self.assertRaises(RuntimeError):
+            self.make_job(fail_on_third_chunk).run(self.conn)
+        self.assertEqual(self.conn.execute(
+            "SELECT COUNT(*) FROM tickets WHERE assigned_to = 'SupportBot'").fetchone()[0], 8)
+
+        resumed = []
+        report = self.make_job(lambda conn, rows: resumed.append(rows) or self.assign(conn, rows)).run(self.conn)
+        self.assertEqual(resumed[0][0]['id'], seen[2][0])
+        self.assertEqual(report['processed'], 13)
+        self.assertEqual(self.conn.execute(
+            "SELECT COUNT(*) FROM tickets WHERE assigned_to IS NULL AND status = 'closed'").fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import os
+import subprocess
+import sys
+import tempfile
+
+# Add workflow directory to path to import the Flask app
+WORKFLOW_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow')
+sys.path.append(WORKFLOW_DIR)
+import app as workflow_app
+from coalescer import AlertCoalescer
+from idempotency import WebhookDeduplicator
+from ratelimit import RateLimiter
+
+
+class TestRateLimiting(unittest.TestCase):
+    """Test suite for admission control"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.bucket_path = os.path.join(self.tmp_dir.name, 'ratelimit')
+        workflow_app.DB_PATH = os.path.join(self.tmp_dir.name, 'tickets.db')
+        workflow_app._schema_ready = False
+        workflow_app.coalescer = AlertCoalescer(window=0)
+        workflow_app.deduplicator = WebhookDeduplicator()
+        self.client = workflow_app.app.test_client()
+        self.default_limiter = workflow_app.rate_limiter
+
+    def tearDown(self):
+        workflow_app.rate_limiter = self.default_limiter
+        self.tmp_dir.cleanup()
+
+    def test_client_buckets_are_shared_across_processes(self):
+        """Tokens taken by another process count against the same client"""
+        script = (f"import sys; sys.path.insert(0, {WORKFLOW_DIR!r}); from ratelimit import RateLimiter; "
+                  f"limiter = RateLimiter({self.bucket_path!r}, 0, {{'bulk': 1}}, burst_seconds=3); "
+                  f"print([limiter.admit('integration', 'bulk') for _ in range(4)])")
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "[None, None, None, (429, 1)]")
+
+        limiter = RateLimiter(self.bucket_path, 0, {'bulk': 1}, burst_seconds=3)
+        self.assertEqual(limiter.admit('integration', 'bulk'), (429, 1))
+        self.assertIsNone(limiter.admit('another integration', 'bulk'))
+        self.assertEqual(limiter.rejected, {'client': 1, 'shed': 0})
+
+    def test_shed_requests_do_not_use_client_quota(self):
+        """A client retrying while bulk traffic is shed keeps getting 503, not 429"""
+        limiter = RateLimiter(self.bucket_path, global_rate=1, client_limits={'bulk': 1},
+                              reserves={'bulk': 0.5}, burst_seconds=2)
+        self.assertEqual([limiter.admit('integration', 'bulk') for _ in range(4)],
+                         [None, (503, 1), (503, 1), (503, 1)])
+        self.assertEqual(limiter.rejected, {'client': 0, 'shed': 3})
+
+    def test_bulk_traffic_is_shed_before_interactive(self):
+        """Once bulk traffic has used its share of global capacity it gets 503s while analysts are still served"""
+        workflow_app.rate_limiter = RateLimiter(self.bucket_path, global_rate=5,
+                                                client_limits={'interactive': 100, 'bulk': 100},
+                                                reserves={'bulk': 0.5}, burst_seconds=2)
+        with self.client.session_transaction() as session:
+            session['username'] = 'admin'
+            session['role'] = 'admin'
+
+        statuses = [self.client.post('/webhook/ticket', json={'title': f'Alert {i}', 'description': f'Storm {i}'})
+                    for i in range(6)]
+        self.assertEqual([response.status_code for response in statuses], [201] * 5 + [503])
+        self.assertEqual(statuses[-1].headers['Retry-After'], '1')
+        self.assertEqual(statuses[-1].get_json()['error'], "Service overloaded, retry later")
+
+        # Interactive requests may use the reserved half of the global burst
+        self.assertEqual(self.client.get('/api/tickets/1').status_code, 200)
+        self.assertEqual(self.client.put('/api/tickets/1', json={'status': 'closed'}).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
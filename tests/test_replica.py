@@ -0,0 +1,80 @@
+import unittest
+import sqlite3
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add workflow directory to path to import the replica module
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from replica import SnapshotReader, refresh_snapshot, snapshot_info
+
+
+class TestSnapshotReplica(unittest.TestCase):
+    """Test suite for the dashboard read snapshot"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.tmp_dir.name, 'live.db')
+        self.snapshot_path = os.path.join(self.tmp_dir.name, 'snapshot.db')
+        self.source = sqlite3.connect(self.source_path)
+        self.source.execute('CREATE TABLE tickets (id INTEGER PRIMARY KEY, title TEXT)')
+        self.source.executemany('INSERT INTO tickets (title) VALUES (?)', [('x' * 500,) for _ in range(2000)])
+        self.source.commit()
+
+    def tearDown(self):
+        self.source.close()
+        self.tmp_dir.cleanup()
+
+    def count(self, conn):
+        return conn.execute('SELECT COUNT(*) FROM tickets').fetchone()[0]
+
+    def test_reader_follows_refreshes(self):
+        """Readers see a complete snapshot and switch to the next one after a refresh"""
+        refresh_snapshot(self.source_path, self.snapshot_path, pages=8)
+        reader = SnapshotReader(self.snapshot_path)
+        first = reader.connection()
+        self.assertEqual(self.count(first), 2000)
+        self.assertEqual(snapshot_info(first)[0], os.path.abspath(self.source_path))
+        self.assertLess(reader.staleness(), 60)
+
+        self.source.execute("INSERT INTO tickets (title) VALUES ('new')")
+        self.source.commit()
+        self.assertEqual(self.count(reader.connection()), 2000)
+
+        refresh_snapshot(self.source_path, self.snapshot_path, pages=8)
+        self.assertEqual(self.count(reader.connection()), 2001)
+        # Connections opened on the old snapshot keep their consistent view
+        self.assertEqual(self.count(first), 2000)
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ['live.db', 'snapshot.db'])
+
+    def test_writers_proceed_during_backup(self):
+        """The live database stays writable while a snapshot is being copied"""
+        done = threading.Event()
+        writes = []
+
+        def write_while_copying():
+            writer = sqlite3.connect(self.source_path, timeout=1)
+            while not done.is_set():
+                writer.execute("INSERT INTO tickets (title) VALUES ('concurrent')")
+                writer.commit()
+                writes.append(1)
+                time.sleep(0.001)
+            writer.close()
+
+        thread = threading.Thread(target=write_while_copying)
+        thread.start()
+        try:
+            refresh_snapshot(self.source_path, self.snapshot_path, pages=4, pause=0.001)
+        finally:
+            done.set()
+            thread.join()
+
+        self.assertGreater(len(writes), 0)
+        snapshot = SnapshotReader(self.snapshot_path).connection()
+        self.assertGreaterEqual(self.count(snapshot), 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
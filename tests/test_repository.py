@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add workflow directory to path to import the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+from repository import open_repository
+
+
+def make_ticket(title, status='open', priority='low', created_at='2024-03-01 09:00:00', assigned_to=None):
+    return {'title': title, 'description': f'{title} description', 'status': status, 'priority': priority,
+            'created_at': created_at, 'updated_at': created_at, 'assigned_to': assigned_to}
+
+
+class TestTicketRepository(unittest.TestCase):
+    """Every repository backend honours the same contract"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.targets = ['memory', ':memory:', os.path.join(self.tmp_dir.name, 'tickets.db')]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def for_each_backend(self, check):
+        for target in self.targets:
+            with self.subTest(backend=target):
+                repository = open_repository(target)
+                try:
+                    check(repository)
+                finally:
+                    repository.close()
+
+    def test_add_get_and_update(self):
+        """Ids are allocated above the floor, and updates bump the version unless it is stale"""
+        def check(repository):
+            first = repository.add(make_ticket('First'))
+            second = repository.add(make_ticket('Second'), id_floor=1000)
+            self.assertEqual((first, second), (1, 1001))
+            self.assertEqual(repository.add_many([make_ticket('Third'), {**make_ticket('Fourth'), 'id': 5000}]), 2)
+            repository.commit()
+
+            ticket = repository.get(second)
+            self.assertEqual((ticket['title'], ticket['version'], ticket['occurrence_count']), ('Second', 1, 1))
+            self.assertIsNone(repository.get(99))
+            self.assertEqual(sorted(ticket['title'] for ticket in repository.get_many([5000, first, 99])),
+                             ['First', 'Fourth'])
+
+            updated = repository.update(first, {'status': 'closed', 'assigned_to': 'Team Lead'}, expected_version=1)
+            self.assertEqual((updated['status'], updated['assigned_to'], updated['version']), ('closed', 'Team Lead', 2))
+            self.assertIsNone(repository.update(first, {'status': 'open'}, expected_version=1))
+            self.assertIsNone(repository.update(99, {'status': 'open'}))
+            with self.assertRaises(ValueError):
+                repository.update(first, {'version': 7})
+            self.assertEqual(repository.get(first)['status'], 'closed')
+
+            # Re-fired alerts count against open tickets without changing the version
+            seen = repository.record_occurrence(second, '2024-03-02 10:00:00')
+            self.assertEqual((seen['occurrence_count'], seen['last_seen_at'], seen['version']),
+                             (2, '2024-03-02 10:00:00', 1))
+            self.assertIsNone(repository.record_occurrence(first, '2024-03-02 10:00:00'))
+        self.for_each_backend(check)
+
+    def test_filters_ranges_and_aggregates(self):
+        """Filters, created_at ranges, orderings and counts agree across backends"""
+        def check(repository):
+            repository.add_many([
+                make_ticket('A', 'open', 'high', '2024-03-02 10:00:00', 'Senior Analyst'),
+                make_ticket('B', 'closed', 'low', '2024-03-01 09:00:00', 'SupportBot'),
+                make_ticket('C', 'open', 'low', '2024-03-03 23:59:59', 'SupportBot'),
+                make_ticket('D', 'in_progress', 'low', '2024-03-01 09:00:00'),
+                make_ticket('E', 'open', 'medium', '2024-03-04 00:00:00'),
+            ])
+            repository.commit()
+
+            by_created = [ticket['title'] for ticket in repository.find(order_by='created_at')]
+            self.assertEqual(by_created, ['B', 'D', 'A', 'C', 'E'])
+            in_range = repository.find(created_from='2024-03-02', created_to='2024-03-03', order_by='id')
+            self.assertEqual([ticket['title'] for ticket in in_range], ['A', 'C'])
+            self.assertEqual(sorted(ticket['title'] for ticket in repository.find({'status': 'open', 'priority': 'low'})),
+                             ['C'])
+            self.assertEqual(sorted(ticket['title'] for ticket in repository.find({'assigned_to': None})), ['D', 'E'])
+
+            self.assertEqual(repository.count(), 5)
+            self.assertEqual(repository.count({'status': 'open'}), 3)
+            self.assertEqual(repository.count({'priority': 'low'}, created_to='2024-03-01'), 2)
+            self.assertEqual(repository.open_counts_by_assignee(), {'Senior Analyst': 1, 'SupportBot': 1})
+            self.assertEqual(len(repository.timeline_rows()), 5)
+
+            columns, rows = repository.records(['id', 'title'], order_by='id', limit=2)
+            self.assertEqual((columns, rows), (['id', 'title'], [(1, 'A'), (2, 'B')]))
+            with self.assertRaises(ValueError):
+                repository.find({'title': 'A'})
+        self.for_each_backend(check)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+WORKFLOW_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow')
+sys.path.append(WORKFLOW_DIR)
+from traffic import HttpClient
+
+
+class TestLauncher(unittest.TestCase):
+    """Test suite for the production launcher"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.env = {**os.environ, 'TICKETS_DB': os.path.join(self.tmp_dir.name, 'tickets.db'),
+                    'REPLICA_PATH': os.path.join(self.tmp_dir.name, 'snapshot.db'),
+                    'RATE_LIMIT_PATH': os.path.join(self.tmp_dir.name, 'ratelimit'), 'PYTHONUNBUFFERED': '1'}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_import_has_no_side_effects(self):
+        """Importing the app creates no files or directories"""
+        work_dir = os.path.join(self.tmp_dir.name, 'cwd')
+        os.makedirs(work_dir)
+        subprocess.run([sys.executable, '-c', f"import sys; sys.path.insert(0, {WORKFLOW_DIR!r}); import app"],
+                       cwd=work_dir, env=self.env, check=True)
+        self.assertEqual(os.listdir(work_dir), [])
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ['cwd'])
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "the launcher pre-forks")
+    def test_workers_serve_reload_and_stop(self):
+        """Workers report readiness, survive a graceful reload that re-imports the app, and stop on SIGTERM"""
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        log_path = os.path.join(self.tmp_dir.name, 'launcher.log')
+        with open(log_path, 'w') as log:
+            launcher = subprocess.Popen([sys.executable, os.path.join(WORKFLOW_DIR, 'serve.py'),
+                                         '--port', str(port), '--workers', '2'],
+                                        cwd=self.tmp_dir.name, env=self.env, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            self.wait_for(log_path, 'workers x 4 threads serving')
+            client = HttpClient(f'http://127.0.0.1:{port}')
+            self.assertEqual(client.send('POST', '/api/tickets', {}, {},
+                                         {'title': 'A', 'description': 'B', 'priority': 'low'}), 201)
+
+            launcher.send_signal(signal.SIGHUP)
+            self.wait_for(log_path, 'Reloaded: 2 new workers ready')
+            self.assertEqual(client.send('GET', '/api/tickets/1', {}, {}, None), 200)
+        finally:
+            launcher.send_signal(signal.SIGTERM)
+            self.assertEqual(launcher.wait(timeout=30), 0)
+
+        with open(log_path) as f:
+            output = f.read()
+        # The reload re-executed the launcher, so the app (and any deployed change) was imported again
+        self.assertEqual(output.count('App imported in'), 2)
+        self.assertRegex(output, r'Worker 1 \(pid \d+\) ready in [\d.]+s \(warm-up [\d.]+s\), RSS [\d.]+ MB')
+        self.assertIn('All workers stopped', output)
+
+    def wait_for(self, log_path, text, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with open(log_path) as f:
+                if text in f.read():
+                    return
+            time.sleep(0.1)
+        self.fail(f"'{text}' not logged within {timeout}s")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+
+# Add workflow directory to path to import the Flask app
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+import app as workflow_app
+from ratelimit import RateLimiter
+from coalescer import AlertCoalescer
+from idempotency import WebhookDeduplicator
+from replica import refresh_snapshot
+from sharding import SHARD_SPAN, shard_of, shard_paths
+
+
+class TestShardedTickets(unittest.TestCase):
+    """Test suite for tickets spread over several database files"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # Admission control is tested in test_ratelimit.py; a shared limiter would make these
+        # tests depend on each other's traffic, so run them without limits
+        self.default_limiter = workflow_app.rate_limiter
+        workflow_app.rate_limiter = RateLimiter(os.path.join(self.tmp_dir.name, 'ratelimit'), global_rate=0,
+                                                client_limits={})
+        self.db_path = os.path.join(self.tmp_dir.name, 'tickets.db')
+        workflow_app.DB_PATH = self.db_path
+        workflow_app.SHARD_COUNT = 3
+        workflow_app._schema_ready = False
+        workflow_app.analytics_cache.clear()
+        workflow_app.deduplicator = WebhookDeduplicator()
+        workflow_app.coalescer = AlertCoalescer(window=0)
+        self.client = workflow_app.app.test_client()
+        with self.client.session_transaction() as session:
+            session['username'] = 'admin'
+            session['role'] = 'admin'
+
+    def tearDown(self):
+        workflow_app.SHARD_COUNT = 1
+        workflow_app._schema_ready = False
+        workflow_app.rate_limiter = self.default_limiter
+        self.tmp_dir.cleanup()
+
+    def create_tickets(self, count):
+        return [self.client.post('/api/tickets', json={
+            'title': f'Ticket {i}', 'description': f'Sharding test {i}', 'priority': ('low', 'medium', 'high')[i % 3]
+        }).get_json() for i in range(count)]
+
+    def test_ids_route_to_their_shard(self):
+        """Ids name their shard, and reads, updates and listings span every shard"""
+        created = self.create_tickets(30)
+        shards = {shard_of(ticket['id']) for ticket in created}
+        self.assertEqual(shards, {0, 1, 2})
+        for ticket in created:
+            self.assertGreater(ticket['id'], shard_of(ticket['id']) * SHARD_SPAN)
+
+        # Each file holds exactly the tickets whose ids name it
+        for shard, path in enumerate(shard_paths(self.db_path, 3)):
+            conn = sqlite3.connect(path)
+            ids = {row[0] for row in conn.execute('SELECT id FROM tickets')}
+            conn.close()
+            self.assertEqual(ids, {ticket['id'] for ticket in created if shard_of(ticket['id']) == shard})
+
+        target = next(ticket for ticket in created if shard_of(ticket['id']) == 2)
+        self.assertEqual(self.client.get(f"/api/tickets/{target['id']}").get_json()['title'], target['title'])
+        updated = self.client.put(f"/api/tickets/{target['id']}", json={'status': 'closed'})
+        self.assertEqual(updated.get_json()['version'], 2)
+        self.assertEqual(self.client.get(f'/api/tickets/{7 * SHARD_SPAN + 1}').status_code, 404)
+
+        listed = json.loads(self.client.get('/api/tickets').get_data())
+        self.assertEqual(sorted(ticket['id'] for ticket in listed), sorted(ticket['id'] for ticket in created))
+        self.assertEqual(listed, sorted(listed, key=lambda ticket: (ticket['created_at'], ticket['id'])))
+        closed = json.loads(self.client.get('/api/tickets?status=closed').get_data())
+        self.assertEqual([ticket['id'] for ticket in closed], [target['id']])
+
+        # A batch by ids touches every shard it names
+        ids = [ticket['id'] for ticket in created if ticket['priority'] == 'low']
+        body = self.client.patch('/api/tickets', json={'ids': ids + [5 * SHARD_SPAN], 'changes': {'status': 'closed'}}).get_json()
+        self.assertEqual(body['updated'], len(ids))
+        self.assertEqual(body['results'][-1], {'id': 5 * SHARD_SPAN, 'result': 'not_found'})
+
+        # Aggregates combine every shard
+        aging = self.client.get('/api/analytics/aging').get_json()
+        self.assertEqual(aging['open_tickets'], 30 - len(ids) - 1)
+        resolution = self.client.get('/api/analytics/resolution?dimension=all').get_json()
+        self.assertEqual(resolution[0]['count'], len(ids) + 1)
+
+    def test_webhook_duplicates_and_snapshot(self):
+        """Re-fired alerts find their ticket on its shard, and snapshots merge all shards"""
+        payloads = [{'title': f'Disk full on host {i}', 'description': f'Volume {i} at 100%'} for i in range(12)]
+        first = [self.client.post('/webhook/ticket', json=payload) for payload in payloads]
+        self.assertEqual({response.status_code for response in first}, {201})
+
+        # A fresh process rebuilds its duplicate filter from every shard
+        workflow_app.deduplicator = WebhookDeduplicator()
+        again = [self.client.post('/webhook/ticket', json=payload) for payload in payloads]
+        self.assertEqual({response.status_code for response in again}, {200})
+        self.assertEqual([response.get_json()['id'] for response in again],
+                         [response.get_json()['id'] for response in first])
+
+        snapshot_path = os.path.join(self.tmp_dir.name, 'snapshot.db')
+        refresh_snapshot(self.db_path, snapshot_path, merge_sources=shard_paths(self.db_path, 3)[1:])
+        conn = sqlite3.connect(snapshot_path)
+        self.assertEqual(conn.execute('SELECT COUNT(*) FROM tickets').fetchone()[0], 12)
+        conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add workflow directory to path to import the Flask app
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+import app as workflow_app
+from ratelimit import RateLimiter
+from repository import SQLiteTicketRepository
+from sla import SLAMonitor, TimerWheel
+
+
+class TestTimerWheel(unittest.TestCase):
+    """Test suite for the hierarchical timer wheel"""
+
+    def test_timers_fire_on_time_across_levels(self):
+        """Timers due in seconds, minutes and hours all fire at their deadline"""
+        wheel = TimerWheel(tick=1, start=0)
+        wheel.schedule('soon', 5)
+        wheel.schedule('later', 125)
+        wheel.schedule('much_later', 7300)
+
+        self.assertEqual(wheel.advance(4), [])
+        self.assertEqual(wheel.advance(5), ['soon'])
+        self.assertEqual(wheel.advance(124), [])
+        self.assertEqual(wheel.advance(125), ['later'])
+        self.assertEqual(wheel.advance(7299), [])
+        self.assertEqual(wheel.advance(7300), ['much_later'])
+
+    def test_reschedule_and_cancel(self):
+        """Only the latest schedule counts and cancelled timers never fire"""
+        wheel = TimerWheel(tick=1, start=0)
+        wheel.schedule('moved', 10)
+        wheel.schedule('moved', 90)
+        wheel.schedule('cancelled', 20)
+        wheel.cancel('cancelled')
+
+        self.assertEqual(wheel.advance(60), [])
+        self.assertEqual(wheel.advance(90), ['moved'])
+        self.assertEqual(len(wheel), 0)
+
+
+class TestSLAMonitor(unittest.TestCase):
+    """Test suite for SLA breach escalation"""
+
+    def setUp(self):
+        """Point the app at a fresh temporary database"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # Admission control is tested in test_ratelimit.py; a shared limiter would make these
+        # tests depend on each other's traffic, so run them without limits
+        self.default_limiter = workflow_app.rate_limiter
+        workflow_app.rate_limiter = RateLimiter(os.path.join(self.tmp_dir.name, 'ratelimit'), global_rate=0,
+                                                client_limits={})
+        workflow_app.DB_PATH = os.path.join(self.tmp_dir.name, 'tickets.db')
+        workflow_app._schema_ready = False
+        self.monitor = SLAMonitor(workflow_app.get_db_connection, sla_hours={'high': 4, 'medium': 24, 'low': 72},
+                                  actions=('log', 'reassign'), escalate_to='Team Lead')
+
+    def tearDown(self):
+        workflow_app.rate_limiter = self.default_limiter
+        self.tmp_dir.cleanup()
+
+    def insert_ticket(self, priority, status, hours_ago):
+        updated_at = (datetime.now() - timedelta(hours=hours_ago)).strftime('%Y-%m-%d %H:%M:%S')
+        conn = workflow_app.get_db_connection()
+        ticket_id = SQLiteTicketRepository(conn).add({'title': 'SLA test', 'description': 'SLA test', 'status': status,
+                                                      'priority': priority, 'created_at': updated_at,
+                                                      'updated_at': updated_at, 'assigned_to': 'Junior Analyst'})
+        conn.commit()
+        conn.close()
+        return ticket_id
+
+    def test_breached_tickets_are_reassigned(self):
+        """Only tickets past their priority's SLA are escalated"""
+        breached = self.insert_ticket('high', 'in_progress', hours_ago=5)
+        within_sla = self.insert_ticket('low', 'open', hours_ago=5)
+        self.insert_ticket('high', 'closed', hours_ago=50)
+
+        self.assertEqual(self.monitor.load(), 2)
+        self.assertEqual(self.monitor.check(time.time() + 1), [breached])
+
+        conn = workflow_app.get_db_connection()
+        ticket = conn.execute('SELECT assigned_to, version FROM tickets WHERE id = ?', (breached,)).fetchone()
+        conn.close()
+        self.assertEqual(ticket['assigned_to'], 'Team Lead')
+        self.assertEqual(ticket['version'], 2)
+
+        # The untouched ticket breaches once its own SLA elapses
+        self.assertIn(within_sla, self.monitor.check(time.time() + 68 * 3600))
+
+    def test_breach_is_escalated_once_per_version(self):
+        """Log and webhook escalations change nothing on the ticket, yet reloads and restarts do not repeat them"""
+        monitor = SLAMonitor(workflow_app.get_db_connection, actions=('log',))
+        breached = self.insert_ticket('high', 'in_progress', hours_ago=5)
+        monitor.load()
+        self.assertEqual(monitor.check(time.time() + 1), [breached])
+
+        # A restarted (or second) monitor neither schedules nor escalates it again
+        restarted = SLAMonitor(workflow_app.get_db_connection, actions=('log',))
+        self.assertEqual(restarted.load(), 0)
+        restarted.wheel.schedule(breached, time.time())
+        self.assertEqual(restarted.check(time.time() + 1), [])
+
+        # Once updated, the ticket's new version can breach again
+        conn = workflow_app.get_db_connection()
+        stale = (datetime.now() - timedelta(hours=6)).strftime('%Y-%m-%d %H:%M:%S')
+        SQLiteTicketRepository(conn).update(breached, {'updated_at': stale})
+        conn.commit()
+        conn.close()
+        self.assertEqual(restarted.load(), 1)
+        self.assertEqual(restarted.check(time.time() + 1), [breached])
+
+    def test_tracked_update_resets_deadline(self):
+        """Updating or closing a ticket reschedules or cancels its escalation"""
+        ticket_id = self.insert_ticket('high', 'open', hours_ago=3)
+        self.monitor.load()
+
+        self.monitor.track({'id': ticket_id, 'status': 'closed', 'priority': 'high',
+                            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+        self.assertEqual(self.monitor.check(time.time() + 2 * 3600), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,30 +1,29 @@
 import unittest
-import sqlite3
 import os
 import sys
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Add parent directory to path to import from workflow
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from workflow.logger import Logger
+from workflow.integrity import default_rules, scan_connection
+from db_fixtures import ClonedDatabaseTestCase
 
 # Initialize logger
 logger = Logger(log_dir='../automation_logs')
 
-class TestTicketSystem(unittest.TestCase):
-    """Test suite for the ticket system database and automation rules"""
+class TestTicketSystem(ClonedDatabaseTestCase):
+    """Test suite for the ticket system database and automation rules
+    
+    Each test gets its own in-memory clone of the seeded template database
+    (self.conn, with self.tickets as its repository), so tests never touch dashboard/tickets.db and
+    can run in parallel (see run_parallel.py).
+    """
     
     @classmethod
     def setUpClass(cls):
-        """Set up test database connection"""
-        # Connect to the database
-        """Set up test database connection"""
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        db_path = os.path.join(base_dir, '../dashboard/tickets.db')
-        cls.conn = sqlite3.connect(db_path)
-        cls.conn.row_factory = sqlite3.Row  # ✅ This line enables dict-style access
-        cls.cursor = cls.conn.cursor()
+        """Set up test logging"""
         print("[INFO] Test suite initialized")
         
         # Create test_logs directory
@@ -34,8 +33,7 @@ class TestTicketSystem(unittest.TestCase):
     
     @classmethod
     def tearDownClass(cls):
-        """Close database connection"""
-        cls.conn.close()
+        """Finish test logging"""
         logger.info("Test suite completed")
     
     def test_workflow_automation_trigger(self):
@@ -46,34 +44,25 @@ class TestTicketSystem(unittest.TestCase):
         
         # Insert a new high-priority ticket
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.cursor.execute('''
-        INSERT INTO tickets (title, description, status, priority, created_at, updated_at, assigned_to)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            'Test High Priority Ticket', 
-            'This is a test ticket for workflow automation', 
-            'open',  # Initial status is open
-            'high',  # High priority
-            now, 
-            now, 
-            None    # Initially not assigned
-        ))
-        
-        # Get the ID of the inserted ticket
-        ticket_id = self.cursor.lastrowid
-        self.conn.commit()
+        ticket_id = self.tickets.add({
+            'title': 'Test High Priority Ticket',
+            'description': 'This is a test ticket for workflow automation',
+            'status': 'open',  # Initial status is open
+            'priority': 'high',  # High priority
+            'created_at': now,
+            'updated_at': now,
+            'assigned_to': None    # Initially not assigned
+        })
+        self.tickets.commit()
         
         # Simulate workflow automation (in a real system, this would be done by the workflow engine)
-        self.cursor.execute('''
-        UPDATE tickets
-        SET status = 'in_progress', assigned_to = 'Senior Analyst'
-        WHERE id = ? AND priority = 'high' AND status = 'open'
-        ''', (ticket_id,))
-        self.conn.commit()
+        ticket = self.tickets.get(ticket_id)
+        if ticket['priority'] == 'high' and ticket['status'] == 'open':
+            self.tickets.update(ticket_id, {'status': 'in_progress', 'assigned_to': 'Senior Analyst'})
+        self.tickets.commit()
         
         # Verify the ticket was updated correctly
-        self.cursor.execute('SELECT status, assigned_to FROM tickets WHERE id = ?', (ticket_id,))
-        ticket = self.cursor.fetchone()
+        ticket = self.tickets.get(ticket_id)
         
         self.assertEqual(ticket['status'], 'in_progress')
         self.assertEqual(ticket['assigned_to'], 'Senior Analyst')
@@ -98,28 +87,19 @@ class TestTicketSystem(unittest.TestCase):
         
         logger.info("Running Test 2: Status Integrity Check")
         
-        # Get current time
-        now = datetime.now()
-        thirty_days_ago = now - timedelta(days=30)
-        thirty_days_ago_str = thirty_days_ago.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Find closed tickets with updated_at older than 30 days
-        self.cursor.execute('''
-        SELECT id, updated_at FROM tickets 
-        WHERE status = 'closed' AND updated_at < ?
-        ''', (thirty_days_ago_str,))
-        
-        outdated_tickets = self.cursor.fetchall()
+        # Count closed tickets with updated_at older than 30 days in one aggregate pass
+        rules = [rule for rule in default_rules(stale_days=30) if rule[0] == 'stale_closed']
+        outdated = scan_connection(self.conn, rules, sample_size=None)['rules']['stale_closed']
         
         # Test passes if no outdated tickets are found
-        test_passed = len(outdated_tickets) == 0
+        test_passed = outdated['count'] == 0
         
         # Log test result
         result = {
             'test_name': 'status_integrity_check',
-            'outdated_tickets': [dict(t) for t in outdated_tickets],
+            'outdated_ticket_ids': outdated['ids'],
             'passed': test_passed,
-            'message': f"Found {len(outdated_tickets)} closed tickets with updates older than 30 days" if not test_passed else "All closed tickets are up to date"
+            'message': f"Found {outdated['count']} closed tickets with updates older than 30 days" if not test_passed else "All closed tickets are up to date"
         }
         
         with open(f'../test_logs/test2_result.json', 'w') as f:
@@ -128,7 +108,7 @@ class TestTicketSystem(unittest.TestCase):
         logger.info(f"Test 2 completed: {'PASSED' if test_passed else 'FAILED'}")
         
         # Assert that all closed tickets have been updated within the last 30 days
-        self.assertTrue(test_passed, f"Found {len(outdated_tickets)} closed tickets with updates older than 30 days")
+        self.assertTrue(test_passed, f"Found {outdated['count']} closed tickets with updates older than 30 days")
     
     def test_priority_escalation_rule(self):
         """Test 3: Priority Escalation Rule
@@ -139,35 +119,24 @@ class TestTicketSystem(unittest.TestCase):
         
         # Insert a new low-priority ticket
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.cursor.execute('''
-        INSERT INTO tickets (title, description, status, priority, created_at, updated_at, assigned_to)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            'Test Low Priority Ticket', 
-            'This is a test ticket for priority escalation', 
-            'open',  # Initial status is open
-            'low',   # Low priority
-            now, 
-            now, 
-            'SupportBot'  # Initially assigned to SupportBot per automation rules
-        ))
-        
-        # Get the ID of the inserted ticket
-        ticket_id = self.cursor.lastrowid
-        self.conn.commit()
+        ticket_id = self.tickets.add({
+            'title': 'Test Low Priority Ticket',
+            'description': 'This is a test ticket for priority escalation',
+            'status': 'open',  # Initial status is open
+            'priority': 'low',   # Low priority
+            'created_at': now,
+            'updated_at': now,
+            'assigned_to': 'SupportBot'  # Initially assigned to SupportBot per automation rules
+        })
+        self.tickets.commit()
         
         # Try to change status to in_progress without changing assignment
         # This simulates a manual update that should be caught by the rule
-        self.cursor.execute('''
-        UPDATE tickets
-        SET status = 'in_progress'
-        WHERE id = ?
-        ''', (ticket_id,))
-        self.conn.commit()
+        self.tickets.update(ticket_id, {'status': 'in_progress'})
+        self.tickets.commit()
         
         # Verify the ticket status
-        self.cursor.execute('SELECT status, assigned_to FROM tickets WHERE id = ?', (ticket_id,))
-        ticket = self.cursor.fetchone()
+        ticket = self.tickets.get(ticket_id)
         
         # In a real system with proper constraints, this update would be rejected or automatically
         # assign to an analyst. For this test, we're just checking if our test can detect the issue.
@@ -193,12 +162,8 @@ class TestTicketSystem(unittest.TestCase):
         self.assertTrue(rule_violation, "Failed to detect rule violation: low priority ticket in progress should not be assigned to SupportBot")
         
         # Now fix the violation to maintain data integrity
-        self.cursor.execute('''
-        UPDATE tickets
-        SET assigned_to = 'Junior Analyst'
-        WHERE id = ? AND status = 'in_progress' AND priority = 'low'
-        ''', (ticket_id,))
-        self.conn.commit()
+        self.tickets.update(ticket_id, {'assigned_to': 'Junior Analyst'})
+        self.tickets.commit()
     
     def test_data_consistency(self):
         """Test 4: Data Consistency
@@ -207,24 +172,18 @@ class TestTicketSystem(unittest.TestCase):
         logger.info("Running Test 4: Data Consistency")
         
         # Check for null values in required fields
-        self.cursor.execute('''
-        SELECT id, title, description, status, priority, created_at, updated_at
-        FROM tickets
-        WHERE title IS NULL OR description IS NULL OR status IS NULL OR 
-              priority IS NULL OR created_at IS NULL OR updated_at IS NULL
-        ''')
-        
-        inconsistent_tickets = self.cursor.fetchall()
+        rules = [rule for rule in default_rules() if rule[0] == 'required_fields']
+        inconsistent = scan_connection(self.conn, rules, sample_size=None)['rules']['required_fields']
         
         # Test passes if no inconsistent tickets are found
-        test_passed = len(inconsistent_tickets) == 0
+        test_passed = inconsistent['count'] == 0
         
         # Log test result
         result = {
             'test_name': 'data_consistency',
-            'inconsistent_tickets': [dict(t) for t in inconsistent_tickets],
+            'inconsistent_ticket_ids': inconsistent['ids'],
             'passed': test_passed,
-            'message': f"Found {len(inconsistent_tickets)} tickets with null values in required fields" if not test_passed else "All tickets have consistent data"
+            'message': f"Found {inconsistent['count']} tickets with null values in required fields" if not test_passed else "All tickets have consistent data"
         }
         
         with open(f'../test_logs/test4_result.json', 'w') as f:
@@ -233,7 +192,7 @@ class TestTicketSystem(unittest.TestCase):
         logger.info(f"Test 4 completed: {'PASSED' if test_passed else 'FAILED'}")
         
         # Assert that all tickets have consistent data
-        self.assertTrue(test_passed, f"Found {len(inconsistent_tickets)} tickets with null values in required fields")
+        self.assertTrue(test_passed, f"Found {inconsistent['count']} tickets with null values in required fields")
 
 if __name__ == '__main__':
     # Run the tests and generate a test report
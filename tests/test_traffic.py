@@ -0,0 +1,97 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add workflow directory to path to import the Flask app
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+import app as workflow_app
+from ratelimit import RateLimiter
+from coalescer import AlertCoalescer
+from traffic import TrafficRecorder, InProcessClient, load_traces, replay
+
+
+class TestTrafficReplay(unittest.TestCase):
+    """Test suite for request trace recording and replay"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # Admission control is tested in test_ratelimit.py; a shared limiter would make these
+        # tests depend on each other's traffic, so run them without limits
+        self.default_limiter = workflow_app.rate_limiter
+        workflow_app.rate_limiter = RateLimiter(os.path.join(self.tmp_dir.name, 'ratelimit'), global_rate=0,
+                                                client_limits={})
+        self.trace_path = os.path.join(self.tmp_dir.name, 'traces.jsonl')
+        self.use_database('recorded.db')
+        workflow_app.coalescer = AlertCoalescer(window=0)
+        workflow_app.traffic_recorder = TrafficRecorder(self.trace_path)
+        self.client = workflow_app.app.test_client()
+        with self.client.session_transaction() as session:
+            session['username'] = 'admin'
+            session['role'] = 'admin'
+
+    def tearDown(self):
+        workflow_app.traffic_recorder.close()
+        workflow_app.traffic_recorder = None
+        workflow_app.rate_limiter = self.default_limiter
+        self.tmp_dir.cleanup()
+
+    def use_database(self, name):
+        workflow_app.DB_PATH = os.path.join(self.tmp_dir.name, name)
+        workflow_app._schema_ready = False
+        workflow_app.deduplicator.responses.clear()
+
+    def record_mix(self):
+        self.client.post('/api/tickets', json={'title': 'Customer ACME cannot log in',
+                                               'description': 'Reported by jane@example.com', 'priority': 'high'})
+        self.client.post('/webhook/ticket', json={'title': 'Disk full on db-1', 'description': 'Volume at 99%'},
+                         headers={'Idempotency-Key': 'delivery-1'})
+        self.client.post('/webhook/ticket', json={'title': 'Disk full on db-1', 'description': 'Volume at 99%'},
+                         headers={'Idempotency-Key': 'delivery-1'})
+        self.client.get('/api/tickets?status=open')
+        self.client.put('/api/tickets/1', json={'status': 'closed'})
+        self.client.put('/api/tickets/1', json={'priority': 'low'}, headers={'If-Match': '"1"'})
+        self.client.put('/api/tickets/1', json={'priority': 'low'}, headers={'If-Match': '"2"'})
+
+    def test_traces_are_sanitized(self):
+        """Traces keep structure, enums and timing but no free text"""
+        self.record_mix()
+        traces = load_traces(self.trace_path)
+        raw = open(self.trace_path).read()
+
+        self.assertEqual([trace['route'] for trace in traces],
+                         ['/api/tickets', '/webhook/ticket', '/webhook/ticket', '/api/tickets']
+                         + ['/api/tickets/<int:ticket_id>'] * 3)
+        self.assertNotIn('ACME', raw)
+        self.assertNotIn('jane@example.com', raw)
+        self.assertNotIn('delivery-1', raw)
+        self.assertEqual(traces[0]['body']['priority'], 'high')
+        self.assertEqual(traces[0]['body']['title']['$str'], len('Customer ACME cannot log in'))
+        self.assertEqual(traces[1]['headers'], traces[2]['headers'])
+        self.assertEqual(traces[3]['query'], {'status': 'open'})
+        # Pinned versions are kept so replays hit the same conflicts
+        self.assertEqual([trace['headers'] for trace in traces[5:]], [{'If-Match': '"1"'}, {'If-Match': '"2"'}])
+        self.assertEqual([trace['status'] for trace in traces[5:]], [409, 200])
+        self.assertGreater(traces[0]['duration_ms'], 0)
+
+    def test_replay_reports_latency(self):
+        """Replaying into a fresh database reproduces the recorded responses"""
+        self.record_mix()
+        traces = load_traces(self.trace_path)
+        self.use_database('replayed.db')
+
+        report = replay(traces, lambda: InProcessClient(workflow_app.app), concurrency=1, speed=0)
+
+        self.assertEqual(report['requests'], 7)
+        self.assertEqual(report['errors'], 0)
+        recorded = {}
+        for trace in traces:
+            recorded[str(trace['status'])] = recorded.get(str(trace['status']), 0) + 1
+        self.assertEqual(report['statuses'], recorded)
+        self.assertIsNotNone(report['latency_ms']['p99'])
+        self.assertIn('/webhook/ticket', report['routes'])
+        self.assertGreater(report['throughput_rps'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,215 @@
+import unittest
+import sqlite3
+import os
+import sys
+import tempfile
+
+# Add workflow directory to path to import the Flask app
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'workflow'))
+import app as workflow_app
+from ratelimit import RateLimiter
+from idempotency import WebhookDeduplicator
+from coalescer import AlertCoalescer
+
+
+class TestWebhookDeduplication(unittest.TestCase):
+    """Test suite for idempotency keys and duplicate suppression on the webhook"""
+
+    def setUp(self):
+        """Point the app at a fresh temporary database"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # Admission control is tested in test_ratelimit.py; a shared limiter would make these
+        # tests depend on each other's traffic, so run them without limits
+        self.default_limiter = workflow_app.rate_limiter
+        workflow_app.rate_limiter = RateLimiter(os.path.join(self.tmp_dir.name, 'ratelimit'), global_rate=0,
+                                                client_limits={})
+        self.db_path = os.path.join(self.tmp_dir.name, 'tickets.db')
+        workflow_app.DB_PATH = self.db_path
+        workflow_app._schema_ready = False
+        workflow_app.deduplicator = WebhookDeduplicator()
+        workflow_app.coalescer = AlertCoalescer(window=0)
+        self.client = workflow_app.app.test_client()
+
+    def tearDown(self):
+        workflow_app.rate_limiter = self.default_limiter
+        self.tmp_dir.cleanup()
+
+    def count_tickets(self):
+        conn = sqlite3.connect(self.db_path)
+        count = conn.execute('SELECT COUNT(*) FROM tickets').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_idempotency_key_replays_response(self):
+        """Retried deliveries with the same key return the original ticket"""
+        payload = {'title': 'Disk full', 'description': 'Volume /var at 99%', 'priority': 'high'}
+        headers = {'Idempotency-Key': 'alert-123'}
+
+        first = self.client.post('/webhook/ticket', json=payload, headers=headers)
+        second = self.client.post('/webhook/ticket', json=payload, headers=headers)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(first.get_json()['id'], second.get_json()['id'])
+        self.assertEqual(self.count_tickets(), 1)
+
+    def test_stored_key_survives_restart(self):
+        """Keys persisted in the database are honoured by a fresh process"""
+        payload = {'title': 'Disk full', 'description': 'Volume /var at 99%'}
+        headers = {'Idempotency-Key': 'alert-456'}
+        first = self.client.post('/webhook/ticket', json=payload, headers=headers)
+
+        workflow_app.deduplicator = WebhookDeduplicator()
+        second = self.client.post('/webhook/ticket', json=payload, headers=headers)
+
+        self.assertEqual(second.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(first.get_json()['id'], second.get_json()['id'])
+
+    def test_key_reused_after_expiry(self):
+        """A key whose stored response has expired is taken over by the next delivery"""
+        headers = {'Idempotency-Key': 'k1'}
+        first = self.client.post('/webhook/ticket', json={'title': 'Disk full', 'description': 'Volume /var at 99%'},
+                                 headers=headers)
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE idempotency_keys SET created_at = '2000-01-01 00:00:00'")
+        conn.commit()
+        conn.close()
+        workflow_app.deduplicator.responses.clear()
+
+        second = self.client.post('/webhook/ticket', json={'title': 'CPU hot', 'description': 'Load at 40'},
+                                  headers=headers)
+        retried = self.client.post('/webhook/ticket', json={'title': 'CPU hot', 'description': 'Load at 40'},
+                                   headers=headers)
+
+        self.assertEqual(second.status_code, 201)
+        self.assertIsNone(second.headers.get('Idempotent-Replayed'))
+        self.assertNotEqual(second.get_json()['id'], first.get_json()['id'])
+        self.assertEqual(retried.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(retried.get_json()['id'], second.get_json()['id'])
+        self.assertEqual(self.count_tickets(), 2)
+
+    def test_duplicate_content_suppressed_until_closed(self):
+        """Identical alerts reuse the open ticket and create a new one once it is closed"""
+        payload = {'title': 'CPU high', 'description': 'web-1 CPU above 95%', 'priority': 'low'}
+
+        first = self.client.post('/webhook/ticket', json=payload)
+        duplicate = self.client.post('/webhook/ticket', json=payload)
+        self.assertEqual(duplicate.status_code, 200)
+        self.assertEqual(duplicate.get_json()['id'], first.get_json()['id'])
+        self.assertEqual(self.count_tickets(), 1)
+
+        # Without a coalescing window the count is still written through
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute('SELECT occurrence_count FROM tickets').fetchone()[0], 2)
+        conn.execute("UPDATE tickets SET status = 'closed' WHERE id = ?", (first.get_json()['id'],))
+        conn.commit()
+        conn.close()
+
+        refired = self.client.post('/webhook/ticket', json=payload)
+        self.assertEqual(refired.status_code, 201)
+        self.assertEqual(self.count_tickets(), 2)
+
+    def test_duplicate_losing_key_race_replays_winner(self):
+        """A duplicate whose key was stored concurrently replays the stored response and is not counted"""
+        payload = {'title': 'CPU high', 'description': 'web-1 CPU above 95%'}
+        self.client.post('/webhook/ticket', json=payload)
+        winner = self.client.post('/webhook/ticket', json=payload, headers={'Idempotency-Key': 'race-1'})
+
+        # The second delivery misses the key on its first lookup, as if both checked at once
+        deduplicator = workflow_app.deduplicator
+        deduplicator.responses.clear()
+        lookups = []
+        stored_response = deduplicator.stored_response
+
+        def late_stored_response(conn, key):
+            lookups.append(key)
+            return stored_response(conn, key) if len(lookups) > 1 else None
+
+        deduplicator.stored_response = late_stored_response
+        loser = self.client.post('/webhook/ticket', json=payload, headers={'Idempotency-Key': 'race-1'})
+
+        self.assertEqual(loser.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(loser.get_json(), winner.get_json())
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute('SELECT occurrence_count FROM tickets').fetchone()[0], 2)
+        conn.close()
+
+
+class TestAlertCoalescing(unittest.TestCase):
+    """Test suite for folding alert storms into aggregate tickets"""
+
+    def setUp(self):
+        """Point the app at a fresh temporary database with coalescing enabled"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # Admission control is tested in test_ratelimit.py; a shared limiter would make these
+        # tests depend on each other's traffic, so run them without limits
+        self.default_limiter = workflow_app.rate_limiter
+        workflow_app.rate_limiter = RateLimiter(os.path.join(self.tmp_dir.name, 'ratelimit'), global_rate=0,
+                                                client_limits={})
+        self.db_path = os.path.join(self.tmp_dir.name, 'tickets.db')
+        workflow_app.DB_PATH = self.db_path
+        workflow_app._schema_ready = False
+        workflow_app.deduplicator = WebhookDeduplicator()
+        workflow_app.coalescer = AlertCoalescer(window=60, flush_interval=3600)
+        self.client = workflow_app.app.test_client()
+
+    def tearDown(self):
+        workflow_app.coalescer.stop()
+        workflow_app.rate_limiter = self.default_limiter
+        self.tmp_dir.cleanup()
+
+    def test_storm_folds_into_one_ticket(self):
+        """Alerts differing only in numbers become one ticket with an occurrence count"""
+        for i in range(5):
+            response = self.client.post('/webhook/ticket', json={
+                'title': f'Pod web-{i} restarted',
+                'description': f'Container exited with code {i + 1}'
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['occurrence_count'], 5)
+
+        conn = workflow_app.get_db_connection()
+        workflow_app.coalescer.flush(conn)
+        rows = conn.execute('SELECT occurrence_count, first_seen_at, last_seen_at FROM tickets').fetchall()
+        conn.close()
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['occurrence_count'], 5)
+        self.assertLessEqual(rows[0]['first_seen_at'], rows[0]['last_seen_at'])
+
+    def test_coalesced_response_survives_restart(self):
+        """Keys answered by a coalesced alert are persisted and replayed by a fresh process"""
+        self.client.post('/webhook/ticket', json={'title': 'Pod web-1 restarted', 'description': 'exit code 1'})
+        headers = {'Idempotency-Key': 'storm-7'}
+        folded = self.client.post('/webhook/ticket', json={'title': 'Pod web-2 restarted',
+                                                           'description': 'exit code 2'}, headers=headers)
+        self.assertEqual(folded.get_json()['message'], 'Alert coalesced into open ticket')
+
+        workflow_app.deduplicator = WebhookDeduplicator()
+        workflow_app.coalescer = AlertCoalescer(window=0)
+        retried = self.client.post('/webhook/ticket', json={'title': 'Pod web-2 restarted',
+                                                            'description': 'exit code 2'}, headers=headers)
+
+        self.assertEqual(retried.status_code, 200)
+        self.assertEqual(retried.headers.get('Idempotent-Replayed'), 'true')
+        self.assertEqual(retried.get_json(), folded.get_json())
+
+    def test_closed_ticket_stops_coalescing(self):
+        """Closing a ticket through the API ends its coalescing window"""
+        payload = {'title': 'Queue backlog', 'description': 'orders queue depth 5000'}
+        first = self.client.post('/webhook/ticket', json=payload)
+
+        with self.client.session_transaction() as session:
+            session['username'] = 'admin'
+            session['role'] = 'admin'
+        self.client.put(f"/api/tickets/{first.get_json()['id']}", json={'status': 'closed'})
+
+        refired = self.client.post('/webhook/ticket', json=payload)
+        self.assertEqual(refired.status_code, 201)
+        self.assertNotEqual(refired.get_json()['id'], first.get_json()['id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
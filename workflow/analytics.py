@@ -0,0 +1,171 @@
+import numpy as np
+
+# Open-ticket age buckets in days (upper edge exclusive)
+AGE_BUCKET_EDGES = [0, 1, 3, 7, 14, 30, np.inf]
+AGE_BUCKET_LABELS = ['< 1 day', '1-3 days', '3-7 days', '7-14 days', '14-30 days', '30+ days']
+
+# Time-series buckets, finest first, with the widest span each can cover (months vary)
+TIME_BUCKETS = {
+    'hour': np.timedelta64(1, 'h'),
+    'day': np.timedelta64(1, 'D'),
+    'week': np.timedelta64(7, 'D'),
+    'month': np.timedelta64(31, 'D'),
+}
+
+
+def to_datetime64(values):
+    """Parse timestamp strings (any precision), or take epoch seconds, into a datetime64[s] array"""
+    values = np.asarray(values)
+    if values.dtype.kind in 'US':
+        return values.astype('datetime64[us]').astype('datetime64[s]')
+    # Integers (None for tickets whose timestamp never parsed) convert without parsing
+    return np.array(values, dtype='datetime64[s]')
+
+
+class TicketTimeline:
+    """Sorted create/close event arrays for one set of tickets
+
+    Closed tickets use updated_at as their close time. Both arrays are
+    sorted once, after which backlog and age queries are binary searches
+    and histograms rather than re-filtering every ticket per day.
+    """
+
+    def __init__(self, created_at, closed_at):
+        created_at = np.asarray(created_at, dtype='datetime64[s]')
+        closed_at = np.asarray(closed_at, dtype='datetime64[s]')
+        is_open = np.isnat(closed_at)
+        self.created = np.sort(created_at)
+        self.closed = np.sort(closed_at[~is_open])
+        self.open_created = np.sort(created_at[is_open])
+
+    @classmethod
+    def from_columns(cls, status, created_at, updated_at):
+        """Build a timeline from status, created_at and updated_at columns"""
+        created_at = np.asarray(created_at, dtype='datetime64[s]')
+        updated_at = np.asarray(updated_at, dtype='datetime64[s]')
+        closed_at = np.where(np.asarray(status) == 'closed', updated_at, np.datetime64('NaT'))
+        return cls(created_at, closed_at)
+
+    def merge(self, other):
+        """Fold another timeline's events (e.g. archived tickets of the same priority) into this one"""
+        self.created = np.sort(np.concatenate([self.created, other.created]))
+        self.closed = np.sort(np.concatenate([self.closed, other.closed]))
+        self.open_created = np.sort(np.concatenate([self.open_created, other.open_created]))
+        return self
+
+    def backlog_at(self, times):
+        """Number of tickets open at each of the given times"""
+        times = np.asarray(times, dtype='datetime64[s]')
+        opened = np.searchsorted(self.created, times, side='right')
+        resolved = np.searchsorted(self.closed, times, side='right')
+        return opened - resolved
+
+    def age_counts(self, now):
+        """Histogram of currently open tickets over AGE_BUCKET_EDGES"""
+        ages = (np.datetime64(now, 's') - self.open_created) / np.timedelta64(1, 'D')
+        counts, _ = np.histogram(ages, bins=AGE_BUCKET_EDGES)
+        return counts
+
+
+def build_timelines(rows):
+    """Build one TicketTimeline per priority from (priority, status, created_at, updated_at) rows"""
+    if not rows:
+        return {}
+    priority, status, created_at, updated_at = (np.asarray(column) for column in zip(*rows))
+    created_at = to_datetime64(created_at)
+    updated_at = to_datetime64(updated_at)
+    timelines = {}
+    for value in np.unique(priority):
+        mask = priority == value
+        timelines[str(value)] = TicketTimeline.from_columns(status[mask], created_at[mask], updated_at[mask])
+    return timelines
+
+
+def final_closes(ticket_ids, closed_at):
+    """Positions of the row holding each ticket's latest close; rows without a close are skipped
+
+    A ticket can be read twice (from the live table and from an archive
+    month loaded for the same range); it is counted once.
+    """
+    ticket_ids = np.asarray(ticket_ids)
+    closed_at = np.asarray(closed_at, dtype='datetime64[s]')
+    rows = np.flatnonzero(~np.isnat(closed_at))
+    if not len(rows):
+        return rows
+    rows = rows[np.lexsort((closed_at[rows], ticket_ids[rows]))]
+    last = np.append(ticket_ids[rows][1:] != ticket_ids[rows][:-1], True)
+    return rows[last]
+
+
+def choose_bucket(start, end, max_points):
+    """Finest of TIME_BUCKETS that splits [start, end) into at most max_points buckets (else month)"""
+    span = np.datetime64(end, 's') - np.datetime64(start, 's')
+    for bucket, width in TIME_BUCKETS.items():
+        if span // width + 2 <= max_points:
+            return bucket
+    return 'month'
+
+
+def bucket_floor(times, bucket):
+    """Start of the bucket holding each time; weeks start on Monday"""
+    times = np.asarray(times, dtype='datetime64[s]')
+    if bucket == 'week':
+        # datetime64 weeks count from Thursday 1970-01-01, so shift them onto Mondays
+        shift = np.timedelta64(3, 'D')
+        return (times + shift).astype('datetime64[W]').astype('datetime64[s]') - shift
+    unit = {'hour': 'h', 'day': 'D', 'month': 'M'}[bucket]
+    return times.astype(f'datetime64[{unit}]').astype('datetime64[s]')
+
+
+def bucket_edges(start, end, bucket):
+    """Start of every bucket overlapping [start, end), followed by the end of the last one"""
+    first, last = bucket_floor([start, np.datetime64(end, 's') - np.timedelta64(1, 's')], bucket)
+    if bucket == 'month':
+        months = np.arange(first.astype('datetime64[M]'), last.astype('datetime64[M]') + 2)
+        return months.astype('datetime64[s]')
+    width = TIME_BUCKETS[bucket]
+    return np.arange(first, last + 2 * width, width)
+
+
+def bucket_counts(times, start, end, bucket):
+    """(bucket starts, counts) of the given times over [start, end), empty buckets included
+
+    One sort and one binary search per bucket edge, so the result is sized
+    by the number of buckets rather than the number of times.
+    """
+    times = np.asarray(times, dtype='datetime64[s]')
+    times = np.sort(times[~np.isnat(times)])
+    edges = bucket_edges(start, end, bucket)
+    return edges[:-1], np.diff(np.searchsorted(times, edges))
+
+
+def backlog_series(timelines, start, end, step=np.timedelta64(1, 'D'), bucket=None):
+    """Daily (or per-step) open backlog summed over the given timelines
+
+    With bucket, the backlog is sampled at the start of each bucket
+    overlapping [start, end) instead.
+    """
+    if bucket:
+        times = bucket_edges(start, end, bucket)[:-1]
+    else:
+        times = np.arange(np.datetime64(start, 's'), np.datetime64(end, 's') + step, step)
+    counts = np.zeros(len(times), dtype=np.int64)
+    for timeline in timelines:
+        counts += timeline.backlog_at(times)
+    return times, counts
+
+
+def age_buckets(timelines, now):
+    """Open-ticket age buckets summed over the given timelines"""
+    counts = np.zeros(len(AGE_BUCKET_LABELS), dtype=np.int64)
+    for timeline in timelines:
+        counts += timeline.age_counts(now)
+    return [
+        {
+            'bucket': label,
+            'min_days': AGE_BUCKET_EDGES[i],
+            'max_days': None if np.isinf(AGE_BUCKET_EDGES[i + 1]) else AGE_BUCKET_EDGES[i + 1],
+            'count': int(count)
+        }
+        for i, (label, count) in enumerate(zip(AGE_BUCKET_LABELS, counts))
+    ]
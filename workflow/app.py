@@ -1,15 +1,34 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash
+from flask import Flask, Response, request, jsonify, render_template, redirect, url_for, session, flash, g
 import sqlite3
 import os
 import json
+import time
 from datetime import datetime
 from werkzeug.security import check_password_hash, generate_password_hash
 import secrets
 from logger import Logger
+from schema import ensure_schema, epoch_ready
+from idempotency import WebhookDeduplicator, content_fingerprint
+from coalescer import AlertCoalescer, normalized_fingerprint
+from serialization import iter_json_chunks
+from archive import (archive_dir_for, archived_months, months_between, ticket_columns,
+                     find_archived_ticket, iter_archived_rows)
+from cache import TTLCache
+from analytics import build_timelines, age_buckets
+from sketch import (record_resolution, rebuild_resolution_sketches, load_sketches, percentile_rows, sketches_stored,
+                    REPORTED_QUANTILES)
+from routing import LoadBalancer, DEFAULT_POOLS, open_assignee
+from sla import SLAMonitor, DEFAULT_SLA_HOURS
+from traffic import TrafficRecorder
+from replica import SnapshotReplicator
+from sharding import ShardExecutor, group_by_shard, id_floor, merge_sorted, prefetch, shard_for, shard_of, shard_paths
+from repository import EPOCH_ORDERINGS, ORDERINGS, SQLiteTicketRepository, connect, filter_clause
+from ratelimit import RateLimiter, default_bucket_path
 
 # Initialize Flask app
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)  # For session management
+# For session management; SECRET_KEY keeps sessions valid across restarts and reloads
+app.secret_key = os.environ.get('SECRET_KEY') or secrets.token_hex(16)
 
 # Initialize logger
 logger = Logger()
@@ -30,11 +49,214 @@ USERS = {
     }
 }
 
+# Database location (override with TICKETS_DB)
+DB_PATH = os.environ.get('TICKETS_DB', '../database/tickets.db')
+_schema_ready = False
+# Set once every shard has finished the epoch migration (see epoch_migration.py)
+_epoch_reads = False
+
+# Number of database files tickets are spread over (TICKETS_SHARDS); shard 0
+# is DB_PATH itself and the others sit next to it (see sharding.py)
+SHARD_COUNT = int(os.environ.get('TICKETS_SHARDS', '1'))
+shard_executor = ShardExecutor()
+
+# Duplicate suppression for webhook deliveries
+deduplicator = WebhookDeduplicator()
+
+# Alert-storm coalescing window in seconds (0 disables)
+coalescer = AlertCoalescer(
+    window=int(os.environ.get('COALESCE_WINDOW', '60')),
+    flush_interval=int(os.environ.get('COALESCE_FLUSH_INTERVAL', '10')),
+    logger=logger
+)
+
+# Analytics are rebuilt from the tickets table at most once per TTL
+analytics_cache = TTLCache(ttl=int(os.environ.get('ANALYTICS_CACHE_TTL', '60')), max_size=16)
+
+# Assignment routing: 'fixed' keeps the default assignees, 'least_loaded'
+# picks the pool member with the fewest open tickets
+ROUTING_MODE = os.environ.get('ROUTING_MODE', 'fixed')
+ROUTING_POOLS = json.loads(os.environ['ROUTING_POOLS']) if 'ROUTING_POOLS' in os.environ else DEFAULT_POOLS
+load_balancer = LoadBalancer(ROUTING_POOLS)
+# Seconds between reloads of the open-ticket counts from the database (0 never reloads)
+ROUTING_RELOAD_INTERVAL = float(os.environ.get('ROUTING_RELOAD_INTERVAL', '0'))
+
+# SLA breach monitoring (started with the server, see start_background_services)
+sla_monitor = SLAMonitor(
+    connect=lambda: get_db_connection(),
+    sla_hours=json.loads(os.environ['SLA_HOURS']) if 'SLA_HOURS' in os.environ else DEFAULT_SLA_HOURS,
+    actions=os.environ.get('SLA_ACTIONS', 'log').split(','),
+    escalate_to=os.environ.get('SLA_ESCALATE_TO', 'Team Lead'),
+    webhook_url=os.environ.get('SLA_WEBHOOK_URL'),
+    logger=logger,
+    on_update=lambda old_ticket, new_ticket: on_ticket_changed(old_ticket, new_ticket),
+    reload_interval=float(os.environ.get('SLA_RELOAD_INTERVAL', '0')),
+    shards=SHARD_COUNT
+)
+
+# Read snapshot for the dashboard, refreshed every REPLICA_INTERVAL seconds (0 disables)
+replicator = SnapshotReplicator(
+    source_path=DB_PATH,
+    snapshot_path=os.environ.get('REPLICA_PATH', '../dashboard/replica.db'),
+    interval=float(os.environ.get('REPLICA_INTERVAL', '60')),
+    logger=logger,
+    merge_sources=shard_paths(DB_PATH, SHARD_COUNT)[1:]
+)
+
+# Sanitized request traces for load replay (set TRAFFIC_RECORD to a JSONL path)
+traffic_recorder = None
+if os.environ.get('TRAFFIC_RECORD'):
+    traffic_recorder = TrafficRecorder(
+        os.environ['TRAFFIC_RECORD'],
+        sample_rate=float(os.environ.get('TRAFFIC_SAMPLE_RATE', '1.0'))
+    )
+
+# Admission control: token buckets in shared memory, so every worker process
+# enforces the same limits. Requests per second per client (session user,
+# else remote address) and globally; 0 disables a limit. Bulk traffic may
+# only use global capacity while more than RATE_LIMIT_BULK_RESERVE of the
+# global burst is left, so it is shed before interactive requests.
+rate_limiter = RateLimiter(
+    path=os.environ.get('RATE_LIMIT_PATH') or default_bucket_path(DB_PATH),
+    global_rate=float(os.environ.get('RATE_LIMIT_GLOBAL', '2000')),
+    client_limits={
+        'interactive': float(os.environ.get('RATE_LIMIT_CLIENT', '200')),
+        'bulk': float(os.environ.get('RATE_LIMIT_BULK_CLIENT', '100'))
+    },
+    reserves={'bulk': float(os.environ.get('RATE_LIMIT_BULK_RESERVE', '0.5'))}
+)
+
+# Endpoints for machine-generated bulk ingestion; everything else is interactive
+BULK_ENDPOINTS = {'webhook_ticket', 'batch_update_tickets'}
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.before_request
+def admit_request():
+    if request.endpoint is None or request.endpoint == 'static':
+        return None
+    priority = 'bulk' if request.endpoint in BULK_ENDPOINTS else 'interactive'
+    rejected = rate_limiter.admit(session.get('username') or request.remote_addr, priority)
+    if rejected is None:
+        return None
+    status, retry_after = rejected
+    message = "Rate limit exceeded" if status == 429 else "Service overloaded, retry later"
+    response = jsonify({"error": message, "retry_after": retry_after})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.after_request
+def record_traffic(response):
+    if traffic_recorder is not None:
+        traffic_recorder.record(request, response, time.perf_counter() - g.request_started)
+    return response
+
+def get_archive_dir(shard=0):
+    """Directory of per-month archive files for closed tickets (override with TICKETS_ARCHIVE_DIR)"""
+    if os.environ.get('TICKETS_ARCHIVE_DIR'):
+        return os.environ['TICKETS_ARCHIVE_DIR'] + (f"_shard{shard}" if shard else '')
+    return archive_dir_for(shard_paths(DB_PATH, SHARD_COUNT)[shard])
+
 # Database connection helper
-def get_db_connection():
-    conn = sqlite3.connect('../database/tickets.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+def get_db_connection(shard=0, **kwargs):
+    global _schema_ready, _epoch_reads
+    if not _schema_ready:
+        _epoch_reads = False
+        for path in shard_paths(DB_PATH, SHARD_COUNT):
+            conn = connect(path)
+            initialize_database(conn)
+            conn.close()
+        _schema_ready = True
+        # Seed the routing heaps with current open-ticket counts
+        if ROUTING_MODE == 'least_loaded':
+            load_routing_counts()
+    return connect(shard_paths(DB_PATH, SHARD_COUNT)[shard], **kwargs)
+
+def ticket_shard(ticket_id):
+    """Shard holding a ticket id, or None if the id belongs to no configured shard"""
+    shard = shard_of(ticket_id)
+    return shard if 0 <= shard < SHARD_COUNT else None
+
+def fan_out(query):
+    """Run query(conn) against every shard in parallel; results come back in shard order"""
+    def run(shard):
+        conn = get_db_connection(shard)
+        try:
+            return query(conn)
+        finally:
+            conn.close()
+    return shard_executor.map(run, range(SHARD_COUNT))
+
+def epoch_reads():
+    """Whether reads can use the epoch columns; checked on every shard until they all can"""
+    global _epoch_reads
+    if not _epoch_reads:
+        _epoch_reads = all(fan_out(epoch_ready))
+    return _epoch_reads
+
+def initialize_database(conn):
+    """Bring a shard's schema up to date and backfill derived data once per process"""
+    ensure_schema(conn)
+    
+    # Seed resolution-time sketches from history the first time they are used (or were built without samples)
+    if not sketches_stored(conn):
+        sketches = rebuild_resolution_sketches(conn)
+        conn.commit()
+        if sketches:
+            logger.info(f"Resolution time sketches rebuilt from {sketches[('all', 'all')].count} closed tickets")
+
+def load_routing_counts():
+    """Rebuild the routing heaps from the open tickets in every shard"""
+    counts = {}
+    for shard_counts in fan_out(lambda conn: SQLiteTicketRepository(conn).open_counts_by_assignee()):
+        for assignee, count in shard_counts.items():
+            counts[assignee] = counts.get(assignee, 0) + count
+    load_balancer.load(counts)
+
+def on_ticket_changed(old_ticket, new_ticket, track_load=True):
+    """Keep the in-memory routing, SLA and coalescing state in sync with a committed change
+
+    Pass track_load=False when the routing counts were already moved for it.
+    """
+    if track_load:
+        load_balancer.track(open_assignee(old_ticket), open_assignee(new_ticket))
+    sla_monitor.track(new_ticket)
+    # Closed tickets stop absorbing coalesced alerts
+    if new_ticket['status'] == 'closed':
+        coalescer.discard_ticket(new_ticket['id'])
+
+def start_background_services(singletons=True):
+    """Start the threads that run alongside request handling
+    
+    With several worker processes only one of them should run the
+    singletons (SLA monitor and snapshot refresh); every worker flushes its
+    own coalescing windows.
+    """
+    if singletons:
+        sla_monitor.start()
+        replicator.start()
+    coalescer.start(get_db_connection)
+
+def warm_up():
+    """Open the databases and fill the caches before serving traffic"""
+    fan_out(lambda conn: SQLiteTicketRepository(conn).count())
+    get_timelines()
+
+def route_assignee(pool, default):
+    """Choose the assignee for a routing pool according to ROUTING_MODE"""
+    if ROUTING_MODE != 'least_loaded' or pool not in load_balancer.pools:
+        return default
+    if not load_balancer.loaded:
+        get_db_connection().close()
+        if not load_balancer.loaded:
+            load_routing_counts()
+    elif load_balancer.stale(ROUTING_RELOAD_INTERVAL):
+        # Pick up tickets other worker processes created, reassigned or closed
+        load_routing_counts()
+    return load_balancer.pick(pool)
 
 # Routes
 @app.route('/')
@@ -74,27 +296,83 @@ def get_tickets():
     if 'username' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
+    # Optional filters; archives are only read when the filters can match them
+    status = request.args.get('status')
+    created_from = request.args.get('created_from')
+    created_to = request.args.get('created_to')
+    
+    filters = {'status': status} if status else None
+    # Archive files are queried with the same conditions as the hot table
+    epoch = epoch_reads()
+    where, params = filter_clause(filters, created_from, created_to, epoch)
+    
     conn = get_db_connection()
-    tickets = conn.execute('SELECT * FROM tickets').fetchall()
+    columns = ticket_columns(conn)
     conn.close()
-    
-    # Convert to list of dicts
-    result = [dict(ticket) for ticket in tickets]
-    return jsonify(result)
+    sharded = SHARD_COUNT > 1
+    # Several shards are merged by creation time, so each stream must be sorted the same way
+    order_by = 'created_at' if sharded else None
+    orderings = EPOCH_ORDERINGS if epoch else ORDERINGS
+    created = 'created_epoch' if epoch else 'created_at'
+    sort_key = (lambda row, at=columns.index(created), id_at=columns.index('id'): (row[at], row[id_at]))
+    
+    def row_chunks(shard):
+        # The async server (asgi.py) may take each chunk on a different worker
+        # thread; the steps never overlap, so the connections can follow them
+        conn = get_db_connection(shard, check_same_thread=False)
+        conn.row_factory = None
+        # Merged streams interleave, and an archive file can only be detached
+        # while no other statement is open on its connection
+        hot_conn = conn
+        if sharded:
+            hot_conn = get_db_connection(shard, check_same_thread=False)
+            hot_conn.row_factory = None
+        try:
+            months = []
+            if status in (None, 'closed'):
+                months = months_between(archived_months(conn), created_from, created_to)
+            archived = iter_archived_rows(conn, get_archive_dir(shard), months, where, params,
+                                          columns=columns, order_by=orderings[order_by or 'id'])
+            hot = SQLiteTicketRepository(hot_conn, epoch).iter_chunks(columns, filters, created_from, created_to, order_by)
+            if sharded:
+                yield from merge_sorted([archived, hot], sort_key)
+            else:
+                yield from archived
+                yield from hot
+        finally:
+            conn.close()
+            hot_conn.close()
+    
+    # Stream rows straight from the cursors to JSON without building dicts;
+    # shards are read concurrently, each on its own thread
+    if sharded:
+        chunks = merge_sorted([prefetch(row_chunks(shard)) for shard in range(SHARD_COUNT)], sort_key)
+    else:
+        chunks = row_chunks(0)
+    return Response(iter_json_chunks(columns, chunks, close=chunks.close), mimetype='application/json')
 
 @app.route('/api/tickets/<int:ticket_id>', methods=['GET'])
 def get_ticket(ticket_id):
     if 'username' not in session:
         return jsonify({"error": "Unauthorized"}), 401
     
-    conn = get_db_connection()
-    ticket = conn.execute('SELECT * FROM tickets WHERE id = ?', (ticket_id,)).fetchone()
+    shard = ticket_shard(ticket_id)
+    if shard is None:
+        return jsonify({"error": "Ticket not found"}), 404
+    
+    conn = get_db_connection(shard)
+    ticket = SQLiteTicketRepository(conn).get(ticket_id)
+    if ticket is None:
+        # Old closed tickets live in the archive files
+        ticket = find_archived_ticket(conn, ticket_id, get_archive_dir(shard))
     conn.close()
     
     if ticket is None:
         return jsonify({"error": "Ticket not found"}), 404
     
-    return jsonify(dict(ticket))
+    response = jsonify(dict(ticket))
+    response.headers['ETag'] = f'"{ticket["version"]}"'
+    return response
 
 @app.route('/api/tickets', methods=['POST'])
 def create_ticket():
@@ -115,37 +393,28 @@ def create_ticket():
     data['created_at'] = now
     data['updated_at'] = now
     data['assigned_to'] = None
+    data['version'] = 1
     
     # Apply automation rules
     if data['priority'] == 'high':
         data['status'] = 'in_progress'
-        data['assigned_to'] = 'Senior Analyst'
-        logger.info(f"High priority ticket automatically assigned to Senior Analyst")
+        data['assigned_to'] = route_assignee('high', 'Senior Analyst')
+        logger.info(f"High priority ticket automatically assigned to {data['assigned_to']}")
     elif data['priority'] == 'low':
-        data['assigned_to'] = 'SupportBot'
-        logger.info(f"Low priority ticket automatically assigned to SupportBot")
-    
-    # Insert into database
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-    INSERT INTO tickets (title, description, status, priority, created_at, updated_at, assigned_to)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        data['title'], 
-        data['description'], 
-        data['status'], 
-        data['priority'], 
-        data['created_at'], 
-        data['updated_at'], 
-        data['assigned_to']
-    ))
-    
-    # Get the ID of the inserted ticket
-    ticket_id = cursor.lastrowid
+        data['assigned_to'] = route_assignee('low', 'SupportBot')
+        logger.info(f"Low priority ticket automatically assigned to {data['assigned_to']}")
+    
+    # Insert into the shard chosen by content, taking the next id of its range
+    shard = shard_for(content_fingerprint(data['title'], data['description']), SHARD_COUNT)
+    conn = get_db_connection(shard)
+    ticket_id = SQLiteTicketRepository(conn).add(
+        {field: data[field] for field in ('title', 'description', 'status', 'priority',
+                                          'created_at', 'updated_at', 'assigned_to')},
+        id_floor(shard))
     conn.commit()
     conn.close()
     
+    on_ticket_changed(None, {"id": ticket_id, **data})
     logger.success(f"New ticket created: ID={ticket_id}, Title={data['title']}, Priority={data['priority']}")
     
     # Return the created ticket
@@ -154,77 +423,290 @@ def create_ticket():
         **data
     }), 201
 
-@app.route('/api/tickets/<int:ticket_id>', methods=['PUT'])
-def update_ticket(ticket_id):
-    if 'username' not in session:
-        return jsonify({"error": "Unauthorized"}), 401
-    
-    data = request.json
-    
-    # Get current ticket data
-    conn = get_db_connection()
-    ticket = conn.execute('SELECT * FROM tickets WHERE id = ?', (ticket_id,)).fetchone()
-    
-    if ticket is None:
-        conn.close()
-        return jsonify({"error": "Ticket not found"}), 404
-    
-    current_ticket = dict(ticket)
-    
-    # Apply automation rules
-    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    data['updated_at'] = now
-    
+# Fields a client may change through the update endpoints
+UPDATABLE_FIELDS = ['title', 'description', 'status', 'priority', 'assigned_to', 'updated_at']
+
+# Fields a bulk update may select tickets by
+BATCH_FILTER_FIELDS = ['status', 'priority', 'assigned_to']
+
+# Retries for an unpinned update that races a concurrent writer
+UPDATE_ATTEMPTS = 3
+
+def apply_update_rules(current_ticket, data):
+    """Apply the update automation rules to data (modified in place)"""
     # Rule: If changing from low priority to in_progress, must be assigned to an analyst
     if (current_ticket['priority'] == 'low' and 
         data.get('status') == 'in_progress' and 
         current_ticket['status'] != 'in_progress'):
         
         if 'assigned_to' not in data or data['assigned_to'] is None:
-            data['assigned_to'] = 'Junior Analyst'
-            logger.info(f"Low priority ticket escalated to in_progress, automatically assigned to Junior Analyst")
+            data['assigned_to'] = route_assignee('escalation', 'Junior Analyst')
+            logger.info(f"Low priority ticket escalated to in_progress, automatically assigned to {data['assigned_to']}")
     
-    # Rule: High priority tickets must be assigned to Senior Analyst
+    # Rule: High priority tickets must be assigned to a senior analyst
     if data.get('priority') == 'high' and current_ticket['priority'] != 'high':
-        data['assigned_to'] = 'Senior Analyst'
+        data['assigned_to'] = route_assignee('high', 'Senior Analyst')
         if data.get('status') == 'open':
             data['status'] = 'in_progress'
-        logger.info(f"Ticket escalated to high priority, automatically assigned to Senior Analyst")
+        logger.info(f"Ticket escalated to high priority, automatically assigned to {data['assigned_to']}")
     
-    # Update fields
-    fields = ['title', 'description', 'status', 'priority', 'assigned_to', 'updated_at']
-    updates = []
-    values = []
+    return data
+
+def build_update(data):
+    """The updatable fields present in data"""
+    return {field: data[field] for field in UPDATABLE_FIELDS if field in data}
+
+@app.route('/api/tickets/<int:ticket_id>', methods=['PUT'])
+def update_ticket(ticket_id):
+    if 'username' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
     
-    for field in fields:
-        if field in data:
-            updates.append(f"{field} = ?")
-            values.append(data[field])
+    data = request.json
     
-    if not updates:
-        conn.close()
-        return jsonify({"error": "No fields to update"}), 400
+    # Optimistic concurrency: clients may pin the version they last read
+    expected_version = data.pop('version', None)
+    if expected_version is None:
+        expected_version = parse_if_match(request.headers.get('If-Match'))
+    else:
+        try:
+            expected_version = int(expected_version)
+        except (TypeError, ValueError):
+            return jsonify({"error": "'version' must be an integer"}), 400
+    
+    shard = ticket_shard(ticket_id)
+    if shard is None:
+        return jsonify({"error": "Ticket not found"}), 404
     
-    # Execute update
-    values.append(ticket_id)
-    cursor = conn.cursor()
-    cursor.execute(f'''
-    UPDATE tickets 
-    SET {", ".join(updates)}
-    WHERE id = ?
-    ''', values)
+    conn = get_db_connection(shard)
+    tickets = SQLiteTicketRepository(conn)
+    for attempt in range(UPDATE_ATTEMPTS):
+        # Get current ticket data; the rules and the routing, SLA and sketch updates
+        # need the stored state, which UPDATE ... RETURNING cannot report
+        current_ticket = tickets.get(ticket_id)
+        
+        if current_ticket is None:
+            conn.close()
+            return jsonify({"error": "Ticket not found"}), 404
+        
+        if expected_version is not None and current_ticket['version'] != expected_version:
+            conn.close()
+            return version_conflict(current_ticket['version'])
+        
+        # Apply automation rules
+        changes = {**data, 'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        apply_update_rules(current_ticket, changes)
+        
+        # Update fields
+        updates = build_update(changes)
+        
+        if not updates:
+            conn.close()
+            return jsonify({"error": "No fields to update"}), 400
+        
+        # Execute update only if nobody committed in between
+        updated = tickets.update(ticket_id, updates, current_ticket['version'])
+        
+        # Closing a ticket feeds its resolution time into the percentile sketches
+        if updated is not None and updated['status'] == 'closed' and current_ticket['status'] != 'closed':
+            record_resolution(conn, updated)
+        conn.commit()
+        
+        if updated is not None:
+            break
+        if expected_version is not None:
+            conn.close()
+            return version_conflict(None)
+    else:
+        conn.close()
+        return version_conflict(None)
     
-    conn.commit()
     conn.close()
+    on_ticket_changed(current_ticket, updated)
     
     logger.success(f"Ticket updated: ID={ticket_id}")
     
-    # Return updated ticket
+    # Return the committed ticket
+    response = jsonify(updated)
+    response.headers['ETag'] = f'"{updated["version"]}"'
+    return response
+
+def parse_if_match(header):
+    """Extract a ticket version from an If-Match header such as '"3"'"""
+    if not header:
+        return None
+    value = header.strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        return None
+
+def version_conflict(current_version):
+    """Response for an update that lost an optimistic concurrency race"""
+    body = {"error": "Ticket was modified by another request"}
+    if current_version is not None:
+        body['current_version'] = current_version
+    return jsonify(body), 409
+
+@app.route('/api/tickets', methods=['PATCH'])
+def batch_update_tickets():
+    """Apply the same changes to many tickets in a single transaction (one per shard)"""
+    if 'username' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    data = request.json or {}
+    changes = data.get('changes')
+    ticket_ids = data.get('ids')
+    ticket_filter = data.get('filter')
+    
+    # Validate batch request
+    if not isinstance(changes, dict) or not any(field in changes for field in UPDATABLE_FIELDS):
+        return jsonify({"error": "No fields to update"}), 400
+    if (ticket_ids is None) == (ticket_filter is None):
+        return jsonify({"error": "Provide exactly one of 'ids' or 'filter'"}), 400
+    if ticket_ids is not None and (not isinstance(ticket_ids, list) or
+                                   not all(isinstance(i, int) for i in ticket_ids)):
+        return jsonify({"error": "'ids' must be a list of integers"}), 400
+    if ticket_filter is not None and (not isinstance(ticket_filter, dict) or not ticket_filter or
+                                      any(field not in BATCH_FILTER_FIELDS for field in ticket_filter)):
+        return jsonify({"error": f"'filter' may only use: {', '.join(BATCH_FILTER_FIELDS)}"}), 400
+    
+    # Each shard's tickets are updated in one transaction on that shard
+    if ticket_ids is not None:
+        targets = group_by_shard(dict.fromkeys(ticket_ids))
+    else:
+        targets = dict.fromkeys(range(SHARD_COUNT))
+    
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    results = []
+    found_ids = set()
+    for shard, shard_ids in targets.items():
+        if not 0 <= shard < SHARD_COUNT:
+            continue
+        conn = get_db_connection(shard)
+        changed = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            repository = SQLiteTicketRepository(conn)
+            tickets = repository.get_many(shard_ids) if shard_ids is not None else repository.find(ticket_filter)
+            results.extend(apply_batch_changes(repository, tickets, changes, now, changed))
+            found_ids.update(ticket['id'] for ticket in tickets)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            # Nothing in this shard was committed, so give back the load it was routed
+            for old_ticket, new_ticket in reversed(changed):
+                load_balancer.track(open_assignee(new_ticket), open_assignee(old_ticket))
+            raise
+        finally:
+            conn.close()
+        for old_ticket, new_ticket in changed:
+            on_ticket_changed(old_ticket, new_ticket, track_load=False)
+    
+    if ticket_ids is not None:
+        for ticket_id in dict.fromkeys(ticket_ids):
+            if ticket_id not in found_ids:
+                results.append({"id": ticket_id, "result": "not_found"})
+    
+    updated_count = sum(1 for result in results if result['result'] == 'updated')
+    logger.success(f"Batch update applied: {updated_count} of {len(results)} tickets updated")
+    
     return jsonify({
-        "id": ticket_id,
-        **{**current_ticket, **data}
+        "updated": updated_count,
+        "results": results
+    })
+
+def apply_batch_changes(repository, tickets, changes, now, changed):
+    """Update each ticket within the caller's transaction; returns the per-ticket results
+
+    The (old, new) ticket pairs are appended to changed for on_ticket_changed
+    once the caller commits. Only the routing counts move per item, so later
+    escalations in the batch see the load; the caller reverts them if the
+    transaction fails.
+    """
+    # Apply the automation rules per ticket; a savepoint isolates failed items
+    results = []
+    conn = repository.conn
+    for current_ticket in tickets:
+        ticket_changes = apply_update_rules(current_ticket, {**changes, 'updated_at': now})
+        
+        conn.execute('SAVEPOINT batch_item')
+        try:
+            updated = repository.update(current_ticket['id'], build_update(ticket_changes))
+        except sqlite3.IntegrityError as e:
+            conn.execute('ROLLBACK TO batch_item')
+            results.append({"id": current_ticket['id'], "result": "error", "error": str(e)})
+            continue
+        finally:
+            conn.execute('RELEASE batch_item')
+        
+        if updated['status'] == 'closed' and current_ticket['status'] != 'closed':
+            record_resolution(conn, updated)
+        load_balancer.track(open_assignee(current_ticket), open_assignee(updated))
+        changed.append((current_ticket, updated))
+        results.append({"id": updated['id'], "result": "updated", "ticket": updated})
+    return results
+
+def get_timelines():
+    """Per-priority ticket timelines, cached for ANALYTICS_CACHE_TTL seconds"""
+    timelines = analytics_cache.get('timelines')
+    if timelines is None:
+        shard_rows = fan_out(lambda conn: SQLiteTicketRepository(conn).timeline_rows())
+        timelines = build_timelines([row for rows in shard_rows for row in rows])
+        analytics_cache.set('timelines', timelines)
+    return timelines
+
+@app.route('/api/analytics/aging', methods=['GET'])
+def ticket_aging():
+    """Age buckets of unresolved tickets, optionally limited to some priorities"""
+    if 'username' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    timelines = get_timelines()
+    priorities = request.args.getlist('priority') or sorted(timelines)
+    buckets = age_buckets([timelines[p] for p in priorities if p in timelines], datetime.now())
+    
+    return jsonify({
+        "priorities": priorities,
+        "open_tickets": sum(bucket['count'] for bucket in buckets),
+        "buckets": buckets
     })
 
+@app.route('/api/analytics/resolution', methods=['GET'])
+def resolution_percentiles():
+    """Resolution-time percentiles (hours) overall, per priority and per assignee"""
+    if 'username' not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    dimension = request.args.get('dimension')
+    if SHARD_COUNT > 1:
+        return jsonify(merged_resolution_percentiles(dimension))
+    
+    conn = get_db_connection()
+    rows = percentile_rows(conn, dimension)
+    conn.close()
+    
+    return jsonify(rows)
+
+def merged_resolution_percentiles(dimension=None):
+    """Percentile rows computed from the sketches of every shard merged together"""
+    merged = {}
+    for sketches in fan_out(load_sketches):
+        for key, sketch in sketches.items():
+            if key in merged:
+                merged[key].merge(sketch)
+            else:
+                merged[key] = sketch
+    rows = []
+    for (sketch_dimension, name), sketch in sorted(merged.items()):
+        if dimension and sketch_dimension != dimension:
+            continue
+        summary = sketch.summary()
+        rows.append({'dimension': sketch_dimension, 'name': name, 'count': summary['count'],
+                     **{quantile: summary[quantile] for quantile in REPORTED_QUANTILES}})
+    return rows
+
 @app.route('/webhook/ticket', methods=['POST'])
 def webhook_ticket():
     """Webhook endpoint for external systems to create tickets"""
@@ -235,10 +717,73 @@ def webhook_ticket():
         logger.error("Invalid webhook data received")
         return jsonify({"error": "Invalid data"}), 400
     
+    # Content decides the shard, so re-fired alerts and retries meet their earlier tickets
+    fingerprint = content_fingerprint(data['title'], data['description'])
+    shard = shard_for(fingerprint, SHARD_COUNT)
+    
+    # Retried deliveries with a known Idempotency-Key are answered from cache
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        cached = deduplicator.cached_response(idempotency_key)
+        if cached is not None:
+            return replay_response(cached)
+    
+    # Fold alert storms into the ticket opened for the first alert
+    storm_fingerprint = normalized_fingerprint(data['title'], data['description'])
+    coalesced = coalescer.fold(storm_fingerprint)
+    if coalesced is not None:
+        body = {
+            "message": "Alert coalesced into open ticket",
+            **coalesced
+        }
+        if idempotency_key:
+            # Persisted like any other response, so retries reaching another process are replayed too
+            conn = get_db_connection(shard)
+            stored = None
+            if not store_idempotent_response(conn, idempotency_key, 200, body):
+                stored = deduplicator.stored_response(conn, idempotency_key)
+            conn.close()
+            if stored is not None:
+                return replay_response(stored)
+        return jsonify(body), 200
+    
+    conn = get_db_connection(shard)
+    coalescer.start(get_db_connection)
+    
+    if idempotency_key:
+        stored = deduplicator.stored_response(conn, idempotency_key)
+        if stored is not None:
+            conn.close()
+            return replay_response(stored)
+    
     # Set default values if not provided
     if 'priority' not in data:
         data['priority'] = 'medium'
     
+    # Suppress re-fired alerts whose ticket is still unresolved
+    if deduplicator.fingerprints is None:
+        load_fingerprint_filter()
+    duplicate = deduplicator.find_duplicate(conn, fingerprint)
+    if duplicate is not None:
+        # Counted in the database right away (it may have been closed since the lookup)
+        duplicate = SQLiteTicketRepository(conn).record_occurrence(duplicate['id'],
+                                                                   datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    if duplicate is not None:
+        body = {
+            "message": "Duplicate ticket suppressed",
+            **duplicate
+        }
+        if idempotency_key and not store_idempotent_response(conn, idempotency_key, 200, body):
+            # A concurrent delivery with the same key won the race; its count stands instead
+            stored = deduplicator.stored_response(conn, idempotency_key)
+            conn.close()
+            return replay_response(stored)
+        conn.commit()
+        conn.close()
+        coalescer.open_window(storm_fingerprint, duplicate, duplicate['occurrence_count'])
+        logger.info(f"Duplicate webhook ticket suppressed: ID={duplicate['id']}")
+        return jsonify(body), 200
+    
     # Create ticket with the same logic as the regular endpoint
     now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     ticket_data = {
@@ -248,43 +793,71 @@ def webhook_ticket():
         'status': 'open',
         'created_at': now,
         'updated_at': now,
-        'assigned_to': None
+        'assigned_to': None,
+        'occurrence_count': 1,
+        'first_seen_at': now,
+        'last_seen_at': now,
+        'version': 1
     }
     
     # Apply automation rules
     if ticket_data['priority'] == 'high':
         ticket_data['status'] = 'in_progress'
-        ticket_data['assigned_to'] = 'Senior Analyst'
+        ticket_data['assigned_to'] = route_assignee('high', 'Senior Analyst')
     elif ticket_data['priority'] == 'low':
-        ticket_data['assigned_to'] = 'SupportBot'
+        ticket_data['assigned_to'] = route_assignee('low', 'SupportBot')
     
     # Insert into database
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('''
-    INSERT INTO tickets (title, description, status, priority, created_at, updated_at, assigned_to)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        ticket_data['title'], 
-        ticket_data['description'], 
-        ticket_data['status'], 
-        ticket_data['priority'], 
-        ticket_data['created_at'], 
-        ticket_data['updated_at'], 
-        ticket_data['assigned_to']
-    ))
-    
-    ticket_id = cursor.lastrowid
+    ticket_id = SQLiteTicketRepository(conn).add(ticket_data, id_floor(shard))
+    deduplicator.remember_fingerprint(conn, fingerprint, ticket_id)
+    
+    body = {
+        "id": ticket_id,
+        "message": "Ticket created successfully",
+        **ticket_data
+    }
+    if idempotency_key and not store_idempotent_response(conn, idempotency_key, 201, body):
+        # A concurrent delivery with the same key won the race
+        stored = deduplicator.stored_response(conn, idempotency_key)
+        conn.close()
+        return replay_response(stored)
+    
     conn.commit()
     conn.close()
     
+    on_ticket_changed(None, {"id": ticket_id, **ticket_data})
+    coalescer.open_window(storm_fingerprint, {"id": ticket_id, **ticket_data})
     logger.success(f"New ticket created via webhook: ID={ticket_id}, Title={ticket_data['title']}")
     
-    return jsonify({
-        "id": ticket_id,
-        "message": "Ticket created successfully",
-        **ticket_data
-    }), 201
+    return jsonify(body), 201
+
+def load_fingerprint_filter():
+    """Fill the duplicate-alert filter from the fingerprints of every shard"""
+    conns = [get_db_connection(shard) for shard in range(SHARD_COUNT)]
+    try:
+        deduplicator.load_filter(conns)
+    finally:
+        for conn in conns:
+            conn.close()
+
+def store_idempotent_response(conn, key, status_code, body):
+    """Persist a webhook response under its Idempotency-Key
+
+    Returns False (after rolling back) if the key was already taken.
+    """
+    if not deduplicator.remember_response(conn, key, status_code, body):
+        conn.rollback()
+        return False
+    conn.commit()
+    return True
+
+def replay_response(cached):
+    """Build the response for a delivery that was already processed"""
+    status_code, body = cached
+    response = jsonify(body)
+    response.status_code = status_code
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
 
 if __name__ == '__main__':
     # Ensure templates directory exists
@@ -378,5 +951,9 @@ if __name__ == '__main__':
 </html>
             ''')
     
+    # Start background monitors in the serving process (not the reloader parent)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
+    
     # Run the Flask app
     app.run(host='0.0.0.0', port=5000, debug=True)
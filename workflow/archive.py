@@ -0,0 +1,213 @@
+import argparse
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Maps archived ticket ids to the month file that holds them (in the hot database)
+ARCHIVE_INDEX_TABLE = '''
+CREATE TABLE IF NOT EXISTS archived_tickets (
+    id INTEGER PRIMARY KEY,
+    month TEXT NOT NULL
+)
+'''
+ARCHIVE_INDEX_MONTH = 'CREATE INDEX IF NOT EXISTS idx_archived_tickets_month ON archived_tickets (month)'
+
+
+def archive_dir_for(db_path):
+    """Default archive directory: '<db name>_archive' next to the database file"""
+    base, _ = os.path.splitext(db_path)
+    return f"{base}_archive"
+
+
+def archive_path(archive_dir, month):
+    """Archive file holding tickets created in month ('YYYY-MM')"""
+    return os.path.join(archive_dir, f"tickets_{month.replace('-', '_')}.db")
+
+
+def month_of(value):
+    return str(value)[:7]
+
+
+def months_between(months, start=None, end=None):
+    """Archive months overlapping the [start, end] date range (either bound optional)"""
+    start_month = month_of(start) if start else None
+    end_month = month_of(end) if end else None
+    return [
+        month for month in months
+        if (start_month is None or month >= start_month) and (end_month is None or month <= end_month)
+    ]
+
+
+@contextmanager
+def attached(conn, path, alias='archive'):
+    """ATTACH an archive file for the duration of a block"""
+    conn.execute('ATTACH DATABASE ? AS ' + alias, (path,))
+    try:
+        yield alias
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+    finally:
+        conn.execute('DETACH DATABASE ' + alias)
+
+
+def archived_months(conn):
+    """Months that have archive files, oldest first ([] if nothing was archived)"""
+    try:
+        return [row[0] for row in conn.execute('SELECT DISTINCT month FROM archived_tickets ORDER BY month')]
+    except sqlite3.OperationalError:
+        return []
+
+
+def ticket_columns(conn, schema='main'):
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info(tickets)')]
+
+
+def ensure_archive_table(conn, alias):
+    # Create the archive table from the hot table's definition, then add any
+    # columns the hot table gained since the archive file was created
+    create_sql = conn.execute(
+        "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = 'tickets'"
+    ).fetchone()[0]
+    create_sql = re.sub(r'^CREATE TABLE (IF NOT EXISTS )?"?tickets"?',
+                        f'CREATE TABLE IF NOT EXISTS {alias}.tickets', create_sql.strip())
+    conn.execute(create_sql)
+    archived = set(ticket_columns(conn, alias))
+    for cid, name, col_type, notnull, default, pk in conn.execute('PRAGMA main.table_info(tickets)'):
+        if name not in archived:
+            definition = col_type
+            if default is not None:
+                definition += f" DEFAULT {default}"
+            if notnull and default is not None:
+                definition += " NOT NULL"
+            conn.execute(f'ALTER TABLE {alias}.tickets ADD COLUMN {name} {definition}')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {alias}.idx_archive_created ON tickets (created_at)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS {alias}.idx_archive_created_epoch ON tickets (created_epoch)')
+    conn.commit()
+
+
+def archive_closed_tickets(conn, db_path, cutoff, archive_dir=None, chunk_size=500, logger=None):
+    """Move closed tickets last updated before cutoff into per-month archive files
+
+    Tickets are grouped by the month they were created in. Each month file
+    is attached once and filled in keyset-ordered chunks, one short
+    transaction per chunk, so live writers are never blocked for long.
+    Re-running after an interruption is safe. Returns the number moved.
+    """
+    archive_dir = archive_dir or archive_dir_for(db_path)
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = cutoff.strftime('%Y-%m-%d %H:%M:%S') if isinstance(cutoff, datetime) else cutoff
+
+    conn.execute(ARCHIVE_INDEX_TABLE)
+    conn.execute(ARCHIVE_INDEX_MONTH)
+    conn.commit()
+
+    months = [row[0] for row in conn.execute('''
+    SELECT DISTINCT substr(created_at, 1, 7) FROM tickets
+    WHERE status = 'closed' AND updated_at < ?
+    ORDER BY 1
+    ''', (cutoff,))]
+
+    columns = ", ".join(ticket_columns(conn))
+    moved = 0
+    for month in months:
+        with attached(conn, archive_path(archive_dir, month)) as alias:
+            ensure_archive_table(conn, alias)
+            last_id = 0
+            while True:
+                # The chunk is read under the write lock, and the move re-checks the
+                # condition, so a ticket reopened or edited meanwhile stays live. Ids are
+                # never reused (see schema.py); a clash with an archived id fails the chunk
+                # instead of overwriting the archived ticket
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    ids = [row[0] for row in conn.execute('''
+                    SELECT id FROM main.tickets
+                    WHERE status = 'closed' AND updated_at < ? AND substr(created_at, 1, 7) = ? AND id > ?
+                    ORDER BY id LIMIT ?
+                    ''', (cutoff, month, last_id, chunk_size))]
+                    if not ids:
+                        conn.rollback()
+                        break
+                    placeholders = ", ".join("?" for _ in ids)
+                    still_closed = f"id IN ({placeholders}) AND status = 'closed' AND updated_at < ?"
+                    conn.execute(f'''
+                    INSERT INTO {alias}.tickets ({columns})
+                    SELECT {columns} FROM main.tickets WHERE {still_closed}
+                    ''', ids + [cutoff])
+                    archived = [row[0] for row in conn.execute(
+                        f'DELETE FROM main.tickets WHERE {still_closed} RETURNING id', ids + [cutoff]).fetchall()]
+                    conn.executemany('INSERT INTO main.archived_tickets (id, month) VALUES (?, ?)',
+                                     [(ticket_id, month) for ticket_id in archived])
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                moved += len(archived)
+                last_id = ids[-1]
+        if logger:
+            logger.info(f"Archived closed tickets created in {month} to {archive_path(archive_dir, month)}")
+    return moved
+
+
+def find_archived_ticket(conn, ticket_id, archive_dir):
+    """Fetch one ticket from its archive file, or None if it was never archived"""
+    try:
+        row = conn.execute('SELECT month FROM archived_tickets WHERE id = ?', (ticket_id,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if row is None or not os.path.exists(archive_path(archive_dir, row[0])):
+        return None
+    with attached(conn, archive_path(archive_dir, row[0])) as alias:
+        rows = conn.execute(f'SELECT * FROM {alias}.tickets WHERE id = ?', (ticket_id,)).fetchall()
+    return rows[0] if rows else None
+
+
+def iter_archived_rows(conn, archive_dir, months, where='', params=(), chunk_size=500, columns=None,
+                       order_by='id'):
+    """Yield chunks of archived ticket rows for the given months, one file at a time
+
+    Rows use the hot table's column order (or the given columns); columns
+    missing from an older archive file come back as NULL.
+    """
+    columns = columns or ticket_columns(conn)
+    for month in months:
+        path = archive_path(archive_dir, month)
+        if not os.path.exists(path):
+            continue
+        with attached(conn, path) as alias:
+            archived = set(ticket_columns(conn, alias))
+            select = ", ".join(column if column in archived else f"NULL AS {column}" for column in columns)
+            cursor = conn.execute(f'SELECT {select} FROM {alias}.tickets {where} ORDER BY {order_by}', params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cursor.close()
+
+
+if __name__ == '__main__':
+    from schema import ensure_schema
+    from logger import Logger
+
+    parser = argparse.ArgumentParser(description="Archive old closed tickets into per-month SQLite files")
+    parser.add_argument('--db', default=os.environ.get('TICKETS_DB', '../database/tickets.db'))
+    parser.add_argument('--days', type=int, default=90, help="archive tickets closed more than this many days ago")
+    parser.add_argument('--archive-dir', default=None)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+
+    logger = Logger()
+    conn = sqlite3.connect(args.db)
+    ensure_schema(conn)
+    cutoff = datetime.now() - timedelta(days=args.days)
+    moved = archive_closed_tickets(conn, args.db, cutoff, args.archive_dir, args.chunk_size, logger)
+    conn.close()
+    logger.success(f"Archived {moved} closed tickets last updated before {cutoff:%Y-%m-%d}")
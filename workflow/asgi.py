@@ -0,0 +1,156 @@
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncBridge:
+    """Serves a WSGI app over ASGI with the blocking work on a bounded executor
+
+    Connections, request bodies and response streaming are handled on the
+    event loop, so thousands of idle or slow clients cost no threads. Only
+    the route handlers themselves (SQLite work, password hashing) run on
+    the executor, max_workers at a time; other requests wait on the loop.
+    """
+
+    def __init__(self, wsgi_app, max_workers=None, on_startup=None, on_shutdown=None):
+        self.wsgi_app = wsgi_app
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='db-worker')
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.handle(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.on_startup:
+                    await asyncio.get_running_loop().run_in_executor(self.executor, self.on_startup)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.on_shutdown:
+                    await asyncio.get_running_loop().run_in_executor(self.executor, self.on_shutdown)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def handle(self, scope, receive, send):
+        # Read the whole request body on the loop before taking a worker
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        environ = self.build_environ(scope, bytes(body))
+        await self.run_wsgi(environ, send)
+
+    async def run_wsgi(self, environ, send):
+        """Run the WSGI app and each step of its body on the executor, sending the response from the loop
+
+        A slow client then holds up only this coroutine, not a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+            return lambda data: None
+
+        result = await loop.run_in_executor(self.executor, self.wsgi_app, environ, start_response)
+        try:
+            chunks = iter(result)
+            done = object()
+            started = False
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, done)
+                if chunk is done:
+                    break
+                if not chunk:
+                    continue
+                if not started:
+                    await send({'type': 'http.response.start', 'status': response['status'],
+                                'headers': response['headers']})
+                    started = True
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                await send({'type': 'http.response.start', 'status': response['status'],
+                            'headers': response['headers']})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, result.close)
+
+    @staticmethod
+    def build_environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+
+def create_application():
+    """The workflow API as an ASGI app (DB_WORKERS sets the executor size)"""
+    import app as workflow_app
+
+    def stop_background_services():
+        workflow_app.sla_monitor.stop()
+        workflow_app.coalescer.stop(workflow_app.get_db_connection)
+        workflow_app.replicator.stop()
+
+    workers = int(os.environ['DB_WORKERS']) if 'DB_WORKERS' in os.environ else None
+    return AsyncBridge(workflow_app.app, workers,
+                       on_startup=workflow_app.start_background_services,
+                       on_shutdown=stop_background_services)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the workflow API with an asyncio event loop")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("The async serving mode needs an ASGI server: pip install uvicorn")
+    uvicorn.run(create_application(), host=args.host, port=args.port, backlog=4096, log_level='warning')
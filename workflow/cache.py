@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-memory cache whose entries expire after a fixed time
+
+    Every entry lives for the same ttl, so insertion order is also expiry
+    order and purging only ever looks at the front of the cache.
+    """
+
+    def __init__(self, ttl=3600, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return a cached value, or default if it is missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the oldest entries when the cache is full"""
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + self.ttl, value)
+            self._data.move_to_end(key)
+            self._purge(now)
+
+    def pop(self, key, default=None):
+        """Remove a key and return its value"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _purge(self, now):
+        # Entries are kept in insertion order, so the oldest (and first to expire) sit at the front
+        while self._data:
+            expires_at, _ = next(iter(self._data.values()))
+            if len(self._data) <= self.max_size and expires_at > now:
+                break
+            self._data.popitem(last=False)
@@ -0,0 +1,156 @@
+import atexit
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from sharding import connect_shard, shard_of
+
+# Numbers and hex identifiers vary between otherwise identical alerts
+VOLATILE_TOKENS = re.compile(r'0x[0-9a-f]+|\b[0-9a-f]{8,}\b|\d+')
+
+
+def normalized_fingerprint(title, description):
+    """Fingerprint an alert with volatile tokens and whitespace normalized away"""
+    text = f"{title}\x1f{description}".lower()
+    text = VOLATILE_TOKENS.sub('#', text)
+    text = ' '.join(text.split())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class AlertCoalescer:
+    """Folds bursts of near-identical webhook alerts into one open ticket
+
+    The first alert for a fingerprint creates a ticket and opens a window;
+    matching alerts arriving before the window lapses only bump in-memory
+    counters. Counters are written back in one batch every flush_interval
+    seconds, so an alert storm costs one insert plus a periodic UPDATE.
+    """
+
+    def __init__(self, window=60, flush_interval=10, logger=None):
+        self.window = window
+        self.flush_interval = flush_interval
+        self.logger = logger
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def fold(self, fingerprint):
+        """Count an alert against an open window; returns a ticket snapshot or None"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._windows.get(fingerprint)
+            if entry is None or entry['expires'] <= now:
+                return None
+            entry['occurrence_count'] += 1
+            entry['pending'] += 1
+            entry['last_seen_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            entry['expires'] = now + self.window
+            return self._snapshot(entry)
+
+    def open_window(self, fingerprint, ticket, occurrence_count=1, pending=0):
+        """Start coalescing future alerts for this fingerprint into ticket"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._windows[fingerprint] = {
+                'ticket': ticket,
+                'occurrence_count': occurrence_count,
+                'pending': pending,
+                'first_seen_at': ticket.get('first_seen_at') or ticket['created_at'],
+                'last_seen_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'expires': time.monotonic() + self.window
+            }
+
+    def discard_ticket(self, ticket_id):
+        """Stop folding alerts into a ticket (e.g. once it has been closed)"""
+        with self._lock:
+            for entry in self._windows.values():
+                if entry['ticket']['id'] == ticket_id:
+                    entry['expires'] = 0
+
+    def flush(self, conn):
+        """Write pending occurrence counters back and drop lapsed windows"""
+        return self._write(conn, self._take_pending())
+
+    def _take_pending(self):
+        now = time.monotonic()
+        updates = []
+        with self._lock:
+            for fingerprint, entry in list(self._windows.items()):
+                if entry['pending']:
+                    updates.append((entry['pending'], entry['last_seen_at'], entry['ticket']['id']))
+                    entry['pending'] = 0
+                if entry['expires'] <= now:
+                    del self._windows[fingerprint]
+        return updates
+
+    def _write(self, conn, updates):
+        if not updates:
+            return 0
+        conn.executemany('''
+        UPDATE tickets
+        SET occurrence_count = occurrence_count + ?, last_seen_at = ?
+        WHERE id = ?
+        ''', updates)
+        conn.commit()
+        folded = sum(update[0] for update in updates)
+        if self.logger:
+            self.logger.info(f"Coalesced {folded} webhook alerts into {len(updates)} open tickets")
+        return folded
+
+    def start(self, connect):
+        """Flush periodically on a daemon thread using connections from connect()"""
+        if self._thread is not None or not self.enabled:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(connect,), daemon=True)
+            self._thread.start()
+        atexit.register(self.stop, connect)
+
+    def stop(self, connect=None):
+        """Stop the flusher thread, writing any pending counters first"""
+        self._stop.set()
+        if connect is not None:
+            self._flush_with(connect)
+
+    def _run(self, connect):
+        while not self._stop.wait(self.flush_interval):
+            self._flush_with(connect)
+
+    def _flush_with(self, connect):
+        # Each ticket's counters go to the shard its id belongs to
+        by_shard = {}
+        for update in self._take_pending():
+            by_shard.setdefault(shard_of(update[2]), []).append(update)
+        for shard, updates in by_shard.items():
+            conn = None
+            try:
+                conn = connect_shard(connect, shard)
+                self._write(conn, updates)
+            except sqlite3.Error as e:
+                if self.logger:
+                    self.logger.error(f"Failed to flush coalesced alerts: {e}")
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    @staticmethod
+    def _snapshot(entry):
+        return {
+            **entry['ticket'],
+            'occurrence_count': entry['occurrence_count'],
+            'first_seen_at': entry['first_seen_at'],
+            'last_seen_at': entry['last_seen_at']
+        }
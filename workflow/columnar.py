@@ -0,0 +1,228 @@
+import fcntl
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    from repository import TICKET_FIELDS, SQLiteTicketRepository, connect
+    from schema import EPOCH_COLUMNS
+except ImportError:  # imported as workflow.columnar (dashboard)
+    from workflow.repository import TICKET_FIELDS, SQLiteTicketRepository, connect
+    from workflow.schema import EPOCH_COLUMNS
+
+# Column types of the ticket snapshot; timestamps are parsed once when the file is built
+TICKET_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('title', pa.string()),
+    ('description', pa.string()),
+    ('status', pa.string()),
+    ('priority', pa.string()),
+    ('created_at', pa.timestamp('us')),
+    ('updated_at', pa.timestamp('us')),
+    ('assigned_to', pa.string()),
+    ('occurrence_count', pa.int64()),
+    ('first_seen_at', pa.timestamp('us')),
+    ('last_seen_at', pa.timestamp('us')),
+    ('version', pa.int64()),
+])
+
+# Rows per record batch in the file
+BATCH_ROWS = 8192
+
+
+def _timestamps(values):
+    strings = pa.array(values, pa.string())
+    try:
+        return pc.cast(strings, pa.timestamp('us'))
+    except pa.ArrowInvalid:
+        # Unparseable values become nulls, like pd.to_datetime(errors='coerce')
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(datetime.fromisoformat(value) if value else None)
+            except (TypeError, ValueError):
+                parsed.append(None)
+        return pa.array(parsed, pa.timestamp('us'))
+
+
+def _epoch_timestamps(values):
+    return pc.cast(pa.array(values, pa.int64()).cast(pa.timestamp('s')), pa.timestamp('us'))
+
+
+def snapshot_columns(available, epoch=False):
+    """Ticket columns to read from a table with the given columns
+
+    With epoch the epoch columns are read in place of the text timestamps
+    they were derived from, so building the table parses no strings.
+    """
+    return [EPOCH_COLUMNS.get(column, column) if epoch else column for column in available if column in TICKET_FIELDS]
+
+
+def tickets_table(columns, rows):
+    """Arrow table in TICKET_SCHEMA from row tuples; columns missing from rows are null
+
+    Timestamps come from their epoch column when rows have one.
+    """
+    columns = list(columns)
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    arrays = []
+    for field in TICKET_SCHEMA:
+        if EPOCH_COLUMNS.get(field.name) in columns:
+            arrays.append(_epoch_timestamps(values[columns.index(EPOCH_COLUMNS[field.name])]))
+        elif field.name not in columns:
+            arrays.append(pa.nulls(len(rows), field.type))
+        elif pa.types.is_timestamp(field.type):
+            arrays.append(_timestamps(values[columns.index(field.name)]))
+        else:
+            arrays.append(pa.array(values[columns.index(field.name)], field.type))
+    return pa.Table.from_arrays(arrays, schema=TICKET_SCHEMA)
+
+
+def source_identity(db_path):
+    """Changes whenever the database file (or its write-ahead log) does"""
+    parts = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        parts.append(f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}")
+    return "|".join(parts)
+
+
+def write_columnar_snapshot(db_path, columnar_path, batch_rows=BATCH_ROWS):
+    """Write the tickets of db_path to an Arrow IPC file, one record batch at a time
+
+    The file is uncompressed so readers can memory-map it, and is renamed
+    into place once complete. Returns the number of tickets written.
+    """
+    identity = source_identity(db_path)
+    conn = connect(f"file:{os.path.abspath(db_path)}?mode=ro", row_factory=None, uri=True)
+    tmp_path = f"{columnar_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    schema = TICKET_SCHEMA.with_metadata({'source_identity': identity})
+    written = 0
+    try:
+        repository = SQLiteTicketRepository(conn)
+        columns = snapshot_columns(repository.columns(), repository.epoch)
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for rows in repository.iter_chunks(columns, order_by='id', chunk_size=batch_rows):
+                writer.write_table(tickets_table(columns, rows).replace_schema_metadata(schema.metadata))
+                written += len(rows)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        conn.close()
+    os.replace(tmp_path, columnar_path)
+    return written
+
+
+class ColumnarSnapshot:
+    """Memory-mapped, read-only Arrow copy of the tickets table of a database
+
+    table() maps the file rather than reading it, so every session and
+    every process shares the same pages through the OS page cache. The
+    file records the identity of the database it was built from; when the
+    database changes, the first caller rebuilds the file (under a file
+    lock, so concurrent processes build it once) and readers remap it.
+    """
+
+    def __init__(self, db_path, columnar_path=None):
+        self.db_path = db_path
+        self.columnar_path = columnar_path or f"{os.path.splitext(db_path)[0]}.arrow"
+        self._table = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def _map(self):
+        source = pa.memory_map(self.columnar_path, 'r')
+        table = pa.ipc.open_file(source).read_all()
+        identity = (table.schema.metadata or {}).get(b'source_identity', b'').decode('utf-8')
+        return table, identity
+
+    def table(self):
+        """The current tickets table, rebuilding the file first if the database changed"""
+        identity = source_identity(self.db_path)
+        with self._lock:
+            if self._table is not None and self._identity == identity:
+                return self._table
+            try:
+                table, built_from = self._map()
+            except (FileNotFoundError, pa.ArrowInvalid):
+                table, built_from = None, None
+            if built_from != identity:
+                with open(f"{self.columnar_path}.lock", 'w') as lock:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                    # Another process may have rebuilt it while this one waited
+                    try:
+                        table, built_from = self._map()
+                    except (FileNotFoundError, pa.ArrowInvalid):
+                        built_from = None
+                    if built_from != identity:
+                        write_columnar_snapshot(self.db_path, self.columnar_path)
+                        table, built_from = self._map()
+            # The previous mapping stays valid for readers still holding it
+            self._table, self._identity = table, built_from
+            return table
+
+
+def filter_tickets(table, statuses=None, priorities=None, created_from=None, created_to=None):
+    """Rows of a tickets table matching the filters; created_from/created_to are datetimes (inclusive)
+
+    Masks are computed on the mapped columns; only the matching rows are copied.
+    """
+    conditions = []
+    if statuses is not None:
+        conditions.append(pc.is_in(table['status'], value_set=pa.array(list(statuses), pa.string())))
+    if priorities is not None:
+        conditions.append(pc.is_in(table['priority'], value_set=pa.array(list(priorities), pa.string())))
+    if created_from is not None:
+        conditions.append(pc.greater_equal(table['created_at'], pa.scalar(created_from, pa.timestamp('us'))))
+    if created_to is not None:
+        conditions.append(pc.less_equal(table['created_at'], pa.scalar(created_to, pa.timestamp('us'))))
+    mask = None
+    for condition in conditions:
+        mask = condition if mask is None else pc.and_(mask, condition)
+    return table if mask is None else table.filter(mask)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build the columnar ticket snapshot and compare it with pandas")
+    parser.add_argument('--db', default=os.environ.get('REPLICA_PATH', '../dashboard/replica.db'))
+    parser.add_argument('--out', default=None, help="Arrow file (default: next to the database)")
+    args = parser.parse_args()
+
+    snapshot = ColumnarSnapshot(args.db, args.out)
+    started = time.perf_counter()
+    count = write_columnar_snapshot(snapshot.db_path, snapshot.columnar_path)
+    print(f"Wrote {count} tickets to {snapshot.columnar_path} in {time.perf_counter() - started:.2f}s "
+          f"({os.path.getsize(snapshot.columnar_path) / 1e6:.1f} MB)")
+
+    def rss_mb():
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmRSS')) / 1024
+
+    before = rss_mb()
+    started = time.perf_counter()
+    table = snapshot.table()
+    opened = time.perf_counter() - started
+    print(f"Mapped in {opened * 1000:.1f} ms, heap growth {rss_mb() - before:.1f} MB "
+          f"(allocated by Arrow: {pa.total_allocated_bytes() / 1e6:.1f} MB)")
+
+    import pandas as pd
+    before = rss_mb()
+    started = time.perf_counter()
+    conn = sqlite3.connect(args.db)
+    frame = pd.read_sql_query('SELECT * FROM tickets', conn)
+    frame['created_at'] = pd.to_datetime(frame['created_at'], format='ISO8601', errors='coerce')
+    conn.close()
+    print(f"pandas copy loaded in {(time.perf_counter() - started) * 1000:.1f} ms, "
+          f"{frame.memory_usage(deep=True).sum() / 1e6:.1f} MB per session")
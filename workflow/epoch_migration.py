@@ -0,0 +1,98 @@
+import argparse
+import os
+import sqlite3
+
+try:
+    from archive import archive_dir_for, archive_path, archived_months, attached, ensure_archive_table
+    from maintenance import ChunkedJob
+    from schema import (EPOCH_COLUMNS, EPOCH_INDEXES, EPOCH_MIGRATION, ensure_schema, epoch_ready, epoch_sql,
+                        mark_migrated)
+except ImportError:  # imported as workflow.epoch_migration
+    from workflow.archive import archive_dir_for, archive_path, archived_months, attached, ensure_archive_table
+    from workflow.maintenance import ChunkedJob
+    from workflow.schema import (EPOCH_COLUMNS, EPOCH_INDEXES, EPOCH_MIGRATION, ensure_schema, epoch_ready,
+                                 epoch_sql, mark_migrated)
+
+# Rows still missing an epoch value (rows whose timestamp does not parse keep NULL and are passed over)
+MISSING_EPOCHS = " OR ".join(f"{epoch} IS NULL" for epoch in EPOCH_COLUMNS.values())
+STALE_EPOCHS = " OR ".join(f"{epoch} IS NOT {epoch_sql(text)}" for text, epoch in EPOCH_COLUMNS.items())
+
+
+def backfill_job(name, table, chunk_size=500, rows_per_second=None, checkpoint_path=None, logger=None):
+    """ChunkedJob filling in the epoch columns of table from its text timestamps"""
+    assignments = ", ".join(f"{epoch} = {epoch_sql(text)}" for text, epoch in EPOCH_COLUMNS.items())
+
+    def fill(conn, rows):
+        ids = [row[0] for row in rows]
+        placeholders = ", ".join("?" for _ in ids)
+        return conn.execute(f'''
+        UPDATE {table} SET {assignments}
+        WHERE id IN ({placeholders}) AND ({STALE_EPOCHS})
+        ''', ids).rowcount
+
+    return ChunkedJob(name, where=MISSING_EPOCHS, apply=fill, table=table, columns='id', chunk_size=chunk_size,
+                      rows_per_second=rows_per_second, checkpoint_path=checkpoint_path, logger=logger)
+
+
+def migrate_to_epoch(conn, db_path, archive_dir=None, chunk_size=500, rows_per_second=None, checkpoint_path=None,
+                     logger=None):
+    """Add, backfill and index the epoch timestamp columns of a live database, then switch reads to them
+
+    The columns and the triggers that keep them current are added first,
+    so rows written while the backfill runs are already covered. The
+    backfill then runs in short chunked transactions (see ChunkedJob),
+    over the hot table and every archive file. Indexes are built once the
+    columns are full, and the migration is recorded last: until then
+    readers keep using the text timestamps. Safe to re-run; returns the
+    backfill reports.
+    """
+    ensure_schema(conn)
+    if epoch_ready(conn):
+        if logger:
+            logger.info(f"Epoch timestamps already migrated in {db_path}")
+        return []
+
+    reports = [backfill_job('epoch_backfill', 'tickets', chunk_size, rows_per_second, checkpoint_path,
+                            logger).run(conn)]
+
+    archive_dir = archive_dir or archive_dir_for(db_path)
+    for month in archived_months(conn):
+        path = archive_path(archive_dir, month)
+        if not os.path.exists(path):
+            continue
+        with attached(conn, path) as alias:
+            # Older archive files gain the columns (and their index) here
+            ensure_archive_table(conn, alias)
+            reports.append(backfill_job(f'epoch_backfill_{month}', f'{alias}.tickets', chunk_size,
+                                        rows_per_second, logger=logger).run(conn))
+
+    for ddl in EPOCH_INDEXES:
+        conn.execute(ddl)
+    mark_migrated(conn, EPOCH_MIGRATION)
+    conn.commit()
+    if logger:
+        logger.success(f"Epoch timestamps migrated in {db_path}; reads now use {', '.join(EPOCH_COLUMNS.values())}")
+    return reports
+
+
+if __name__ == '__main__':
+    from logger import Logger
+    from sharding import shard_paths
+
+    parser = argparse.ArgumentParser(description="Migrate ticket timestamps to indexed integer epoch columns online")
+    parser.add_argument('--db', default=os.environ.get('TICKETS_DB', '../database/tickets.db'))
+    parser.add_argument('--shards', type=int, default=int(os.environ.get('TICKETS_SHARDS', '1')),
+                        help="number of shard files next to --db (see sharding.py)")
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=None, help="maximum rows per second")
+    args = parser.parse_args()
+
+    logger = Logger()
+    for path in shard_paths(args.db, args.shards):
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        # An interrupted backfill resumes from the checkpoint next to its database
+        for report in migrate_to_epoch(conn, path, chunk_size=args.chunk_size, rows_per_second=args.rate,
+                                       checkpoint_path=f"{path}.epoch-checkpoint.json", logger=logger):
+            print(report)
+        conn.close()
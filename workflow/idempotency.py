@@ -0,0 +1,128 @@
+import hashlib
+import json
+import math
+import threading
+from datetime import datetime, timedelta
+
+from cache import TTLCache
+
+
+def content_fingerprint(title, description):
+    """Hash a ticket's title and description into a stable fingerprint"""
+    payload = f"{title}\x1f{description}".encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+class BloomFilter:
+    """Compact probabilistic set: no false negatives, rare false positives"""
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: derive k bit positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class WebhookDeduplicator:
+    """Suppresses retried and re-fired webhook deliveries
+
+    Idempotency keys are answered from an in-memory TTL cache backed by the
+    idempotency_keys table. Content fingerprints go through a Bloom filter
+    so that only probable duplicates reach the database lookup.
+    """
+
+    def __init__(self, key_ttl=86400, cache_size=10000, filter_capacity=100000):
+        self.key_ttl = key_ttl
+        self.responses = TTLCache(ttl=key_ttl, max_size=cache_size)
+        self.filter_capacity = filter_capacity
+        self.fingerprints = None
+        self._lock = threading.Lock()
+
+    def cached_response(self, key):
+        """Return a (status_code, body) pair for a key seen by this process"""
+        return self.responses.get(key)
+
+    def stored_response(self, conn, key):
+        """Look up a key persisted by any process and warm the cache with it"""
+        cutoff = (datetime.now() - timedelta(seconds=self.key_ttl)).strftime('%Y-%m-%d %H:%M:%S')
+        row = conn.execute(
+            'SELECT status_code, response FROM idempotency_keys WHERE key = ? AND created_at >= ?',
+            (key, cutoff)
+        ).fetchone()
+        if row is None:
+            return None
+        result = (row[0], json.loads(row[1]))
+        self.responses.set(key, result)
+        return result
+
+    def remember_response(self, conn, key, status_code, body):
+        """Persist the response for a key; the caller commits the transaction
+
+        A key whose stored response has expired is taken over by the new
+        one. Returns False if the key still holds a live response.
+        """
+        now = datetime.now()
+        cutoff = (now - timedelta(seconds=self.key_ttl)).strftime('%Y-%m-%d %H:%M:%S')
+        stored = conn.execute('''
+        INSERT INTO idempotency_keys (key, status_code, response, created_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET status_code = excluded.status_code, response = excluded.response,
+                                       created_at = excluded.created_at
+        WHERE idempotency_keys.created_at < ?
+        ''', (key, status_code, json.dumps(body), now.strftime('%Y-%m-%d %H:%M:%S'), cutoff)).rowcount
+        if not stored:
+            return False
+        self.responses.set(key, (status_code, body))
+        return True
+
+    def _ensure_filter(self, conn):
+        if self.fingerprints is None:
+            self.load_filter([conn])
+
+    def load_filter(self, conns):
+        """Build the fingerprint filter from every database (shard) holding fingerprints"""
+        with self._lock:
+            if self.fingerprints is not None:
+                return
+            fingerprints = BloomFilter(capacity=self.filter_capacity)
+            # Expired keys are only useful for auditing, so prune them on startup
+            cutoff = (datetime.now() - timedelta(seconds=self.key_ttl)).strftime('%Y-%m-%d %H:%M:%S')
+            for conn in conns:
+                for (fingerprint,) in conn.execute('SELECT fingerprint FROM webhook_fingerprints'):
+                    fingerprints.add(fingerprint)
+                conn.execute('DELETE FROM idempotency_keys WHERE created_at < ?', (cutoff,))
+                conn.commit()
+            self.fingerprints = fingerprints
+
+    def find_duplicate(self, conn, fingerprint):
+        """Return the unresolved ticket already created for this content, if any"""
+        self._ensure_filter(conn)
+        if fingerprint not in self.fingerprints:
+            return None
+        return conn.execute('''
+        SELECT t.* FROM webhook_fingerprints f
+        JOIN tickets t ON t.id = f.ticket_id
+        WHERE f.fingerprint = ? AND t.status != 'closed'
+        ''', (fingerprint,)).fetchone()
+
+    def remember_fingerprint(self, conn, fingerprint, ticket_id):
+        """Record the ticket created for this content; the caller commits"""
+        self._ensure_filter(conn)
+        conn.execute(
+            'INSERT OR REPLACE INTO webhook_fingerprints (fingerprint, ticket_id) VALUES (?, ?)',
+            (fingerprint, ticket_id)
+        )
+        with self._lock:
+            self.fingerprints.add(fingerprint)
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Assignees that may hold in-progress high priority tickets
+SENIOR_ASSIGNEES = ('Senior Analyst', 'Team Lead')
+
+
+def default_rules(stale_days=30, senior_assignees=SENIOR_ASSIGNEES, now=None):
+    """The standard integrity rules as (name, description, SQL predicate over one row)"""
+    now = now or datetime.now()
+    stale_cutoff = (now - timedelta(days=stale_days)).strftime('%Y-%m-%d %H:%M:%S')
+    seniors = ", ".join(f"'{name}'" for name in senior_assignees)
+    return [
+        ('required_fields', "Required field is NULL",
+         "title IS NULL OR description IS NULL OR status IS NULL OR priority IS NULL "
+         "OR created_at IS NULL OR updated_at IS NULL"),
+        ('updated_before_created', "updated_at is earlier than created_at",
+         "updated_at < created_at"),
+        ('stale_closed', f"Closed ticket not updated in the last {stale_days} days",
+         f"status = 'closed' AND updated_at < '{stale_cutoff}'"),
+        ('in_progress_unassigned', "In-progress ticket has no assignee",
+         "status = 'in_progress' AND assigned_to IS NULL"),
+        ('high_priority_not_senior', "In-progress high priority ticket is not with a senior assignee",
+         f"priority = 'high' AND status = 'in_progress' AND assigned_to NOT IN ({seniors})"),
+        ('low_priority_bot_in_progress', "Low priority ticket escalated to in_progress but still with SupportBot",
+         "priority = 'low' AND status = 'in_progress' AND assigned_to = 'SupportBot'"),
+    ]
+
+
+def id_partitions(conn, partitions, table='tickets'):
+    """Split the table's id range into roughly equal (low, high) ranges"""
+    low, high = conn.execute(f'SELECT MIN(id), MAX(id) FROM {table}').fetchone()
+    if low is None:
+        return []
+    step = max((high - low + 1) // partitions + 1, 1)
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+
+def scan_connection(conn, rules=None, id_range=None, sample_size=100, table='tickets'):
+    """Check every rule over one id range of the table
+
+    All violation counts come from a single aggregate pass; violating ids
+    are then fetched (up to sample_size per rule, None for all) only for
+    rules that have violations.
+    """
+    rules = rules or default_rules()
+    where, params = '', ()
+    if id_range is not None:
+        where, params = 'WHERE id BETWEEN ? AND ?', tuple(id_range)
+    sums = ", ".join(f"COALESCE(SUM(CASE WHEN {predicate} THEN 1 ELSE 0 END), 0)" for _, _, predicate in rules)
+    counts = conn.execute(f'SELECT COUNT(*), {sums} FROM {table} {where}', params).fetchone()
+
+    report = {'scanned': counts[0], 'rules': {}}
+    for (name, description, predicate), count in zip(rules, counts[1:]):
+        ids = []
+        if count:
+            condition = f"{where} AND ({predicate})" if where else f"WHERE {predicate}"
+            limit = '' if sample_size is None else f'LIMIT {int(sample_size)}'
+            ids = [row[0] for row in conn.execute(f'SELECT id FROM {table} {condition} ORDER BY id {limit}', params)]
+        report['rules'][name] = {'description': description, 'count': count, 'ids': ids}
+    return report
+
+
+def merge_reports(reports, sample_size=100):
+    """Combine per-partition reports (in id order) into one"""
+    merged = {'scanned': 0, 'rules': {}}
+    for report in reports:
+        merged['scanned'] += report['scanned']
+        for name, result in report['rules'].items():
+            total = merged['rules'].setdefault(name, {'description': result['description'], 'count': 0, 'ids': []})
+            total['count'] += result['count']
+            total['ids'].extend(result['ids'])
+    if sample_size is not None:
+        for result in merged['rules'].values():
+            del result['ids'][sample_size:]
+    return merged
+
+
+def scan_database(db_path, rules=None, workers=None, partitions=None, sample_size=100):
+    """Scan a database file with one read-only connection per id range, in parallel
+
+    SQLite releases the GIL while it runs a query, so the ranges are
+    scanned concurrently on a thread pool.
+    """
+    rules = rules or default_rules()
+    workers = workers or os.cpu_count()
+    uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+
+    started = time.monotonic()
+    conn = sqlite3.connect(uri, uri=True)
+    ranges = id_partitions(conn, partitions or workers * 4)
+    conn.close()
+
+    def scan_range(id_range):
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            return scan_connection(conn, rules, id_range, sample_size)
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        report = merge_reports(pool.map(scan_range, ranges), sample_size)
+    report['elapsed_seconds'] = round(time.monotonic() - started, 3)
+    report['violations'] = sum(result['count'] for result in report['rules'].values())
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check ticket data integrity rules")
+    parser.add_argument('--db', default=os.environ.get('TICKETS_DB', '../database/tickets.db'))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--stale-days', type=int, default=30)
+    parser.add_argument('--sample', type=int, default=20, help="violating ids to list per rule")
+    parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+    args = parser.parse_args()
+
+    report = scan_database(args.db, default_rules(args.stale_days), args.workers, sample_size=args.sample)
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print(f"Scanned {report['scanned']} tickets in {report['elapsed_seconds']}s")
+        for name, result in report['rules'].items():
+            status = 'OK' if result['count'] == 0 else f"{result['count']} violations"
+            print(f"  {name}: {status}")
+            if result['ids']:
+                print(f"    ids: {', '.join(str(ticket_id) for ticket_id in result['ids'])}")
+    raise SystemExit(0 if report['violations'] == 0 else 1)
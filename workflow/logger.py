@@ -1,25 +1,38 @@
 from datetime import datetime
+import atexit
 import os
+import threading
 
 class Logger:
     def __init__(self, log_dir='automation_logs'):
-        # Ensure log directory exists
-        os.makedirs(log_dir, exist_ok=True)
         self.log_dir = log_dir
         
-        # Create log file with timestamp
+        # Log file with timestamp; created on the first message so that
+        # importing a module that owns a logger touches no files
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.log_file = os.path.join(log_dir, f"automation_log_{timestamp}.log")
+        self._file_ready = False
+    
+    def _ensure_file(self):
+        # Ensure log directory exists
+        os.makedirs(self.log_dir, exist_ok=True)
         
-        # Initialize log file with header
-        with open(self.log_file, 'w') as f:
-            f.write(f"=== Automation Log Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n\n")
+        # Initialize log file with header (once, even across forked workers)
+        try:
+            with open(self.log_file, 'x') as f:
+                f.write(f"=== Automation Log Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n\n")
+        except FileExistsError:
+            pass
+        self._file_ready = True
     
     def log(self, message, level="INFO"):
         """Log a message with timestamp and level"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_entry = f"[{timestamp}] [{level}] {message}\n"
         
+        if not self._file_ready:
+            self._ensure_file()
+        
         # Write to log file
         with open(self.log_file, 'a') as f:
             f.write(log_entry)
@@ -42,3 +55,56 @@ class Logger:
     def success(self, message):
         """Log a success message"""
         self.log(message, "SUCCESS")
+
+
+class BatchedLogger(Logger):
+    """Logger that buffers INFO/SUCCESS entries and writes them in batches
+
+    Meant for chatty, low-value lines such as one access entry per
+    dashboard rerun: entries are written (and echoed) once max_batch have
+    accumulated or flush_interval seconds after the first buffered one,
+    whichever comes first. Warnings and errors flush the buffer and are
+    written immediately; anything left is flushed at interpreter exit.
+    """
+    
+    def __init__(self, log_dir='automation_logs', max_batch=50, flush_interval=5.0):
+        super().__init__(log_dir)
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+    
+    def log(self, message, level="INFO"):
+        """Buffer a message with timestamp and level"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self._pending.append(f"[{timestamp}] [{level}] {message}\n")
+            if level not in ("INFO", "SUCCESS") or len(self._pending) >= self.max_batch:
+                self._write_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def flush(self):
+        """Write buffered entries now"""
+        with self._lock:
+            self._write_pending()
+    
+    def _write_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        entries, self._pending = "".join(self._pending), []
+        
+        if not self._file_ready:
+            self._ensure_file()
+        
+        # One append and one console write per batch
+        with open(self.log_file, 'a') as f:
+            f.write(entries)
+        print(entries.rstrip())
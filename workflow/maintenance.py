@@ -0,0 +1,112 @@
+import json
+import os
+import sqlite3
+import time
+
+
+class ChunkedJob:
+    """Applies a data fix to matching rows in keyset-ordered chunks
+
+    Each chunk selects the next chunk_size matching rows after the last id
+    seen and hands them to apply(conn, rows) inside its own short
+    BEGIN IMMEDIATE transaction, so live writers only ever wait for one
+    chunk. Progress is checkpointed to a JSON file after every commit; a
+    rerun picks up after the last committed id, and the checkpoint is
+    removed once the job finishes. rows_per_second throttles the job by
+    sleeping between chunks.
+    """
+
+    def __init__(self, name, where, params=(), apply=None, table='tickets', columns='*',
+                 chunk_size=500, rows_per_second=None, checkpoint_path=None, logger=None):
+        self.name = name
+        self.where = where
+        self.params = tuple(params)
+        self.apply = apply
+        self.table = table
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.rows_per_second = rows_per_second
+        self.checkpoint_path = checkpoint_path
+        self.logger = logger
+
+    def load_checkpoint(self):
+        """The saved progress for this job, or a fresh start"""
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('job') != self.name:
+                raise ValueError(f"Checkpoint {self.checkpoint_path} belongs to job '{checkpoint.get('job')}'")
+            return checkpoint
+        return {'job': self.name, 'last_id': 0, 'processed': 0, 'changed': 0, 'chunks': 0}
+
+    def save_checkpoint(self, checkpoint):
+        if not self.checkpoint_path:
+            return
+        # Write then rename so a crash never leaves a half-written checkpoint
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def run(self, conn):
+        """Process every matching row and return a throughput report"""
+        checkpoint = self.load_checkpoint()
+        if checkpoint['processed'] and self.logger:
+            self.logger.info(f"Resuming {self.name} after ID={checkpoint['last_id']} "
+                             f"({checkpoint['processed']} rows already processed)")
+        query = f'''
+        SELECT {self.columns} FROM {self.table}
+        WHERE ({self.where}) AND id > ?
+        ORDER BY id LIMIT ?
+        '''
+
+        started = time.monotonic()
+        processed = 0
+        while True:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = conn.execute(query, self.params + (checkpoint['last_id'], self.chunk_size)).fetchall()
+                if not rows:
+                    conn.rollback()
+                    break
+                changed = self.apply(conn, rows)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+            processed += len(rows)
+            checkpoint['last_id'] = rows[-1]['id'] if isinstance(rows[-1], sqlite3.Row) else rows[-1][0]
+            checkpoint['processed'] += len(rows)
+            checkpoint['changed'] += len(rows) if changed is None else changed
+            checkpoint['chunks'] += 1
+            self.save_checkpoint(checkpoint)
+            if self.logger:
+                self.logger.info(f"{self.name}: chunk {checkpoint['chunks']} committed up to ID={checkpoint['last_id']}")
+
+            # Throttle to the target write rate
+            if self.rows_per_second:
+                ahead = processed / self.rows_per_second - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        elapsed = time.monotonic() - started
+        self.clear_checkpoint()
+        report = {
+            'job': self.name,
+            'processed': checkpoint['processed'],
+            'changed': checkpoint['changed'],
+            'chunks': checkpoint['chunks'],
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(processed / elapsed, 1) if elapsed > 0 else None
+        }
+        if self.logger:
+            self.logger.success(
+                f"{self.name}: {report['processed']} rows processed, {report['changed']} changed "
+                f"in {report['chunks']} chunks ({report['rows_per_second']} rows/s)"
+            )
+        return report
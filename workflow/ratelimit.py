@@ -0,0 +1,176 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+# One bucket per slot: tokens left and when they were last refilled (time.monotonic(),
+# which is the same clock for every process on the host)
+BUCKET = struct.Struct('=dd')
+
+# Slot 0 is the global bucket; clients hash into the rest
+GLOBAL_SLOT = 0
+
+
+def default_bucket_path(db_path):
+    """Bucket file for the service using db_path, in shared memory where the OS has it"""
+    digest = hashlib.blake2b(os.path.abspath(db_path).encode('utf-8'), digest_size=8).hexdigest()
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, f"tickets-ratelimit-{digest}")
+
+
+class SharedTokenBuckets:
+    """Token buckets in a memory-mapped file, shared by every process that opens it
+
+    Each bucket is updated under a byte-range lock on its own slot, so
+    workers only contend when they hit the same bucket. The file is
+    created (zero-filled, i.e. every bucket full) on first use.
+    """
+
+    def __init__(self, path, slots=4096):
+        self.path = path
+        self.slots = slots
+        self._fd = None
+        self._map = None
+        # Byte-range locks are held per process, so threads also need a lock of their own
+        self._lock = threading.Lock()
+
+    def _open(self):
+        size = self.slots * BUCKET.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        self._map = mmap.mmap(fd, size)
+        self._fd = fd
+
+    def slot_for(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+        return 1 + int.from_bytes(digest, 'big') % (self.slots - 1)
+
+    def take(self, slot, rate, burst, cost=1.0, reserve=0.0):
+        """Take cost tokens if at least reserve tokens remain afterwards
+
+        Returns 0 when the tokens were taken, else the seconds until they
+        would be available.
+        """
+        offset = slot * BUCKET.size
+        with self._lock:
+            if self._map is None:
+                self._open()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, BUCKET.size, offset)
+            try:
+                now = time.monotonic()
+                tokens, refilled_at = BUCKET.unpack_from(self._map, offset)
+                if refilled_at == 0 or refilled_at > now:
+                    # A new bucket, or one written before the host rebooted
+                    tokens = burst
+                else:
+                    tokens = min(burst, tokens + (now - refilled_at) * rate)
+                if tokens - cost >= reserve:
+                    BUCKET.pack_into(self._map, offset, tokens - cost, now)
+                    return 0.0
+                BUCKET.pack_into(self._map, offset, tokens, now)
+                return (reserve + cost - tokens) / rate
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, BUCKET.size, offset)
+
+    def refund(self, slot, burst, cost=1.0):
+        """Give back tokens taken for a request that was turned away later"""
+        offset = slot * BUCKET.size
+        with self._lock:
+            if self._map is None:
+                self._open()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, BUCKET.size, offset)
+            try:
+                tokens, refilled_at = BUCKET.unpack_from(self._map, offset)
+                BUCKET.pack_into(self._map, offset, min(burst, tokens + cost), refilled_at)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, BUCKET.size, offset)
+
+
+class RateLimiter:
+    """Per-client and global admission control with priority-aware shedding
+
+    Every request takes a token from its client's bucket for its priority
+    class (client_limits: {priority: requests per second}) and one from
+    the global bucket. Requests of a class listed in reserves may only
+    take global tokens while more than that fraction of the global burst
+    is left, so under load bulk traffic is shed first and the remaining
+    capacity is kept for interactive requests. Buckets hold burst_seconds
+    worth of their rate. A rate of 0 (or a class without a limit) is not
+    limited.
+    """
+
+    def __init__(self, path, global_rate, client_limits, reserves=None, burst_seconds=2.0, slots=4096):
+        self.buckets = SharedTokenBuckets(path, slots)
+        self.global_rate = global_rate
+        self.client_limits = client_limits
+        self.reserves = reserves or {}
+        self.burst_seconds = burst_seconds
+        self.rejected = {'client': 0, 'shed': 0}
+        self._rejected_lock = threading.Lock()
+
+    def _reject(self, reason, status, wait):
+        with self._rejected_lock:
+            self.rejected[reason] += 1
+        return status, max(1, math.ceil(wait))
+
+    def admit(self, client, priority):
+        """None if the request may proceed, else (status code, Retry-After seconds)
+
+        429 means the client exceeded its own limit; 503 means the service
+        is shedding load of this priority.
+        """
+        client_rate = self.client_limits.get(priority)
+        if client_rate:
+            client_slot = self.buckets.slot_for(f"{priority}:{client}")
+            client_burst = client_rate * self.burst_seconds
+            wait = self.buckets.take(client_slot, client_rate, client_burst)
+            if wait:
+                return self._reject('client', 429, wait)
+        if self.global_rate:
+            burst = self.global_rate * self.burst_seconds
+            wait = self.buckets.take(GLOBAL_SLOT, self.global_rate, burst,
+                                     reserve=burst * self.reserves.get(priority, 0.0))
+            if wait:
+                # A shed request does not count against its client, so retries
+                # during shedding are not turned into 429s as well
+                if client_rate:
+                    self.buckets.refund(client_slot, client_burst)
+                return self._reject('shed', 503, wait)
+        return None
+
+
+if __name__ == '__main__':
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description="Measure the shared token bucket from several processes")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=20000, help="admission checks per process")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"ratelimit-bench-{os.getpid()}")
+    limiter = RateLimiter(path, global_rate=1e9, client_limits={'interactive': 1e9})
+
+    def run(worker):
+        for i in range(args.requests):
+            limiter.admit(f"client-{worker}-{i % 50}", 'interactive')
+
+    started = time.perf_counter()
+    # The workers inherit the limiter (its file is opened after the fork)
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=run, args=(n,)) for n in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    os.remove(path)
+    total = args.processes * args.requests
+    print(f"{total} admission checks from {args.processes} processes in {elapsed:.2f}s "
+          f"({total / elapsed:,.0f}/s, {elapsed / args.requests * 1e6:.1f} us per check per process)")
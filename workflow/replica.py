@@ -0,0 +1,206 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Written into every snapshot so readers can tell how old it is and where it came from
+SNAPSHOT_META_TABLE = '''
+CREATE TABLE IF NOT EXISTS snapshot_meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    source TEXT NOT NULL,
+    taken_at DATETIME NOT NULL
+)
+'''
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+def _copy_database(source_path, target, pages, pause, max_restarts):
+    """Online backup of source_path into the open connection target"""
+    source = sqlite3.connect(source_path)
+    state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        # The backup starts over whenever another connection writes the source
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise _BackupRestarted()
+        state['remaining'] = remaining
+
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress, sleep=pause)
+        except _BackupRestarted:
+            source.backup(target, pages=-1, sleep=pause)
+    finally:
+        source.close()
+
+
+def _merge_shard(snapshot, shard_path, copy_path, pages, pause, max_restarts):
+    """Append the tickets of another shard to the snapshot being built"""
+    copy = sqlite3.connect(copy_path)
+    try:
+        _copy_database(shard_path, copy, pages, pause, max_restarts)
+    finally:
+        copy.close()
+    try:
+        snapshot.execute('ATTACH DATABASE ? AS shard', (copy_path,))
+        shard_columns = {row[1] for row in snapshot.execute('PRAGMA shard.table_info(tickets)')}
+        columns = ", ".join(row[1] for row in snapshot.execute('PRAGMA main.table_info(tickets)')
+                            if row[1] in shard_columns)
+        snapshot.execute(f'INSERT INTO main.tickets ({columns}) SELECT {columns} FROM shard.tickets')
+        snapshot.commit()
+        snapshot.execute('DETACH DATABASE shard')
+    finally:
+        os.remove(copy_path)
+
+
+def refresh_snapshot(source_path, snapshot_path, pages=256, pause=0.005, max_restarts=3, merge_sources=()):
+    """Copy the live database to snapshot_path without holding up its writers
+
+    The online backup API copies pages steps at a time into a temporary
+    file, releasing the source between steps (and restarting if a writer
+    changed it). If writes keep forcing restarts, the copy falls back to a
+    single step. The tickets of any merge_sources (further shards) are
+    copied the same way and appended. The finished copy is stamped and
+    then renamed over the old snapshot, so readers only ever see a
+    complete snapshot. Returns the time the copy was started.
+    """
+    tmp_path = f"{snapshot_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    taken_at = datetime.now()
+
+    snapshot = sqlite3.connect(tmp_path)
+    try:
+        _copy_database(source_path, snapshot, pages, pause, max_restarts)
+        for shard_path in merge_sources:
+            _merge_shard(snapshot, shard_path, f"{tmp_path}.shard", pages, pause, max_restarts)
+        if merge_sources:
+            # Resolution sketches are kept per shard; without them readers rebuild from the merged history
+            snapshot.execute('DELETE FROM resolution_sketches')
+        snapshot.execute(SNAPSHOT_META_TABLE)
+        snapshot.execute('INSERT OR REPLACE INTO snapshot_meta (id, source, taken_at) VALUES (1, ?, ?)',
+                         (os.path.abspath(source_path), taken_at.strftime('%Y-%m-%d %H:%M:%S')))
+        snapshot.commit()
+    except BaseException:
+        snapshot.close()
+        os.remove(tmp_path)
+        raise
+    snapshot.close()
+    os.replace(tmp_path, snapshot_path)
+    return taken_at
+
+
+def snapshot_info(conn):
+    """(source path, taken_at datetime) of a snapshot, or (None, None) for a plain database"""
+    try:
+        row = conn.execute('SELECT source, taken_at FROM snapshot_meta WHERE id = 1').fetchone()
+    except sqlite3.OperationalError:
+        return None, None
+    if row is None:
+        return None, None
+    return row[0], datetime.fromisoformat(row[1])
+
+
+class SnapshotReader:
+    """Hands out a read-only connection to the current snapshot
+
+    A refresh replaces the snapshot file, so the connection is reopened
+    whenever the file on disk is no longer the one it was opened on.
+    """
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = snapshot_path
+        self._conn = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def connection(self):
+        stat = os.stat(self.snapshot_path)
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if self._conn is None or identity != self._identity:
+                # The previous connection is left to close once no reader holds it
+                self._conn = sqlite3.connect(f"file:{os.path.abspath(self.snapshot_path)}?mode=ro",
+                                             uri=True, check_same_thread=False)
+                self._identity = identity
+            return self._conn
+
+    def staleness(self):
+        """Seconds since the snapshot was taken (file age for a plain database)"""
+        _, taken_at = snapshot_info(self.connection())
+        if taken_at is None:
+            return time.time() - os.path.getmtime(self.snapshot_path)
+        return (datetime.now() - taken_at).total_seconds()
+
+
+class SnapshotReplicator:
+    """Refreshes a read snapshot of the live database every interval seconds"""
+
+    def __init__(self, source_path, snapshot_path, interval=60, pages=256, pause=0.005, logger=None,
+                 merge_sources=()):
+        self.source_path = source_path
+        self.snapshot_path = snapshot_path
+        self.merge_sources = list(merge_sources)
+        self.interval = interval
+        self.pages = pages
+        self.pause = pause
+        self.logger = logger
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        started = time.monotonic()
+        taken_at = refresh_snapshot(self.source_path, self.snapshot_path, self.pages, self.pause,
+                                    merge_sources=self.merge_sources)
+        if self.logger:
+            self.logger.info(f"Snapshot {self.snapshot_path} refreshed in {time.monotonic() - started:.2f}s")
+        return taken_at
+
+    def start(self):
+        """Refresh on a daemon thread until stopped"""
+        if self._thread is not None or not self.interval:
+            return
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Refresh every interval until stopped (blocks)"""
+        while True:
+            try:
+                self.refresh()
+            except (sqlite3.Error, OSError) as e:
+                if self.logger:
+                    self.logger.error(f"Snapshot refresh failed: {e}")
+            if self._stop.wait(self.interval):
+                break
+
+
+if __name__ == '__main__':
+    from logger import Logger
+    from sharding import shard_paths
+
+    parser = argparse.ArgumentParser(description="Keep a read snapshot of the live ticket database")
+    parser.add_argument('--source', default=os.environ.get('TICKETS_DB', '../database/tickets.db'))
+    parser.add_argument('--snapshot', default=os.environ.get('REPLICA_PATH', '../dashboard/replica.db'))
+    parser.add_argument('--interval', type=float, default=60, help="seconds between refreshes (0 = refresh once)")
+    parser.add_argument('--pages', type=int, default=256, help="pages copied per backup step")
+    parser.add_argument('--shards', type=int, default=int(os.environ.get('TICKETS_SHARDS', '1')),
+                        help="number of ticket shards to merge into the snapshot")
+    args = parser.parse_args()
+
+    replicator = SnapshotReplicator(args.source, args.snapshot, args.interval, args.pages, logger=Logger(),
+                                    merge_sources=shard_paths(args.source, args.shards)[1:])
+    if args.interval:
+        replicator.run()
+    else:
+        replicator.refresh()
@@ -0,0 +1,540 @@
+import argparse
+import bisect
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+try:
+    from schema import EPOCH_COLUMNS, ensure_schema, epoch_ready, epoch_sql
+except ImportError:  # imported as workflow.repository (dashboard, tests, database scripts)
+    from workflow.schema import EPOCH_COLUMNS, ensure_schema, epoch_ready, epoch_sql
+
+# Columns of a ticket, in table order (see schema.py)
+TICKET_FIELDS = ('id', 'title', 'description', 'status', 'priority', 'created_at', 'updated_at', 'assigned_to',
+                 'occurrence_count', 'first_seen_at', 'last_seen_at', 'version')
+
+# Values for fields a new ticket leaves out
+FIELD_DEFAULTS = {'assigned_to': None, 'occurrence_count': 1, 'first_seen_at': None, 'last_seen_at': None,
+                  'version': 1}
+
+# Fields tickets can be selected by (equality; None matches a missing value)
+FILTER_FIELDS = ('status', 'priority', 'assigned_to')
+
+# Listing orders; created_at ties are broken by id
+ORDERINGS = {'id': 'id', 'created_at': 'created_at, id'}
+
+# The same orders on a database whose epoch columns are filled in
+EPOCH_ORDERINGS = {'id': 'id', 'created_at': 'created_epoch, id'}
+
+# Settings for every connection opened through connect(), tuned in one place
+SQLITE_PRAGMAS = {
+    # Sorts for ordered listings and merges stay off disk
+    'temp_store': 'MEMORY',
+    # 16 MB page cache per connection (negative values are KiB)
+    'cache_size': -16000,
+}
+
+# Date modifier making a created_to bound cover the whole day it names
+NEXT_DAY = "'start of day', '+1 day'"
+
+# Keep IN (...) lists well under SQLite's bound parameter limit
+ID_CHUNK = 500
+
+# Next free id above a floor parameter; the high-water mark also covers archived ids (see schema.py)
+NEXT_ID = ('(SELECT MAX(COALESCE(MAX(id), 0), ?, COALESCE((SELECT last_id FROM ticket_id_high_water), 0)) + 1 '
+           'FROM tickets)')
+
+
+def connect(path, row_factory=sqlite3.Row, **kwargs):
+    """Open a SQLite connection with the repository's pragmas applied"""
+    conn = sqlite3.connect(path, **kwargs)
+    conn.row_factory = row_factory
+    for name, value in SQLITE_PRAGMAS.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def filter_clause(filters=None, created_from=None, created_to=None, epoch=False):
+    """WHERE clause and parameters for a ticket filter ('' when nothing is filtered)
+
+    created_to is inclusive of the whole day it names. With epoch the
+    range compares created_epoch against bounds converted once per query.
+    """
+    conditions = []
+    params = []
+    for field, value in (filters or {}).items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Cannot filter tickets by {field}")
+        if value is None:
+            conditions.append(f"{field} IS NULL")
+        else:
+            conditions.append(f"{field} = ?")
+            params.append(value)
+    if created_from:
+        conditions.append(f"created_epoch >= {epoch_sql('?')}" if epoch else "created_at >= ?")
+        params.append(str(created_from))
+    if created_to:
+        if epoch:
+            conditions.append(f"created_epoch < {epoch_sql('?', NEXT_DAY)}")
+        else:
+            conditions.append("created_at < date(?, '+1 day')")
+        params.append(str(created_to))
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ''), params
+
+
+def _timestamp(value):
+    # Store datetimes the way sqlite3 writes them, so both backends compare the same strings
+    return value.isoformat(' ') if isinstance(value, datetime) else value
+
+
+def _changed_fields(changes):
+    unknown = [field for field in changes if field not in TICKET_FIELDS or field in ('id', 'version')]
+    if unknown:
+        raise ValueError(f"Cannot update ticket fields: {', '.join(unknown)}")
+    return list(changes)
+
+
+class TicketRepository:
+    """Ticket storage shared by the API, dashboard, database scripts and tests
+
+    SQLiteTicketRepository works on a SQLite connection (a file, a snapshot
+    or ':memory:'); MemoryTicketRepository keeps tickets in indexed Python
+    dicts for tests and benchmarks. Tickets come back as dicts. Filters are
+    a {field: value} dict over FILTER_FIELDS plus an optional created_at
+    range; listings are unordered unless order_by names one of ORDERINGS.
+    """
+
+    def get(self, ticket_id):
+        raise NotImplementedError
+
+    def get_many(self, ticket_ids):
+        raise NotImplementedError
+
+    def add(self, ticket, id_floor=0):
+        """Insert a ticket and return its id (the next id above id_floor unless ticket has one)"""
+        raise NotImplementedError
+
+    def add_many(self, tickets):
+        """Insert tickets in one batch; returns how many were added"""
+        raise NotImplementedError
+
+    def update(self, ticket_id, changes, expected_version=None):
+        """Apply changes and bump the version; returns the updated ticket
+
+        Returns None if the ticket does not exist or, with expected_version,
+        has been changed since that version was read.
+        """
+        raise NotImplementedError
+
+    def record_occurrence(self, ticket_id, seen_at):
+        """Count one more alert against an unresolved ticket; returns the updated ticket
+
+        The version is left alone (this is not an edit of the ticket).
+        Returns None if the ticket does not exist or has been closed.
+        """
+        raise NotImplementedError
+
+    def iter_chunks(self, columns=None, filters=None, created_from=None, created_to=None, order_by=None,
+                    chunk_size=500):
+        """Yield lists of row tuples (in columns order, default TICKET_FIELDS)"""
+        raise NotImplementedError
+
+    def records(self, columns=None, filters=None, created_from=None, created_to=None, order_by=None, limit=None):
+        """(columns, rows) for the matching tickets, e.g. to build a DataFrame"""
+        columns = list(columns or self.columns())
+        rows = []
+        for chunk in self.iter_chunks(columns, filters, created_from, created_to, order_by):
+            rows.extend(chunk)
+            if limit is not None and len(rows) >= limit:
+                return columns, rows[:limit]
+        return columns, rows
+
+    def find(self, filters=None, created_from=None, created_to=None, order_by=None, limit=None):
+        columns, rows = self.records(None, filters, created_from, created_to, order_by, limit)
+        return [dict(zip(columns, row)) for row in rows]
+
+    def count(self, filters=None, created_from=None, created_to=None):
+        return sum(len(chunk) for chunk in self.iter_chunks(['id'], filters, created_from, created_to))
+
+    def open_counts_by_assignee(self):
+        """{assignee: tickets not closed} for assigned tickets"""
+        counts = {}
+        for chunk in self.iter_chunks(['status', 'assigned_to']):
+            for status, assignee in chunk:
+                if status != 'closed' and assignee is not None:
+                    counts[assignee] = counts.get(assignee, 0) + 1
+        return counts
+
+    def timeline_rows(self):
+        """(priority, status, created_at, updated_at) of every ticket; timestamps may be epoch seconds"""
+        return [row for chunk in self.iter_chunks(['priority', 'status', 'created_at', 'updated_at'])
+                for row in chunk]
+
+    def columns(self):
+        return list(TICKET_FIELDS)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteTicketRepository(TicketRepository):
+    """Tickets in a SQLite database, on a connection owned by the caller
+
+    Writes join the connection's current transaction; the caller commits
+    (or calls commit()), so ticket changes can share a transaction with
+    other tables.
+    """
+
+    def __init__(self, conn, epoch=None):
+        self.conn = conn
+        self._epoch = epoch
+
+    @property
+    def epoch(self):
+        """Whether reads use the epoch columns (decided once, from the database unless given)"""
+        if self._epoch is None:
+            self._epoch = epoch_ready(self.conn)
+        return self._epoch
+
+    @classmethod
+    def open(cls, path=':memory:', **kwargs):
+        """Open a file (or an in-memory database) with the current schema"""
+        conn = connect(path, **kwargs)
+        ensure_schema(conn)
+        return cls(conn)
+
+    def columns(self):
+        return [row[1] for row in self.conn.execute('PRAGMA table_info(tickets)')]
+
+    @staticmethod
+    def _dicts(cursor):
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def _ordering(self, order_by):
+        return (EPOCH_ORDERINGS if self.epoch else ORDERINGS)[order_by]
+
+    def get(self, ticket_id):
+        tickets = self._dicts(self.conn.execute('SELECT * FROM tickets WHERE id = ?', (ticket_id,)))
+        return tickets[0] if tickets else None
+
+    def get_many(self, ticket_ids):
+        ticket_ids = list(ticket_ids)
+        tickets = []
+        for start in range(0, len(ticket_ids), ID_CHUNK):
+            chunk = ticket_ids[start:start + ID_CHUNK]
+            placeholders = ", ".join("?" for _ in chunk)
+            tickets.extend(self._dicts(self.conn.execute(f'SELECT * FROM tickets WHERE id IN ({placeholders})', chunk)))
+        return tickets
+
+    @staticmethod
+    def _insert_sql(id_value):
+        # The epoch columns are written with the row, so the insert trigger has nothing to do
+        return f'''
+        INSERT INTO tickets (id, {", ".join(TICKET_FIELDS[1:] + tuple(EPOCH_COLUMNS.values()))})
+        VALUES ({id_value}, {", ".join(["?" for _ in TICKET_FIELDS[1:]] + [epoch_sql('?') for _ in EPOCH_COLUMNS])})
+        '''
+
+    @staticmethod
+    def _values(ticket):
+        values = {field: _timestamp(ticket.get(field, FIELD_DEFAULTS.get(field))) for field in TICKET_FIELDS[1:]}
+        return list(values.values()) + [values[field] for field in EPOCH_COLUMNS]
+
+    def add(self, ticket, id_floor=0):
+        if 'id' in ticket:
+            cursor = self.conn.execute(self._insert_sql('?'), [ticket['id']] + self._values(ticket))
+        else:
+            # The id is allocated inside the INSERT, so concurrent writers cannot take the same one
+            cursor = self.conn.execute(self._insert_sql(NEXT_ID), [id_floor] + self._values(ticket))
+        return cursor.lastrowid
+
+    def add_many(self, tickets):
+        # Tickets without an id take the next free one; one executemany in the caller's transaction
+        cursor = self.conn.executemany(self._insert_sql(f'COALESCE(?, {NEXT_ID})'),
+                                       ([ticket.get('id'), 0] + self._values(ticket) for ticket in tickets))
+        return cursor.rowcount
+
+    def update(self, ticket_id, changes, expected_version=None):
+        fields = _changed_fields(changes)
+        # Epoch columns are set in the same statement so RETURNING sees them
+        assignments = "".join(f"{field} = ?, " for field in fields) + "".join(
+            f"{EPOCH_COLUMNS[field]} = {epoch_sql('?')}, " for field in fields if field in EPOCH_COLUMNS)
+        values = [_timestamp(changes[field]) for field in fields]
+        values += [_timestamp(changes[field]) for field in fields if field in EPOCH_COLUMNS] + [ticket_id]
+        condition = "id = ?"
+        if expected_version is not None:
+            condition += " AND version = ?"
+            values.append(expected_version)
+        tickets = self._dicts(self.conn.execute(f'''
+        UPDATE tickets
+        SET {assignments}version = version + 1
+        WHERE {condition}
+        RETURNING *
+        ''', values))
+        return tickets[0] if tickets else None
+
+    def record_occurrence(self, ticket_id, seen_at):
+        tickets = self._dicts(self.conn.execute('''
+        UPDATE tickets
+        SET occurrence_count = occurrence_count + 1, last_seen_at = ?
+        WHERE id = ? AND status != 'closed'
+        RETURNING *
+        ''', (_timestamp(seen_at), ticket_id)))
+        return tickets[0] if tickets else None
+
+    def iter_chunks(self, columns=None, filters=None, created_from=None, created_to=None, order_by=None,
+                    chunk_size=500):
+        columns = list(columns or self.columns())
+        where, params = filter_clause(filters, created_from, created_to, self.epoch)
+        order = f' ORDER BY {self._ordering(order_by)}' if order_by else ''
+        cursor = self.conn.execute(f'SELECT {", ".join(columns)} FROM tickets {where}{order}', params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows if self.conn.row_factory is None else [tuple(row) for row in rows]
+        finally:
+            cursor.close()
+
+    def records(self, columns=None, filters=None, created_from=None, created_to=None, order_by=None, limit=None):
+        columns = list(columns or self.columns())
+        where, params = filter_clause(filters, created_from, created_to, self.epoch)
+        order = f' ORDER BY {self._ordering(order_by)}' if order_by else ''
+        if limit is not None:
+            order += ' LIMIT ?'
+            params.append(limit)
+        rows = self.conn.execute(f'SELECT {", ".join(columns)} FROM tickets {where}{order}', params).fetchall()
+        return columns, [tuple(row) for row in rows]
+
+    def count(self, filters=None, created_from=None, created_to=None):
+        where, params = filter_clause(filters, created_from, created_to, self.epoch)
+        return self.conn.execute(f'SELECT COUNT(*) FROM tickets {where}', params).fetchone()[0]
+
+    def open_counts_by_assignee(self):
+        return dict(tuple(row) for row in self.conn.execute('''
+        SELECT assigned_to, COUNT(*) FROM tickets
+        WHERE status != 'closed' AND assigned_to IS NOT NULL
+        GROUP BY assigned_to
+        '''))
+
+    def timeline_rows(self):
+        # Epoch seconds once migrated, so nothing has to parse the text timestamps
+        timestamps = ", ".join(EPOCH_COLUMNS.values() if self.epoch else EPOCH_COLUMNS)
+        return [tuple(row) for row in self.conn.execute(f'SELECT priority, status, {timestamps} FROM tickets')]
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class MemoryTicketRepository(TicketRepository):
+    """Tickets in Python dicts with hash indexes on FILTER_FIELDS and a sorted created_at index
+
+    Changes apply immediately (commit() does nothing) and nothing is
+    persisted; meant for tests and benchmarks of code built on the
+    repository, not for the service itself.
+    """
+
+    def __init__(self, tickets=()):
+        self.tickets = {}
+        self.indexes = {field: {} for field in FILTER_FIELDS}
+        self.by_created = []
+        self.max_id = 0
+        self._lock = threading.RLock()
+        self.add_many(tickets)
+
+    def _index(self, ticket):
+        for field, index in self.indexes.items():
+            index.setdefault(ticket[field], set()).add(ticket['id'])
+        bisect.insort(self.by_created, (ticket['created_at'], ticket['id']))
+
+    def _unindex(self, ticket):
+        for field, index in self.indexes.items():
+            ids = index[ticket[field]]
+            ids.discard(ticket['id'])
+            if not ids:
+                del index[ticket[field]]
+        position = bisect.bisect_left(self.by_created, (ticket['created_at'], ticket['id']))
+        del self.by_created[position]
+
+    def get(self, ticket_id):
+        with self._lock:
+            ticket = self.tickets.get(ticket_id)
+            return dict(ticket) if ticket is not None else None
+
+    def get_many(self, ticket_ids):
+        with self._lock:
+            return [dict(self.tickets[ticket_id]) for ticket_id in dict.fromkeys(ticket_ids)
+                    if ticket_id in self.tickets]
+
+    def add(self, ticket, id_floor=0):
+        with self._lock:
+            ticket_id = ticket.get('id')
+            if ticket_id is None:
+                ticket_id = max(self.max_id, id_floor) + 1
+            elif ticket_id in self.tickets:
+                raise ValueError(f"Ticket {ticket_id} already exists")
+            stored = {field: _timestamp(ticket.get(field, FIELD_DEFAULTS.get(field))) for field in TICKET_FIELDS}
+            stored['id'] = ticket_id
+            missing = [field for field in ('title', 'description', 'status', 'priority', 'created_at', 'updated_at')
+                       if stored[field] is None]
+            if missing:
+                raise ValueError(f"Missing required ticket fields: {', '.join(missing)}")
+            self.tickets[ticket_id] = stored
+            self.max_id = max(self.max_id, ticket_id)
+            self._index(stored)
+            return ticket_id
+
+    def add_many(self, tickets):
+        with self._lock:
+            return sum(1 for ticket in tickets if self.add(ticket) is not None)
+
+    def update(self, ticket_id, changes, expected_version=None):
+        fields = _changed_fields(changes)
+        with self._lock:
+            ticket = self.tickets.get(ticket_id)
+            if ticket is None or (expected_version is not None and ticket['version'] != expected_version):
+                return None
+            self._unindex(ticket)
+            for field in fields:
+                ticket[field] = _timestamp(changes[field])
+            ticket['version'] += 1
+            self._index(ticket)
+            return dict(ticket)
+
+    def record_occurrence(self, ticket_id, seen_at):
+        with self._lock:
+            ticket = self.tickets.get(ticket_id)
+            if ticket is None or ticket['status'] == 'closed':
+                return None
+            ticket['occurrence_count'] += 1
+            ticket['last_seen_at'] = _timestamp(seen_at)
+            return dict(ticket)
+
+    def _matching(self, filters, created_from, created_to, order_by):
+        filters = filters or {}
+        for field in filters:
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Cannot filter tickets by {field}")
+        # Intersect the equality indexes (smallest first), else scan the created_at index range
+        candidates = None
+        if filters:
+            sets = sorted((self.indexes[field].get(value, set()) for field, value in filters.items()), key=len)
+            candidates = sets[0].intersection(*sets[1:])
+        low = str(created_from) if created_from else None
+        high = (date.fromisoformat(str(created_to)[:10]) + timedelta(days=1)).isoformat() if created_to else None
+        if candidates is None and (low or high or order_by == 'created_at'):
+            start = bisect.bisect_left(self.by_created, (low,)) if low else 0
+            end = bisect.bisect_left(self.by_created, (high,)) if high else len(self.by_created)
+            ids = [ticket_id for _, ticket_id in self.by_created[start:end]]
+            if order_by == 'id':
+                ids.sort()
+            return [self.tickets[ticket_id] for ticket_id in ids]
+        tickets = self.tickets.values() if candidates is None else [self.tickets[i] for i in candidates]
+        matching = [
+            ticket for ticket in tickets
+            if (low is None or ticket['created_at'] >= low) and (high is None or ticket['created_at'] < high)
+        ]
+        if order_by == 'created_at':
+            matching.sort(key=lambda ticket: (ticket['created_at'], ticket['id']))
+        elif order_by == 'id' or candidates is not None:
+            matching.sort(key=lambda ticket: ticket['id'])
+        return matching
+
+    def iter_chunks(self, columns=None, filters=None, created_from=None, created_to=None, order_by=None,
+                    chunk_size=500):
+        columns = list(columns or TICKET_FIELDS)
+        with self._lock:
+            rows = [tuple(ticket[column] for column in columns)
+                    for ticket in self._matching(filters, created_from, created_to, order_by)]
+        for start in range(0, len(rows), chunk_size):
+            yield rows[start:start + chunk_size]
+
+    def count(self, filters=None, created_from=None, created_to=None):
+        with self._lock:
+            if not created_from and not created_to:
+                if not filters:
+                    return len(self.tickets)
+                if len(filters) == 1:
+                    (field, value), = filters.items()
+                    if field in self.indexes:
+                        return len(self.indexes[field].get(value, ()))
+            return len(self._matching(filters, created_from, created_to, None))
+
+    def open_counts_by_assignee(self):
+        with self._lock:
+            closed = self.indexes['status'].get('closed', set())
+            return {assignee: len(ids - closed) for assignee, ids in self.indexes['assigned_to'].items()
+                    if assignee is not None and ids - closed}
+
+
+def open_repository(target=':memory:'):
+    """Repository for a target: 'memory' (pure Python), ':memory:' (SQLite in memory) or a database path"""
+    if target == 'memory':
+        return MemoryTicketRepository()
+    return SQLiteTicketRepository.open(target)
+
+
+if __name__ == '__main__':
+    import random
+
+    parser = argparse.ArgumentParser(description="Benchmark the ticket repository backends")
+    parser.add_argument('--tickets', type=int, default=100000)
+    parser.add_argument('--operations', type=int, default=5000, help="gets and updates per backend")
+    parser.add_argument('--file', default=None, help="also benchmark a SQLite file at this path")
+    args = parser.parse_args()
+
+    generator = random.Random(42)
+    start = datetime(2024, 1, 1)
+    tickets = [{
+        'title': f"Ticket {i}", 'description': "Benchmark ticket",
+        'status': generator.choice(['open', 'in_progress', 'closed']),
+        'priority': generator.choice(['low', 'medium', 'high']),
+        'created_at': start + timedelta(minutes=i), 'updated_at': start + timedelta(minutes=i + 30),
+        'assigned_to': generator.choice(['SupportBot', 'Junior Analyst', 'Senior Analyst', None])
+    } for i in range(args.tickets)]
+    ids = [generator.randint(1, args.tickets) for _ in range(args.operations)]
+
+    targets = ['memory', ':memory:'] + ([args.file] if args.file else [])
+    width = max(len(target) for target in targets) + 2
+    print(f"{'backend':<{width}}{'add_many':>10}{'get':>10}{'update':>10}{'find':>10}{'count':>10}  (seconds)")
+    for target in targets:
+        if target not in ('memory', ':memory:') and os.path.exists(target):
+            os.remove(target)
+        repository = open_repository(target)
+        timings = []
+        started = time.perf_counter()
+        repository.add_many(tickets)
+        repository.commit()
+        timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for ticket_id in ids:
+            repository.get(ticket_id)
+        timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for ticket_id in ids:
+            repository.update(ticket_id, {'status': 'closed'})
+        repository.commit()
+        timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(20):
+            repository.find({'status': 'open', 'priority': 'high'}, created_from='2024-01-15', order_by='created_at')
+        timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(200):
+            repository.count({'status': 'open'})
+        timings.append(time.perf_counter() - started)
+        repository.close()
+        print(f"{target:<{width}}" + "".join(f"{timing:>10.3f}" for timing in timings))
@@ -0,0 +1,91 @@
+import heapq
+import threading
+import time
+
+# Eligible assignees for each routing pool
+DEFAULT_POOLS = {
+    'high': ['Senior Analyst', 'Team Lead'],
+    'low': ['SupportBot'],
+    'escalation': ['Junior Analyst'],
+}
+
+
+def open_assignee(ticket):
+    """The assignee a ticket counts against, or None once it is closed"""
+    if ticket is None or ticket['status'] == 'closed':
+        return None
+    return ticket['assigned_to']
+
+
+class LoadBalancer:
+    """Picks the least-loaded assignee of a pool from in-memory heaps
+
+    Each pool keeps a heap of (open_tickets, assignee) entries. Count
+    changes push a fresh entry and outdated ones are discarded lazily when
+    they surface, so both picking and tracking are O(log n).
+
+    Counts only follow the changes this process makes. When other
+    processes write tickets too (the pre-fork launcher in serve.py), they
+    drift until the next load(); stale(max_age) tells when to reload.
+    """
+
+    def __init__(self, pools=None):
+        self.pools = {pool: list(members) for pool, members in (pools or DEFAULT_POOLS).items()}
+        self.counts = {}
+        self.loaded = False
+        self.loaded_at = None
+        self._heaps = {}
+        self._member_of = {}
+        for pool, members in self.pools.items():
+            if not members:
+                raise ValueError(f"Routing pool '{pool}' has no members")
+            for member in members:
+                self._member_of.setdefault(member, []).append(pool)
+            self._rebuild(pool)
+        self._lock = threading.Lock()
+
+    def load(self, counts):
+        """Replace all counts (e.g. from a GROUP BY at startup) and rebuild the heaps"""
+        with self._lock:
+            self.counts = {name: count for name, count in counts.items() if name is not None}
+            for pool in self.pools:
+                self._rebuild(pool)
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+
+    def stale(self, max_age):
+        """Whether the counts were loaded more than max_age seconds ago (0 means never stale)"""
+        return bool(max_age) and self.loaded and time.monotonic() - self.loaded_at >= max_age
+
+    def pick(self, pool):
+        """Return the assignee in pool with the fewest open tickets"""
+        with self._lock:
+            heap = self._heaps[pool]
+            while heap[0][0] != self.counts.get(heap[0][1], 0):
+                heapq.heappop(heap)
+            return heap[0][1]
+
+    def track(self, old_assignee, new_assignee):
+        """Move one open ticket from old_assignee to new_assignee (either may be None)"""
+        if not self.loaded or old_assignee == new_assignee:
+            return
+        with self._lock:
+            if old_assignee is not None:
+                self._adjust(old_assignee, -1)
+            if new_assignee is not None:
+                self._adjust(new_assignee, 1)
+
+    def _adjust(self, name, delta):
+        count = max(self.counts.get(name, 0) + delta, 0)
+        self.counts[name] = count
+        for pool in self._member_of.get(name, []):
+            heap = self._heaps[pool]
+            heapq.heappush(heap, (count, name))
+            # Keep outdated entries from piling up
+            if len(heap) > 4 * len(self.pools[pool]) + 16:
+                self._rebuild(pool)
+
+    def _rebuild(self, pool):
+        heap = [(self.counts.get(name, 0), name) for name in self.pools[pool]]
+        heapq.heapify(heap)
+        self._heaps[pool] = heap
@@ -0,0 +1,218 @@
+import sqlite3
+from datetime import datetime
+
+# Main tickets table (mirrors database/db_setup.py)
+TICKETS_TABLE = '''
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT CHECK(status IN ('open', 'in_progress', 'closed')) NOT NULL,
+    priority TEXT CHECK(priority IN ('low', 'medium', 'high')) NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    assigned_to TEXT
+)
+'''
+
+# Supporting tables used by the workflow service
+SUPPORT_TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key TEXT PRIMARY KEY,
+        status_code INTEGER NOT NULL,
+        response TEXT NOT NULL,
+        created_at DATETIME NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS webhook_fingerprints (
+        fingerprint TEXT PRIMARY KEY,
+        ticket_id INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS resolution_sketches (
+        dimension TEXT NOT NULL,
+        name TEXT NOT NULL,
+        sketch TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        p50 REAL,
+        p90 REAL,
+        p99 REAL,
+        PRIMARY KEY (dimension, name)
+    )
+    ''',
+    # Resolution time each closed ticket last added to the sketches, so closing it again replaces it
+    '''
+    CREATE TABLE IF NOT EXISTS resolution_samples (
+        ticket_id INTEGER PRIMARY KEY,
+        priority TEXT,
+        assignee TEXT,
+        hours REAL NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        name TEXT PRIMARY KEY,
+        completed_at DATETIME NOT NULL
+    )
+    ''',
+    # Ticket versions the SLA monitor has escalated, so reloads and restarts do not repeat them
+    '''
+    CREATE TABLE IF NOT EXISTS sla_escalations (
+        ticket_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL,
+        escalated_at DATETIME NOT NULL
+    )
+    ''',
+    # Highest ticket id ever used; archiving deletes tickets but never lowers it, so ids are not reused
+    '''
+    CREATE TABLE IF NOT EXISTS ticket_id_high_water (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_id INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS tickets_id_high_water AFTER INSERT ON tickets
+    WHEN NEW.id > (SELECT last_id FROM ticket_id_high_water)
+    BEGIN
+        UPDATE ticket_id_high_water SET last_id = NEW.id;
+    END
+    ''',
+]
+
+# Indexes supporting background jobs
+INDEXES = [
+    # SLA monitor startup scan of open tickets by age
+    'CREATE INDEX IF NOT EXISTS idx_tickets_status_updated ON tickets (status, updated_at)',
+]
+
+# Columns added to tickets after the original schema
+TICKET_COLUMNS = [
+    ('occurrence_count', 'INTEGER NOT NULL DEFAULT 1'),
+    ('first_seen_at', 'DATETIME'),
+    ('last_seen_at', 'DATETIME'),
+    ('version', 'INTEGER NOT NULL DEFAULT 1'),
+    # Epoch seconds of created_at/updated_at (see epoch_migration.py)
+    ('created_epoch', 'INTEGER'),
+    ('updated_epoch', 'INTEGER'),
+]
+
+# Integer epoch columns and the text timestamps they are derived from
+EPOCH_COLUMNS = {'created_at': 'created_epoch', 'updated_at': 'updated_epoch'}
+
+# Name recorded in schema_migrations once every row has its epoch columns
+EPOCH_MIGRATION = 'epoch_timestamps'
+
+
+def epoch_sql(expression, *modifiers):
+    """SQL for the epoch seconds of a timestamp expression (NULL when it does not parse)
+
+    Naive timestamps are read as UTC, so epochs order and bucket exactly
+    like the stored wall-clock times.
+    """
+    return f"CAST(strftime('%s', {', '.join((expression,) + modifiers)}) AS INTEGER)"
+
+
+def _epochs_differ(row):
+    return " OR ".join(f"{row}.{epoch} IS NOT {epoch_sql(f'{row}.{text}')}" for text, epoch in EPOCH_COLUMNS.items())
+
+
+def _set_epochs(row):
+    return ", ".join(f"{epoch} = {epoch_sql(f'{row}.{text}')}" for text, epoch in EPOCH_COLUMNS.items())
+
+
+# Keep the epoch columns in step with writers that only set the text timestamps
+EPOCH_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS tickets_epoch_insert AFTER INSERT ON tickets
+    WHEN {_epochs_differ('NEW')}
+    BEGIN
+        UPDATE tickets SET {_set_epochs('NEW')} WHERE id = NEW.id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS tickets_epoch_update AFTER UPDATE OF created_at, updated_at ON tickets
+    WHEN {_epochs_differ('NEW')}
+    BEGIN
+        UPDATE tickets SET {_set_epochs('NEW')} WHERE id = NEW.id;
+    END
+    ''',
+]
+
+# Created only once the epoch columns are filled in, so the backfill does not maintain them
+EPOCH_INDEXES = [
+    # Created-at range filters and listings ordered by creation time
+    'CREATE INDEX IF NOT EXISTS idx_tickets_created_epoch ON tickets (created_epoch)',
+]
+
+
+def add_missing_columns(conn, table, columns):
+    """Add any columns from (name, definition) pairs that the table lacks"""
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    for name, definition in columns:
+        if name not in existing:
+            try:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+            except sqlite3.OperationalError as e:
+                # Another process may have added it concurrently
+                if 'duplicate column' not in str(e):
+                    raise
+
+
+def _has_tickets(conn):
+    # Hot or archived (archive.py keeps an index of archived ids)
+    for table in ('tickets', 'archived_tickets'):
+        try:
+            if conn.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone() is not None:
+                return True
+        except sqlite3.OperationalError:
+            pass
+    return False
+
+
+def _highest_ticket_id(conn):
+    # Hot or archived, for databases from before the high-water mark was kept
+    highest = 0
+    for table in ('tickets', 'archived_tickets'):
+        try:
+            highest = max(highest, conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0])
+        except sqlite3.OperationalError:
+            pass
+    return highest
+
+
+def epoch_ready(conn):
+    """Whether reads may use the epoch columns (the migration has finished on this database)"""
+    try:
+        return conn.execute('SELECT 1 FROM schema_migrations WHERE name = ?', (EPOCH_MIGRATION,)).fetchone() is not None
+    except sqlite3.OperationalError:
+        # A database (or snapshot of one) from before migrations were recorded
+        return False
+
+
+def mark_migrated(conn, name):
+    conn.execute('INSERT OR IGNORE INTO schema_migrations (name, completed_at) VALUES (?, ?)',
+                 (name, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+
+def ensure_schema(conn):
+    """Create the tickets table and supporting tables if they are missing
+
+    Existing databases get the epoch columns and triggers here but keep
+    reading the text timestamps until epoch_migration.py has backfilled
+    them; a new (empty) database has nothing to backfill.
+    """
+    conn.execute(TICKETS_TABLE)
+    add_missing_columns(conn, 'tickets', TICKET_COLUMNS)
+    for ddl in SUPPORT_TABLES + INDEXES + EPOCH_TRIGGERS:
+        conn.execute(ddl)
+    if conn.execute('SELECT 1 FROM ticket_id_high_water').fetchone() is None:
+        conn.execute('INSERT OR IGNORE INTO ticket_id_high_water (id, last_id) VALUES (1, ?)',
+                     (_highest_ticket_id(conn),))
+    if not epoch_ready(conn) and not _has_tickets(conn):
+        for ddl in EPOCH_INDEXES:
+            conn.execute(ddl)
+        mark_migrated(conn, EPOCH_MIGRATION)
+    conn.commit()
@@ -0,0 +1,61 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+try:
+    import orjson
+except ImportError:  # optional, faster string encoding when installed
+    orjson = None
+
+
+def _encode_string(value):
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return encode_basestring_ascii(value)
+
+
+def encode_value(value):
+    """Encode a single SQLite column value as a JSON fragment"""
+    if value is None:
+        return 'null'
+    if isinstance(value, str):
+        return _encode_string(value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return str(value)
+    return json.dumps(value)
+
+
+def iter_json_rows(cursor, chunk_size=500, close=None):
+    """Yield the cursor's rows as a JSON array of objects, in UTF-8 byte chunks"""
+    columns = [description[0] for description in cursor.description]
+    return iter_json_chunks(columns, iter(lambda: cursor.fetchmany(chunk_size), []), close)
+
+
+def iter_json_chunks(columns, row_chunks, close=None):
+    """Yield JSON for an iterable of row-tuple chunks, in UTF-8 byte chunks
+
+    Rows are written straight into the output with precomputed '"column":'
+    prefixes, so no per-row dict or full result list is ever built. close
+    is called once the rows are exhausted or the response is abandoned.
+    """
+    try:
+        prefixes = ['{' + encode_basestring_ascii(columns[0]) + ':']
+        prefixes += [',' + encode_basestring_ascii(column) + ':' for column in columns[1:]]
+
+        yield b'['
+        separator = ''
+        for rows in row_chunks:
+            parts = []
+            for row in rows:
+                parts.append(separator)
+                for prefix, value in zip(prefixes, row):
+                    parts.append(prefix)
+                    parts.append(encode_value(value))
+                parts.append('}')
+                separator = ','
+            yield ''.join(parts).encode('utf-8')
+        yield b']'
+    finally:
+        if close is not None:
+            close()
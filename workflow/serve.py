@@ -0,0 +1,301 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import secrets
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer
+
+
+def memory_usage():
+    """(rss_mb, pss_mb) of the current process; pss is None where /proc is unavailable
+
+    RSS counts pages shared with the master after fork in every worker, so
+    PSS (shared pages split between the processes using them) is the
+    better per-worker figure.
+    """
+    values = {}
+    for path, names in (('/proc/self/status', ('VmRSS',)), ('/proc/self/smaps_rollup', ('Pss',))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    name, _, rest = line.partition(':')
+                    if name in names:
+                        values[name] = int(rest.split()[0]) / 1024
+        except OSError:
+            pass
+    rss = values.get('VmRSS')
+    if rss is None:
+        # ru_maxrss is in KB on Linux and bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return round(rss, 1), (round(values['Pss'], 1) if 'Pss' in values else None)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server on an inherited socket that handles requests on a fixed thread pool"""
+
+    def __init__(self, host, port, app, threads, fd=None):
+        super().__init__(host, port, app, fd=fd)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def close(self):
+        # Let in-flight requests finish before the worker exits
+        self.pool.shutdown(wait=True)
+        self.server_close()
+
+
+def run_worker(workflow_app, listener, slot, threads, ready_fd):
+    """Body of a forked worker: warm up, report readiness, serve until SIGTERM"""
+    started = time.perf_counter()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    workflow_app.warm_up()
+    workflow_app.start_background_services(singletons=slot == 0)
+    host, port = listener.getsockname()[:2]
+    server = PooledWSGIServer(host, port, workflow_app.app, threads, fd=listener.fileno())
+
+    def shutdown(signum, frame):
+        # shutdown() waits for serve_forever, so it must run off the main thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, shutdown)
+
+    rss, pss = memory_usage()
+    report = {'slot': slot, 'pid': os.getpid(), 'warm_seconds': round(time.perf_counter() - started, 3),
+              'rss_mb': rss, 'pss_mb': pss}
+    os.write(ready_fd, json.dumps(report).encode('utf-8'))
+    os.close(ready_fd)
+
+    server.serve_forever(poll_interval=0.5)
+    server.close()
+    workflow_app.coalescer.stop(workflow_app.get_db_connection)
+
+
+class Launcher:
+    """Pre-forking process manager for the workflow API
+
+    The app module is imported once in the master (importing it has no
+    side effects) and inherited by the forked workers; each worker opens
+    its own connections and warms its caches before it reports ready. The
+    first worker slot also runs the singleton background services.
+
+    Signals: SIGHUP re-executes the launcher (command) so new code is
+    imported, keeping its pid and the listening socket; the new launcher
+    starts a fresh generation of workers and retires the old one (retire)
+    once the new one is ready. SIGTERM/SIGINT stop gracefully, letting
+    in-flight requests finish. Workers that die are replaced.
+    """
+
+    def __init__(self, workflow_app, listener, workers, threads, logger=None, graceful_timeout=30, command=None,
+                 retire=()):
+        self.workflow_app = workflow_app
+        self.listener = listener
+        self.workers = workers
+        self.threads = threads
+        self.logger = logger
+        self.graceful_timeout = graceful_timeout
+        self.command = command
+        self.retire = list(retire)
+        self.generation = 0
+        self.children = {}   # pid -> (slot, generation)
+        self.pending = {}    # ready pipe fd -> (pid, spawned_at)
+        self.signals = []
+        self.stopping = False
+
+    def log(self, message):
+        if self.logger:
+            self.logger.info(message)
+
+    def spawn(self, slot):
+        ready_read, ready_write = os.pipe()
+        spawned_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            for fd in self.pending:
+                os.close(fd)
+            code = 0
+            try:
+                run_worker(self.workflow_app, self.listener, slot, self.threads, ready_write)
+            except BaseException as e:
+                print(f"Worker {slot} failed: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        os.close(ready_write)
+        self.children[pid] = (slot, self.generation)
+        self.pending[ready_read] = (pid, spawned_at)
+        return pid
+
+    def wait_ready(self, timeout=None):
+        """Collect readiness reports; returns the reports received"""
+        reports = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            readable, _, _ = select.select(list(self.pending), [], [], remaining)
+            if not readable:
+                break
+            for fd in readable:
+                pid, spawned_at = self.pending.pop(fd)
+                data = os.read(fd, 4096)
+                os.close(fd)
+                if not data:
+                    continue
+                report = json.loads(data)
+                report['cold_start_seconds'] = round(time.perf_counter() - spawned_at, 3)
+                self.log(f"Worker {report['slot']} (pid {pid}) ready in {report['cold_start_seconds']}s "
+                         f"(warm-up {report['warm_seconds']}s), RSS {report['rss_mb']} MB, PSS {report['pss_mb']} MB")
+                reports.append(report)
+        return reports
+
+    def start_generation(self):
+        self.generation += 1
+        for slot in range(self.workers):
+            self.spawn(slot)
+        return self.wait_ready(timeout=60)
+
+    def reload(self):
+        """Re-execute the launcher, handing it the workers to retire once its own are ready
+
+        Forking again from this process would only rerun the code and
+        configuration it imported at startup, so a deploy needs a fresh
+        import. exec keeps the pid, so the old workers stay our children.
+        """
+        if self.command is None:
+            self.log("Reload ignored: the launcher was started without a command to re-execute")
+            return
+        self.log(f"Reloading: re-executing the launcher, {len(self.children)} workers to retire")
+        for fd in self.pending:
+            os.close(fd)
+        retire = ",".join(str(pid) for pid in self.children)
+        os.execv(self.command[0], self.command + ['--listen-fd', str(self.listener.fileno()), '--retire', retire])
+
+    def kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        """Collect exited workers and replace those of the current generation"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot, generation = self.children.pop(pid, (None, None))
+            if generation == self.generation and not self.stopping:
+                self.log(f"Worker {slot} (pid {pid}) exited with status {status}, restarting")
+                # Back off so a worker that fails at startup doesn't respawn in a tight loop
+                time.sleep(1)
+                self.spawn(slot)
+
+    def stop(self):
+        self.stopping = True
+        for pid in list(self.children):
+            self.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            self.kill(pid, signal.SIGKILL)
+        self.log("All workers stopped")
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+
+        started = time.perf_counter()
+        reports = self.start_generation()
+        if self.retire:
+            self.log(f"Reloaded: {len(reports)} new workers ready, retiring {len(self.retire)}")
+            for pid in self.retire:
+                self.kill(pid, signal.SIGTERM)
+        if reports:
+            pss = [report['pss_mb'] for report in reports if report['pss_mb'] is not None]
+            self.log(f"{len(reports)} workers x {self.threads} threads serving on "
+                     f"{self.listener.getsockname()[0]}:{self.listener.getsockname()[1]} after "
+                     f"{time.perf_counter() - started:.2f}s; mean RSS "
+                     f"{sum(report['rss_mb'] for report in reports) / len(reports):.1f} MB"
+                     + (f", mean PSS {sum(pss) / len(pss):.1f} MB" if pss else ""))
+
+        while True:
+            if self.pending:
+                self.wait_ready(timeout=0.5)
+            else:
+                time.sleep(0.5)
+            while self.signals:
+                signum = self.signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.stop()
+                    return
+                if signum == signal.SIGHUP:
+                    self.reload()
+            self.reap()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the workflow API with pre-forked workers")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=4, help="request threads per worker")
+    parser.add_argument('--graceful-timeout', type=float, default=30)
+    # Passed by a reloading launcher to the one it re-executes
+    parser.add_argument('--listen-fd', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--retire', default='', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        sys.exit("The pre-fork launcher needs os.fork (Linux or macOS)")
+
+    # Workers other than the first write tickets too, so the SLA monitor rescans now and then. Each
+    # worker's least_loaded routing counts only see its own writes, so they are reloaded more often
+    if args.workers > 1:
+        os.environ.setdefault('SLA_RELOAD_INTERVAL', '300')
+        os.environ.setdefault('ROUTING_RELOAD_INTERVAL', '30')
+
+    # Sessions must stay valid when a reload re-executes the launcher, which re-imports the app
+    os.environ.setdefault('SECRET_KEY', secrets.token_hex(16))
+
+    import_started = time.perf_counter()
+    import app as workflow_app
+    import_seconds = time.perf_counter() - import_started
+    workflow_app.logger.info(f"App imported in {import_seconds:.3f}s")
+
+    if args.listen_fd is None:
+        listener = socket.create_server((args.host, args.port), backlog=2048)
+    else:
+        listener = socket.socket(fileno=args.listen_fd)
+    listener.set_inheritable(True)
+    command = [sys.executable, os.path.abspath(__file__), '--host', args.host, '--port', str(args.port),
+               '--workers', str(args.workers), '--threads', str(args.threads),
+               '--graceful-timeout', str(args.graceful_timeout)]
+    retire = [int(pid) for pid in args.retire.split(',') if pid]
+    Launcher(workflow_app, listener, args.workers, args.threads, workflow_app.logger, args.graceful_timeout,
+             command, retire).run()
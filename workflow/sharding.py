@@ -0,0 +1,127 @@
+import hashlib
+import heapq
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Ticket ids of shard n start above n * SHARD_SPAN, so an id names its shard;
+# shard 0 is the original database and keeps its existing ids
+SHARD_SPAN = 10 ** 12
+
+
+def shard_of(ticket_id):
+    return ticket_id // SHARD_SPAN
+
+
+def id_floor(shard):
+    return shard * SHARD_SPAN
+
+
+def shard_for(key, count):
+    """Shard for a routing key (e.g. a content fingerprint), stable across processes"""
+    if count == 1:
+        return 0
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+
+def shard_paths(db_path, count):
+    """Database files of count shards: db_path itself, then '<name>_shard<n>' next to it"""
+    base, ext = os.path.splitext(db_path)
+    return [db_path] + [f"{base}_shard{n}{ext}" for n in range(1, count)]
+
+
+def connect_shard(connect, shard):
+    """Open a shard with connect(); callables for a single database take no argument"""
+    return connect() if shard == 0 else connect(shard)
+
+
+def group_by_shard(ticket_ids):
+    """{shard: [ids]} preserving the order of ticket_ids"""
+    groups = {}
+    for ticket_id in ticket_ids:
+        groups.setdefault(shard_of(ticket_id), []).append(ticket_id)
+    return groups
+
+
+class ShardExecutor:
+    """Runs one task per shard in parallel and returns the results in shard order"""
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def map(self, task, shards):
+        shards = list(shards)
+        if len(shards) == 1:
+            return [task(shards[0])]
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='shard')
+        return list(self._pool.map(task, shards))
+
+
+def prefetch(chunks, depth=4):
+    """Drain a chunk generator on its own thread, at most depth chunks ahead of the reader
+
+    The generator runs entirely on that thread (SQLite connections opened
+    inside it stay there). Closing the returned generator stops the worker
+    and closes the source generator.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    break
+        except BaseException as e:
+            put(e)
+        finally:
+            chunks.close()
+            put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def merge_sorted(streams, key, chunk_size=500):
+    """Merge chunked row streams that are each sorted by key into one sorted chunked stream"""
+    rows = heapq.merge(*[(row for chunk in stream for row in chunk) for stream in streams], key=key)
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        for stream in streams:
+            if hasattr(stream, 'close'):
+                stream.close()
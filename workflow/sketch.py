@@ -0,0 +1,226 @@
+import json
+import math
+from datetime import datetime
+
+try:
+    from repository import SQLiteTicketRepository
+except ImportError:  # imported as workflow.sketch (dashboard)
+    from workflow.repository import SQLiteTicketRepository
+
+# Quantiles exposed by the API and dashboard
+REPORTED_QUANTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99}
+
+SAVE_SAMPLE = 'INSERT OR REPLACE INTO resolution_samples (ticket_id, priority, assignee, hours) VALUES (?, ?, ?, ?)'
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch-style)
+
+    Values are counted in logarithmically sized bins, so any quantile is
+    within relative_accuracy of the true value, two sketches merge by adding
+    bin counts, and the size depends on the value range rather than on how
+    many values were added.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        """Add one (non-negative) value"""
+        if value <= 0:
+            self.zero_count += 1
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.total += max(value, 0)
+
+    def remove(self, value):
+        """Take back one value that was added earlier"""
+        if value <= 0:
+            self.zero_count -= 1
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] -= 1
+            if not self.bins[index]:
+                del self.bins[index]
+        self.count -= 1
+        self.total -= max(value, 0)
+
+    def merge(self, other):
+        """Fold another sketch with the same accuracy into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        return self
+
+    def quantile(self, q):
+        """Estimate the q-th quantile (0 <= q <= 1), or None if empty"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        """Count, mean and the reported quantiles as a dict"""
+        result = {'count': self.count, 'mean': self.mean()}
+        for name, q in REPORTED_QUANTILES.items():
+            result[name] = self.quantile(q)
+        return result
+
+    def to_json(self):
+        return json.dumps({
+            'relative_accuracy': self.relative_accuracy,
+            'bins': self.bins,
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'total': self.total
+        })
+
+    @classmethod
+    def from_json(cls, payload):
+        data = json.loads(payload)
+        sketch = cls(data['relative_accuracy'])
+        sketch.bins = {int(index): count for index, count in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.total = data['total']
+        return sketch
+
+
+def resolution_hours(created_at, closed_at):
+    """Hours between two timestamp strings"""
+    created = datetime.fromisoformat(str(created_at))
+    closed = datetime.fromisoformat(str(closed_at))
+    return (closed - created).total_seconds() / 3600
+
+
+def resolution_sample(ticket):
+    """(ticket_id, priority, assignee, hours) row recorded for a closed ticket"""
+    return (ticket['id'], ticket['priority'], ticket['assigned_to'],
+            resolution_hours(ticket['created_at'], ticket['updated_at']))
+
+
+def resolution_dimensions(ticket):
+    """The (dimension, name) sketches a closed ticket contributes to"""
+    return [
+        ('all', 'all'),
+        ('priority', ticket['priority']),
+        ('assignee', ticket['assigned_to'] or 'Unassigned')
+    ]
+
+
+def build_resolution_sketches(tickets):
+    """Build sketches from closed tickets (mappings with priority, assigned_to, created_at, updated_at)"""
+    sketches = {}
+    for ticket in tickets:
+        hours = resolution_hours(ticket['created_at'], ticket['updated_at'])
+        for key in resolution_dimensions(ticket):
+            sketches.setdefault(key, QuantileSketch()).add(hours)
+    return sketches
+
+
+def save_sketches(conn, sketches):
+    """Upsert sketches and their precomputed quantiles; the caller commits"""
+    rows = []
+    for (dimension, name), sketch in sketches.items():
+        summary = sketch.summary()
+        rows.append((dimension, name, sketch.to_json(), summary['count'],
+                     summary['p50'], summary['p90'], summary['p99']))
+    conn.executemany('''
+    INSERT INTO resolution_sketches (dimension, name, sketch, count, p50, p90, p99)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (dimension, name) DO UPDATE SET
+        sketch = excluded.sketch, count = excluded.count,
+        p50 = excluded.p50, p90 = excluded.p90, p99 = excluded.p99
+    ''', rows)
+
+
+def load_sketches(conn, keys=None):
+    """Load persisted sketches, optionally only the given (dimension, name) keys"""
+    if keys is None:
+        rows = conn.execute('SELECT dimension, name, sketch FROM resolution_sketches').fetchall()
+    else:
+        rows = [
+            row for dimension, name in keys
+            for row in conn.execute(
+                'SELECT dimension, name, sketch FROM resolution_sketches WHERE dimension = ? AND name = ?',
+                (dimension, name)
+            )
+        ]
+    return {(row[0], row[1]): QuantileSketch.from_json(row[2]) for row in rows}
+
+
+def record_resolution(conn, ticket):
+    """Add a just-closed ticket to its sketches within the caller's transaction
+
+    A ticket that was closed before, then reopened, only counts with its
+    final close: the hours it contributed last time (kept in
+    resolution_samples) are taken back out first.
+    """
+    keys = resolution_dimensions(ticket)
+    previous = conn.execute('SELECT priority, assignee, hours FROM resolution_samples WHERE ticket_id = ?',
+                            (ticket['id'],)).fetchone()
+    previous_keys = resolution_dimensions({'priority': previous[0], 'assigned_to': previous[1]}) if previous else []
+    sketches = load_sketches(conn, set(keys + previous_keys))
+    for key in previous_keys:
+        if key in sketches:
+            sketches[key].remove(previous[2])
+    sample = resolution_sample(ticket)
+    for key in keys:
+        sketches.setdefault(key, QuantileSketch()).add(sample[3])
+    save_sketches(conn, sketches)
+    conn.execute(SAVE_SAMPLE, sample)
+
+
+def rebuild_resolution_sketches(conn):
+    """Recompute every sketch and sample from the closed tickets in the table; the caller commits"""
+    conn.execute('DELETE FROM resolution_sketches')
+    conn.execute('DELETE FROM resolution_samples')
+    columns = ['id', 'priority', 'assigned_to', 'created_at', 'updated_at']
+    sketches = {}
+    for chunk in SQLiteTicketRepository(conn).iter_chunks(columns, {'status': 'closed'}):
+        tickets = [dict(zip(columns, row)) for row in chunk]
+        samples = [resolution_sample(ticket) for ticket in tickets]
+        for ticket, sample in zip(tickets, samples):
+            for key in resolution_dimensions(ticket):
+                sketches.setdefault(key, QuantileSketch()).add(sample[3])
+        conn.executemany(SAVE_SAMPLE, samples)
+    save_sketches(conn, sketches)
+    return sketches
+
+
+def sketches_stored(conn):
+    """Whether the sketches have been built, along with the per-ticket samples they are kept from"""
+    return conn.execute('SELECT 1 FROM resolution_samples LIMIT 1').fetchone() is not None
+
+
+def percentile_rows(conn, dimension=None):
+    """Stored count and quantiles of every sketch (or one dimension's), ordered by dimension and name"""
+    columns = ['dimension', 'name', 'count'] + list(REPORTED_QUANTILES)
+    if dimension:
+        cursor = conn.execute(f'SELECT {", ".join(columns)} FROM resolution_sketches WHERE dimension = ? '
+                              'ORDER BY name', (dimension,))
+    else:
+        cursor = conn.execute(f'SELECT {", ".join(columns)} FROM resolution_sketches ORDER BY dimension, name')
+    return [dict(zip(columns, row)) for row in cursor]
@@ -0,0 +1,247 @@
+import json
+import math
+import sqlite3
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+from repository import SQLiteTicketRepository
+from sharding import connect_shard, group_by_shard
+
+# Hours a ticket may sit open or in_progress without an update
+DEFAULT_SLA_HOURS = {'high': 4, 'medium': 24, 'low': 72}
+
+
+class TimerWheel:
+    """Hierarchical timing wheel keyed by arbitrary hashable ids
+
+    Level 0 has one slot per tick; each higher level has one slot per full
+    rotation of the level below. Timers far in the future sit in a coarse
+    slot and are cascaded down as time approaches, so scheduling is O(1)
+    and advancing costs O(1) per tick plus O(1) per timer moved or fired.
+    Rescheduling or cancelling only updates the deadline map; outdated
+    entries are dropped when their slot comes up.
+    """
+
+    def __init__(self, tick=1.0, slots=(60, 60, 24, 64), start=None):
+        self.tick = tick
+        self.slots = slots
+        self.units = [math.prod(slots[:level]) for level in range(len(slots))]
+        self.spans = [unit * count for unit, count in zip(self.units, slots)]
+        self.levels = [[[] for _ in range(count)] for count in slots]
+        self.overflow = []
+        self.deadlines = {}
+        self.current = int((time.time() if start is None else start) // tick)
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def schedule(self, key, when):
+        """Fire key at time when (seconds); replaces any earlier schedule"""
+        deadline = max(math.ceil(when / self.tick), self.current + 1)
+        self.deadlines[key] = deadline
+        self._place(key, deadline)
+
+    def cancel(self, key):
+        self.deadlines.pop(key, None)
+
+    def advance(self, now):
+        """Move the wheel forward to now and return the keys that expired"""
+        target = int(now // self.tick)
+        expired = []
+        while self.current < target:
+            self.current += 1
+            # Cascade coarse slots whose time has come, highest level first
+            if self.current % self.spans[-1] == 0:
+                pending, self.overflow = self.overflow, []
+                self._replace(pending)
+            for level in range(len(self.slots) - 1, 0, -1):
+                if self.current % self.units[level] == 0:
+                    slot = (self.current // self.units[level]) % self.slots[level]
+                    pending, self.levels[level][slot] = self.levels[level][slot], []
+                    self._replace(pending)
+            slot = self.current % self.slots[0]
+            bucket, self.levels[0][slot] = self.levels[0][slot], []
+            for key, deadline in bucket:
+                if self.deadlines.get(key) == deadline:
+                    del self.deadlines[key]
+                    expired.append(key)
+        return expired
+
+    def _replace(self, entries):
+        for key, deadline in entries:
+            if self.deadlines.get(key) == deadline:
+                self._place(key, deadline)
+
+    def _place(self, key, deadline):
+        delta = deadline - self.current
+        for level, span in enumerate(self.spans):
+            if delta < span:
+                slot = (deadline // self.units[level]) % self.slots[level]
+                self.levels[level][slot].append((key, deadline))
+                return
+        self.overflow.append((key, deadline))
+
+
+class SLAMonitor:
+    """Escalates open tickets whose updated_at is older than their priority's SLA
+
+    Deadlines live in a TimerWheel. The database is scanned once at start
+    (through the status/updated_at index); afterwards the service reports
+    every ticket change through track(), and expiries only trigger a
+    primary-key lookup to confirm the breach before escalating. When other
+    processes also write tickets, reload_interval rescans periodically to
+    pick up tickets this process never saw. With several shards, connect
+    takes a shard number and the scan covers every shard. Escalations are
+    recorded per ticket version in sla_escalations, so a breach is acted on
+    once until the ticket changes again.
+    """
+
+    def __init__(self, connect, sla_hours=None, actions=('log',), escalate_to='Team Lead',
+                 webhook_url=None, logger=None, on_update=None, tick=1.0, reload_interval=0,
+                 shards=1):
+        self.connect = connect
+        self.sla_hours = sla_hours or DEFAULT_SLA_HOURS
+        self.actions = set(actions)
+        self.escalate_to = escalate_to
+        self.webhook_url = webhook_url
+        self.logger = logger
+        self.on_update = on_update
+        self.tick = tick
+        self.reload_interval = reload_interval
+        self.shards = shards
+        self.wheel = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self.wheel is not None
+
+    def deadline(self, ticket):
+        """Epoch seconds at which the ticket breaches its SLA"""
+        updated_at = datetime.fromisoformat(str(ticket['updated_at']))
+        return updated_at.timestamp() + self.sla_hours.get(ticket['priority'], 24) * 3600
+
+    def load(self):
+        """Schedule every open ticket not escalated at its current version (the monitor's only full query)"""
+        wheel = TimerWheel(tick=self.tick)
+        for shard in range(self.shards):
+            conn = connect_shard(self.connect, shard)
+            escalated = dict(tuple(row) for row in conn.execute('SELECT ticket_id, version FROM sla_escalations'))
+            repository = SQLiteTicketRepository(conn)
+            for status in ('open', 'in_progress'):
+                for chunk in repository.iter_chunks(['id', 'priority', 'updated_at', 'version'], {'status': status}):
+                    for ticket_id, priority, updated_at, version in chunk:
+                        if escalated.get(ticket_id) != version:
+                            wheel.schedule(ticket_id, self.deadline({'priority': priority, 'updated_at': updated_at}))
+            conn.close()
+        with self._lock:
+            self.wheel = wheel
+        return len(wheel)
+
+    def track(self, ticket):
+        """Reschedule (or cancel, once closed) a ticket that was created or updated"""
+        if self.wheel is None:
+            return
+        with self._lock:
+            if ticket['status'] == 'closed':
+                self.wheel.cancel(ticket['id'])
+            else:
+                self.wheel.schedule(ticket['id'], self.deadline(ticket))
+
+    def check(self, now=None):
+        """Advance the wheel and escalate every ticket whose deadline passed"""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = self.wheel.advance(now)
+        if not expired:
+            return []
+        escalated = []
+        for shard, ticket_ids in group_by_shard(expired).items():
+            conn = connect_shard(self.connect, shard)
+            try:
+                for ticket_id in ticket_ids:
+                    if self._escalate(conn, ticket_id, now):
+                        escalated.append(ticket_id)
+            finally:
+                conn.close()
+        return escalated
+
+    def _escalate(self, conn, ticket_id, now):
+        repository = SQLiteTicketRepository(conn)
+        ticket = repository.get(ticket_id)
+        if ticket is None or ticket['status'] == 'closed':
+            return False
+        # Another process may have updated the ticket since it was scheduled
+        if self.deadline(ticket) > now:
+            self.track(ticket)
+            return False
+        # Claim the breach first: log and webhook actions change nothing on the ticket, so
+        # without the record every reload, restart or other monitor would send them again
+        claimed = conn.execute('''
+        INSERT INTO sla_escalations (ticket_id, version, escalated_at) VALUES (?, ?, ?)
+        ON CONFLICT(ticket_id) DO UPDATE SET version = excluded.version, escalated_at = excluded.escalated_at
+        WHERE sla_escalations.version != excluded.version
+        ''', (ticket_id, ticket['version'], datetime.now().strftime('%Y-%m-%d %H:%M:%S'))).rowcount
+        conn.commit()
+        if not claimed:
+            return False
+
+        if 'log' in self.actions and self.logger:
+            self.logger.warning(
+                f"SLA breached: ticket ID={ticket_id} ({ticket['priority']}, {ticket['status']}) "
+                f"not updated since {ticket['updated_at']}"
+            )
+        if 'reassign' in self.actions and ticket['assigned_to'] != self.escalate_to:
+            updated = repository.update(ticket_id, {'assigned_to': self.escalate_to,
+                                                    'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')},
+                                        expected_version=ticket['version'])
+            repository.commit()
+            if updated is not None:
+                # The escalation restarts the SLA clock for the new assignee
+                self.track(updated)
+                if self.on_update:
+                    self.on_update(ticket, updated)
+                if self.logger:
+                    self.logger.info(f"SLA escalation: ticket ID={ticket_id} reassigned to {self.escalate_to}")
+        if 'webhook' in self.actions and self.webhook_url:
+            threading.Thread(target=self._notify, args=(ticket,), daemon=True).start()
+        return True
+
+    def _notify(self, ticket):
+        payload = json.dumps({'event': 'sla_breach', 'ticket': ticket}).encode('utf-8')
+        request = urllib.request.Request(self.webhook_url, data=payload,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except OSError as e:
+            if self.logger:
+                self.logger.error(f"SLA webhook for ticket ID={ticket['id']} failed: {e}")
+
+    def start(self):
+        """Load deadlines and check them every tick on a daemon thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        count = self.load()
+        loaded_at = time.monotonic()
+        if self.logger:
+            self.logger.info(f"SLA monitor started with {count} open tickets")
+        while not self._stop.wait(self.tick):
+            try:
+                if self.reload_interval and time.monotonic() - loaded_at >= self.reload_interval:
+                    self.load()
+                    loaded_at = time.monotonic()
+                self.check()
+            except sqlite3.Error as e:
+                if self.logger:
+                    self.logger.error(f"SLA check failed: {e}")
@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import hmac
+import http.cookiejar
+import json
+import random
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+from sketch import QuantileSketch
+
+# Fields whose values are recorded as-is; every other string is replaced by its shape
+PASSTHROUGH_FIELDS = {'status', 'priority', 'dimension', 'created_from', 'created_to', 'If-Match'}
+
+# Headers that affect how the API answers a request
+RECORDED_HEADERS = ['Idempotency-Key', 'If-Match']
+
+# Routes the replay client handles itself
+SESSION_ROUTES = {'/login', '/logout'}
+
+
+def value_shape(value, salt, key=None):
+    """Sanitize a JSON value, keeping its structure, types and string lengths
+
+    Strings become {'$str': length, '$id': keyed digest}, so equal values
+    stay equal within one recording (duplicates and retries still replay as
+    duplicates) but the original text cannot be recovered.
+    """
+    if isinstance(value, dict):
+        return {name: value_shape(item, salt, name) for name, item in value.items()}
+    if isinstance(value, list):
+        return [value_shape(item, salt) for item in value]
+    if isinstance(value, str) and key not in PASSTHROUGH_FIELDS:
+        digest = hmac.new(salt, value.encode('utf-8'), hashlib.sha256).hexdigest()[:12]
+        return {'$str': len(value), '$id': digest}
+    return value
+
+
+def materialize(shape, tag=''):
+    """Rebuild a concrete value from a recorded shape
+
+    tag is mixed into every generated string so separate replay runs don't
+    collide with each other's idempotency keys and fingerprints.
+    """
+    if isinstance(shape, dict):
+        if '$str' in shape:
+            text = f"{shape['$id']}{tag}"
+            return (text * (shape['$str'] // max(len(text), 1) + 1))[:max(shape['$str'], len(text))]
+        return {name: materialize(item, tag) for name, item in shape.items()}
+    if isinstance(shape, list):
+        return [materialize(item, tag) for item in shape]
+    return shape
+
+
+class TrafficRecorder:
+    """Appends one sanitized JSON line per handled request to a trace file
+
+    Each trace holds the method, route rule, path, query and body shapes,
+    selected headers, response status and handler time in milliseconds,
+    plus the offset in seconds from the start of the recording so replays
+    can reproduce the original pacing.
+    """
+
+    def __init__(self, path, sample_rate=1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.salt = secrets.token_bytes(16)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', buffering=1)
+
+    def record(self, request, response, duration):
+        """Write the trace for a finished request (duration in seconds)"""
+        if request.url_rule is None or random.random() >= self.sample_rate:
+            return
+        trace = {
+            't': round(time.time() - duration - self.started, 4),
+            'method': request.method,
+            'route': request.url_rule.rule,
+            'path': request.path,
+            'query': value_shape(request.args.to_dict(flat=True), self.salt),
+            'headers': {
+                name: value_shape(request.headers[name], self.salt, name)
+                for name in RECORDED_HEADERS if name in request.headers
+            },
+            'body': value_shape(request.get_json(silent=True), self.salt),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3)
+        }
+        line = json.dumps(trace)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_traces(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class InProcessClient:
+    """Sends traces straight to a Flask app through its test client"""
+
+    def __init__(self, app, username='admin', role='admin'):
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['username'] = username
+            session['role'] = role
+
+    def send(self, method, path, query, headers, body):
+        response = self.client.open(path, method=method, query_string=query, headers=headers, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HttpClient:
+    """Sends traces to a running server over HTTP, logged in with its own session"""
+
+    def __init__(self, base_url, username='admin', password='admin123'):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        login = urllib.parse.urlencode({'username': username, 'password': password}).encode('utf-8')
+        self.opener.open(f"{self.base_url}/login", data=login, timeout=10).close()
+
+    def send(self, method, path, query, headers, body):
+        url = f"{self.base_url}{path}"
+        if query:
+            url += '?' + urllib.parse.urlencode(query)
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers = {**headers, 'Content-Type': 'application/json'}
+        request = urllib.request.Request(url, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def replay(traces, make_client, concurrency=4, speed=1.0, tag=None):
+    """Replay traces with concurrency workers and report throughput and latency
+
+    Requests start at their recorded offset divided by speed (speed 0 sends
+    them as fast as the workers allow). Each worker owns one client built by
+    make_client(). Latencies are kept in quantile sketches per route.
+    """
+    tag = secrets.token_hex(3) if tag is None else tag
+    pending = [trace for trace in sorted(traces, key=lambda trace: trace['t']) if trace['route'] not in SESSION_ROUTES]
+    first_offset = pending[0]['t'] if pending else 0
+    position = iter(range(len(pending)))
+    lock = threading.Lock()
+    sketches = {}
+    statuses = Counter()
+    late = []
+
+    def worker():
+        client = make_client()
+        local = {}
+        local_statuses = Counter()
+        local_late = 0.0
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                break
+            trace = pending[index]
+            if speed:
+                delay = started + (trace['t'] - first_offset) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    local_late = max(local_late, -delay)
+            sent = time.monotonic()
+            status = client.send(trace['method'], trace['path'],
+                                 materialize(trace.get('query') or {}, tag),
+                                 materialize(trace.get('headers') or {}, tag),
+                                 materialize(trace.get('body'), tag))
+            local.setdefault(trace['route'], QuantileSketch()).add((time.monotonic() - sent) * 1000)
+            local_statuses[status] += 1
+        with lock:
+            for route, sketch in local.items():
+                sketches.setdefault(route, QuantileSketch()).merge(sketch)
+            statuses.update(local_statuses)
+            late.append(local_late)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(max(concurrency, 1))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    overall = QuantileSketch()
+    for sketch in sketches.values():
+        overall.merge(sketch)
+    return {
+        'requests': overall.count,
+        'errors': sum(count for status, count in statuses.items() if status >= 500),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(overall.count / elapsed, 1) if elapsed > 0 else None,
+        'max_lateness_ms': round(max(late, default=0) * 1000, 1),
+        'latency_ms': overall.summary(),
+        'routes': {route: sketch.summary() for route, sketch in sorted(sketches.items())}
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay recorded API traffic and report latency")
+    parser.add_argument('traces', help="JSONL file written with TRAFFIC_RECORD")
+    parser.add_argument('--target', default='inprocess', help="'inprocess' or a base URL such as http://localhost:5000")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--speed', type=float, default=1.0, help="pace multiplier (0 = as fast as possible)")
+    args = parser.parse_args()
+
+    if args.target == 'inprocess':
+        import app as workflow_app
+        make_client = lambda: InProcessClient(workflow_app.app)
+    else:
+        make_client = lambda: HttpClient(args.target)
+
+    report = replay(load_traces(args.traces), make_client, args.concurrency, args.speed)
+    print(json.dumps(report, indent=4))